@@ -0,0 +1,244 @@
+"""
+Benchmarks of the solar position and irradiance pipeline.
+
+Measures the throughput (time steps, or time steps x sites, per second)
+and the peak memory of each stage over a range of time index lengths and
+fleet sizes, using synthetic irradiance instead of PVGIS. Results can be
+saved as a baseline and later runs compared against it:
+
+    $ python benchmarks/run.py --quick --save benchmarks/baseline.json
+    $ python benchmarks/run.py --quick --baseline benchmarks/baseline.json
+
+The comparison exits with status 1 when a case is slower, or uses more
+memory, than the baseline by more than the tolerance.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from irradiance_pv.irradiance_pv import Irradiance, PVSystem  # noqa: E402
+from irradiance_pv.fleet import Fleet  # noqa: E402
+from irradiance_pv.solar_tiers import TIERS  # noqa: E402
+from irradiance_pv.spa_sb import solar_position, solar_position_vect  # noqa: E402
+
+# (label, periods, freq) of the simulated time indexes.
+QUICK_PERIODS = [
+    ("1d-1h", 24, "1h"),
+    ("1y-1h", 8760, "1h"),
+    ("7d-1min", 7 * 1440, "1min"),
+]
+FULL_PERIODS = QUICK_PERIODS + [
+    ("10y-1h", 87600, "1h"),
+    ("1y-1min", 525600, "1min"),
+    ("10y-1min", 5256000, "1min"),
+]
+QUICK_SITES = [10, 100]
+FULL_SITES = [10, 100, 1000]
+
+# Rows evaluated by the scalar solar_position, which is far slower.
+SCALAR_ROWS = 200
+
+PVSYSTEM = PVSystem("bench", 52.01, 4.36, surface_azimuth=180, surface_tilt=35)
+
+
+def synthetic_tmy(times, solar_altitude):
+    """Clear-sky like GHI, DNI, DHI following the solar altitude."""
+
+    sin_alt = np.clip(np.sin(np.radians(np.asarray(solar_altitude))), 0, None)
+    ghi = 1000 * sin_alt
+    return pd.DataFrame(
+        {"GHI": ghi, "DNI": 0.8 * 1000 * (sin_alt > 0), "DHI": 0.2 * ghi},
+        index=times,
+    )
+
+
+def measure(func, repeat):
+    """Best wall time over repeat calls, and the peak traced memory of
+    one extra call, in bytes."""
+
+    best = float("inf")
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func()
+            best = min(best, time.perf_counter() - start)
+
+        tracemalloc.start()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return best, peak
+
+
+def irradiance_cases(label, times):
+    """Single system stages on one time index."""
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        irradiance = Irradiance(PVSYSTEM, times)
+        irradiance.get_solar_pos_v()
+        irradiance.tmy = synthetic_tmy(
+            irradiance.times, irradiance.solar_pos["solar_altitude"]
+        )
+        irradiance.get_aoi()
+
+    def pipeline():
+        irradiance.get_solar_pos_v()
+        irradiance.get_aoi()
+        irradiance.get_poa_irradiance()
+
+    def pipeline_fast():
+        irradiance.get_solar_pos_v()
+        irradiance.get_poa_irradiance_fast()
+
+    n = len(irradiance.times)
+    yield "solar_position_vect", label, n, lambda: solar_position_vect(
+        irradiance.times, irradiance.lat, irradiance.lon
+    )
+    yield "get_aoi", label, n, irradiance.get_aoi
+    yield "get_poa_irradiance", label, n, irradiance.get_poa_irradiance
+    yield "get_poa_irradiance_fast", label, n, irradiance.get_poa_irradiance_fast
+    yield "pipeline", label, n, pipeline
+    yield "pipeline_fast", label, n, pipeline_fast
+
+
+def tier_cases(label, times, n_sites=(1, 100)):
+    """Solar position of each precision tier, for one site and a fleet."""
+
+    for tier, ephemeris in TIERS.items():
+        for n in n_sites:
+            lat = 52.01 if n == 1 else np.linspace(-60, 60, n)
+
+            def run(ephemeris=ephemeris, lat=lat):
+                ephemeris(times).solar_position(lat, PVSYSTEM.lon)
+
+            name = "solar_position_{}".format(tier)
+            yield name, "{}-{}sites".format(label, n), len(times) * n, run
+
+
+def scalar_case(times):
+    """The original per-timestamp solar_position."""
+
+    # julian_date expects nanosecond datetime64 scalars.
+    index = times.values.astype("datetime64[ns]")[:SCALAR_ROWS]
+
+    def run():
+        for t in index:
+            solar_position(t, PVSYSTEM.lat, PVSYSTEM.lon)
+
+    yield "solar_position", "{}-rows".format(len(index)), len(index), run
+
+
+def fleet_cases(n_sites):
+    """Fleet pipeline over one hourly year."""
+
+    times = pd.date_range("2015", periods=8760, freq="1h")
+    rng = np.random.default_rng(0)
+    with contextlib.redirect_stdout(io.StringIO()):
+        fleet = Fleet.from_arrays(
+            times,
+            latitude=rng.uniform(-60, 60, n_sites),
+            longitude=rng.uniform(-180, 180, n_sites),
+            surface_azimuth=rng.uniform(90, 270, n_sites),
+            surface_tilt=rng.uniform(0, 60, n_sites),
+        )
+    solar_pos = fleet.get_solar_pos_v()
+    sin_alt = np.clip(np.sin(np.radians(solar_pos["solar_altitude"])), 0, None)
+    fleet.set_tmy(1000 * sin_alt, 800 * (sin_alt > 0), 200 * sin_alt)
+
+    def pipeline():
+        fleet.get_solar_pos_v()
+        fleet.get_poa_irradiance_fast()
+
+    yield "fleet_pipeline", "1y-1h-{}sites".format(n_sites), 8760 * n_sites, pipeline
+
+
+def run(full=False, repeat=3):
+    periods = FULL_PERIODS if full else QUICK_PERIODS
+    sites = FULL_SITES if full else QUICK_SITES
+
+    cases = []
+    cases.extend(scalar_case(pd.date_range("2015", periods=SCALAR_ROWS, freq="1h")))
+    for label, n, freq in periods:
+        cases.extend(
+            irradiance_cases(label, pd.date_range("2015", periods=n, freq=freq))
+        )
+    for label, n, freq in periods[:2]:
+        cases.extend(tier_cases(label, pd.date_range("2015", periods=n, freq=freq)))
+    for n_sites in sites:
+        cases.extend(fleet_cases(n_sites))
+
+    results = {}
+    for name, label, n, func in cases:
+        seconds, peak = measure(func, repeat)
+        key = "{}[{}]".format(name, label)
+        results[key] = {
+            "rows": n,
+            "seconds": seconds,
+            "rows_per_second": n / seconds,
+            "peak_mb": peak / 1e6,
+        }
+        print(
+            "{:<45} {:>12.0f} rows/s {:>10.1f} MB".format(key, n / seconds, peak / 1e6),
+            flush=True,
+        )
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Lists the cases slower or heavier than the baseline."""
+
+    regressions = []
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        reference = baseline[key]
+        speed = result["rows_per_second"] / reference["rows_per_second"]
+        memory = result["peak_mb"] / max(reference["peak_mb"], 1e-3)
+        if speed < 1 - tolerance:
+            regressions.append("{}: throughput x{:.2f}".format(key, speed))
+        if memory > 1 + tolerance and result["peak_mb"] > 1:
+            regressions.append("{}: peak memory x{:.2f}".format(key, memory))
+
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[1])
+    parser.add_argument("--quick", action="store_true", help="small cases only")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--save", metavar="PATH", help="write results as json")
+    parser.add_argument("--baseline", metavar="PATH", help="json to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    args = parser.parse_args(argv)
+
+    results = run(full=not args.quick, repeat=args.repeat)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print("REGRESSION", regression)
+        return 1 if regressions else 0
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
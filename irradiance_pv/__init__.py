@@ -0,0 +1,71 @@
+# irradiance pv package
+
+"""
+Calculate the plane-of-array irradiance of photovoltaic systems.
+
+    >>> from irradiance_pv import PVSystem, Irradiance
+
+The names below are loaded from their modules on first access, so that
+importing the package stays cheap: pandas, numpy and requests are only
+imported when a class or function that needs them is used.
+"""
+
+import importlib
+
+__version__ = "1.27"
+
+# Public name -> module defining it.
+_EXPORTS = {
+    "PVSystem": "irradiance_pv",
+    "Irradiance": "irradiance_pv",
+    "poa_irradiance_array": "irradiance_pv",
+    "daylight_mask": "irradiance_pv",
+    "SparsePOA": "irradiance_pv",
+    "Fleet": "fleet",
+    "Executor": "parallel",
+    "Grid": "grid",
+    "Geometry": "transposition",
+    "transpose": "transposition",
+    "orientation_sweep": "sweep",
+    "optimum_orientation": "sweep",
+    "Ephemeris": "spa_sb",
+    "solar_position": "spa_sb",
+    "solar_position_vect": "spa_sb",
+    "solar_position_array": "spa_sb",
+    "solar_position_interp": "spa_sb",
+    "LowOrderEphemeris": "solar_tiers",
+    "SPAEphemeris": "solar_tiers",
+    "solar_ephemeris": "solar_tiers",
+    "PVGISFetcher": "tmy",
+    "DirectoryFetcher": "tmy",
+    "TMYCache": "tmy",
+    "download_tmy": "tmy",
+    "read_tmy": "tmy",
+    "align_tmy": "tmy",
+    "clear_sky": "clearsky",
+    "ClearSkyFetcher": "clearsky",
+    "Aggregator": "aggregate",
+    "ResultWriter": "export",
+    "read_results": "export",
+    "POAService": "service",
+    "timers": "timing",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+
+    if name not in _EXPORTS:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+
+    module = importlib.import_module("." + _EXPORTS[name], __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+
+    return value
+
+
+def __dir__():
+
+    return sorted(list(globals()) + __all__)
@@ -0,0 +1,207 @@
+# irradiance pv aggregate module
+
+"""
+Streaming reductions of the irradiance results.
+
+An Aggregator is fed consecutive chunks of a simulation and keeps, per
+period and column (and per site for fleet results), the running sum,
+maximum and optionally a histogram, so the full time series never needs
+to be held in memory:
+
+    >>> aggregator = Aggregator(["POA"], freq="M", percentiles=[95])
+    >>> for chunk in irradiance.iter_chunks():
+    ...     aggregator.update(chunk.index, chunk)
+    >>> aggregator.result()
+
+Percentiles are estimated from the histogram, within the width of its
+bins (5 W/m2 by default).
+"""
+
+import numpy as np
+import pandas as pd
+
+from .irradiance_pv import step_hours
+
+# Histogram bins of the percentile estimates, in W/m2.
+DEFAULT_BINS = np.arange(0, 1505, 5.0)
+
+# Columns in W/m2, the only ones with an "energy" statistic.
+IRRADIANCE_COLUMNS = ["POA", "E_b_poa", "E_g_poa", "E_d_poa", "GHI", "DNI", "DHI"]
+
+
+class Aggregator:
+    """Accumulates statistics of result columns over periods.
+
+    Parameters
+    ----------
+    columns : list of string
+        Columns of the chunks to reduce, e.g. "POA".
+    freq : string, optional
+        Period alias (e.g. "M" or "D") of the statistics, over the whole
+        simulation if None. Periods are taken in UTC.
+    percentiles : list of float, optional
+        Percentiles (0 to 100) to estimate.
+    bins : array-like, optional
+        Edges of the histogram used for the percentiles, values outside
+        fall in the first or last bin. Defaults to DEFAULT_BINS.
+    step_hours : float, optional
+        Duration of a time step, defaults to the median spacing of the
+        first chunk.
+    sites : list, optional
+        Labels of the second axis of 2-D (time x site) chunks.
+    """
+
+    def __init__(
+        self, columns, freq=None, percentiles=(), bins=None, step_hours=None, sites=None
+    ):
+
+        self.columns = list(columns)
+        self.freq = freq
+        self.percentiles = list(percentiles)
+        self.bins = DEFAULT_BINS if bins is None else np.asarray(bins, dtype=float)
+        self.step_hours = step_hours
+        self.sites = sites
+        self.periods = {}
+        self._irradiance = np.isin(self.columns, IRRADIANCE_COLUMNS)
+
+    def _segments(self, times):
+        """Period labels of times, as (label, slice) of consecutive rows."""
+
+        if self.freq is None:
+            return [("total", slice(None))]
+
+        times = pd.DatetimeIndex(times)
+        if times.tz is not None:
+            times = times.tz_convert("UTC").tz_localize(None)
+        labels = times.to_period(self.freq)
+
+        starts = np.flatnonzero(labels[1:] != labels[:-1]) + 1
+        bounds = [0] + list(starts) + [len(labels)]
+
+        return [(labels[a], slice(a, b)) for a, b in zip(bounds[:-1], bounds[1:])]
+
+    def update(self, times, data):
+        """Adds a chunk of consecutive time steps.
+
+        Parameters
+        ----------
+        times : DatetimeIndex
+            Time of each row of the chunk.
+        data : dataframe or dict of arrays
+            The columns, each of shape (time,) or (time x site).
+        """
+
+        if not len(times):
+            return
+
+        if self.step_hours is None:
+            self.step_hours = step_hours(pd.DatetimeIndex(times))
+
+        # (column, time, ...)
+        values = np.stack([np.asarray(data[c], dtype=float) for c in self.columns])
+        n_bins = len(self.bins) - 1
+
+        for label, rows in self._segments(times):
+            block = values[:, rows]
+            stats = self.periods.get(label)
+            if stats is None:
+                shape = block.shape[:1] + block.shape[2:]
+                stats = self.periods[label] = {
+                    "sum": np.zeros(shape),
+                    "count": 0,
+                    "max": np.full(shape, -np.inf),
+                }
+                if self.percentiles:
+                    stats["hist"] = np.zeros(shape + (n_bins,), dtype=np.int64)
+
+            stats["sum"] += block.sum(axis=1)
+            stats["count"] += block.shape[1]
+            np.maximum(stats["max"], block.max(axis=1), out=stats["max"])
+
+            if self.percentiles:
+                index = np.searchsorted(self.bins, block, side="right") - 1
+                np.clip(index, 0, n_bins - 1, out=index)
+                # flat bin of every value, keeping the column and site axes.
+                cells = np.arange(np.prod(stats["sum"].shape)).reshape(
+                    stats["sum"].shape
+                )
+                index += np.expand_dims(cells, 1) * n_bins
+                stats["hist"] += np.bincount(
+                    index.ravel(), minlength=cells.size * n_bins
+                ).reshape(stats["hist"].shape)
+
+    def _percentile(self, hist, q):
+        """Percentile q of the values counted in hist (..., bins), by
+        linear interpolation within the bins."""
+
+        cumulative = np.cumsum(hist, axis=-1)
+        target = q / 100 * cumulative[..., -1:]
+        b = np.minimum((cumulative < target).sum(axis=-1), hist.shape[-1] - 1)
+
+        before = np.take_along_axis(cumulative - hist, b[..., None], -1)[..., 0]
+        inside = np.take_along_axis(hist, b[..., None], -1)[..., 0]
+        fraction = np.divide(
+            target[..., 0] - before,
+            inside,
+            out=np.zeros(b.shape),
+            where=inside > 0,
+        )
+        width = np.diff(self.bins)
+
+        return self.bins[b] + np.clip(fraction, 0, 1) * width[b]
+
+    def result(self):
+        """Statistics of the chunks seen so far.
+
+        Return
+        ------
+        A dataframe indexed by period (and by site for 2-D chunks), with
+        MultiIndex columns (column, statistic). The statistics are
+        "energy" (sum x step in [kWh/m2], NaN for the columns that are not
+        in IRRADIANCE_COLUMNS, e.g. aoi), "mean", "max" and one "p<q>" per
+        percentile.
+        """
+
+        rows = []
+        for label, stats in self.periods.items():
+            irradiance = self._irradiance.reshape(
+                (-1,) + (1,) * (stats["sum"].ndim - 1)
+            )
+            table = {
+                "energy": np.where(
+                    irradiance, stats["sum"] * self.step_hours / 1000, np.nan
+                ),
+                "mean": stats["sum"] / stats["count"],
+                "max": stats["max"],
+            }
+            for q in self.percentiles:
+                table["p{:g}".format(q)] = self._percentile(stats["hist"], q)
+            rows.append(table)
+
+        statistics = list(rows[0]) if rows else ["energy", "mean", "max"]
+        columns = pd.MultiIndex.from_product(
+            [self.columns, statistics], names=["quantity", "statistic"]
+        )
+        periods = pd.Index(list(self.periods), name="period")
+
+        if not rows or np.ndim(rows[0]["energy"]) == 1:
+            values = [
+                [table[s][c] for c in range(len(self.columns)) for s in statistics]
+                for table in rows
+            ]
+            return pd.DataFrame(values, index=periods, columns=columns)
+
+        n_sites = rows[0]["energy"].shape[1]
+        sites = self.sites if self.sites is not None else range(n_sites)
+        values = np.concatenate(
+            [
+                np.stack(
+                    [table[s][c] for c in range(len(self.columns)) for s in statistics],
+                    axis=1,
+                )
+                for table in rows
+            ]
+        )
+        index = pd.MultiIndex.from_product([periods, sites], names=["period", "site"])
+
+        return pd.DataFrame(values, index=index, columns=columns)
@@ -0,0 +1,279 @@
+# irradiance pv clearsky module
+
+"""
+Clear-sky irradiance models, a network-free source of GHI, DNI and DHI.
+
+The models take the solar zenith already computed by the solar position
+stage, with inputs broadcasting against each other, so any number of
+sites is evaluated in one call on (time x site) arrays:
+
+    >>> irradiance.get_solar_pos_v()
+    >>> irradiance.get_clearsky("ineichen", linke_turbidity=3.5)
+    >>> irradiance.poa
+
+ClearSkyFetcher wraps a model as a TMY fetcher (see tmy), for the
+batch runner and the service. Each model is a function
+model(solar_zenith, dni_extra, altitude, **params) returning the tuple
+(ghi, dni, dhi), registered in MODELS.
+"""
+
+import numpy as np
+import pandas as pd
+
+from .spa_sb import Ephemeris
+from .transposition import extraterrestrial_irradiance, relative_airmass
+
+
+def _cos_zenith(solar_zenith):
+
+    return np.cos(np.radians(np.asarray(solar_zenith, dtype=float)))
+
+
+def _pressure_ratio(altitude):
+    """Ratio of the standard atmosphere pressure at altitude [m] to the
+    sea level one."""
+
+    return (1 - 2.25577e-5 * np.asarray(altitude, dtype=float)) ** 5.25588
+
+
+def erbs(ghi, solar_zenith, dni_extra):
+    """Splits the global horizontal irradiance into its direct normal and
+    diffuse components with the Erbs et al. (1982) diffuse fraction.
+
+    Return
+    ------
+    A tuple of arrays (dni, dhi).
+    """
+
+    cos_zenith = _cos_zenith(solar_zenith)
+    ghi = np.asarray(ghi, dtype=float)
+
+    # clearness index, limited at low sun as the horizontal
+    # extraterrestrial irradiance vanishes.
+    kt = np.clip(ghi / (dni_extra * np.maximum(cos_zenith, 0.065)), 0, 1)
+    fraction = np.where(
+        kt <= 0.22,
+        1 - 0.09 * kt,
+        np.where(
+            kt <= 0.8,
+            0.9511 - 0.1604 * kt + 4.388 * kt**2 - 16.638 * kt**3 + 12.336 * kt**4,
+            0.165,
+        ),
+    )
+    dhi = fraction * ghi
+    dni = np.where(cos_zenith > 0.065, (ghi - dhi) / np.maximum(cos_zenith, 0.065), 0)
+
+    return dni, dhi
+
+
+def haurwitz(solar_zenith, dni_extra, altitude=0.0):
+    """Haurwitz (1945) clear-sky global irradiance, split into DNI and
+    DHI with erbs. Only depends on the solar zenith."""
+
+    cos_zenith = _cos_zenith(solar_zenith)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        ghi = np.where(
+            cos_zenith > 0, 1098 * cos_zenith * np.exp(-0.059 / cos_zenith), 0.0
+        )
+    dni, dhi = erbs(ghi, solar_zenith, dni_extra)
+
+    return ghi, dni, dhi
+
+
+def ineichen(solar_zenith, dni_extra, altitude=0.0, linke_turbidity=3.0):
+    """Ineichen and Perez (2002) clear-sky model.
+
+    Parameters
+    ----------
+    linke_turbidity : float or array-like
+        Linke turbidity factor, about 2 (very clear) to 6 (hazy).
+    """
+
+    cos_zenith = _cos_zenith(solar_zenith)
+    altitude = np.asarray(altitude, dtype=float)
+    tl = np.asarray(linke_turbidity, dtype=float)
+    airmass = relative_airmass(solar_zenith) * _pressure_ratio(altitude)
+
+    fh1 = np.exp(-altitude / 8000)
+    fh2 = np.exp(-altitude / 1250)
+    cg1 = 5.09e-5 * altitude + 0.868
+    cg2 = 3.92e-5 * altitude + 0.0387
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        ghi = (
+            cg1
+            * dni_extra
+            * cos_zenith
+            * np.exp(-cg2 * airmass * (fh1 + fh2 * (tl - 1)))
+        )
+
+        b = 0.664 + 0.163 / fh1
+        dni = b * dni_extra * np.exp(-0.09 * airmass * (tl - 1))
+        # the beam cannot exceed what the global irradiance allows.
+        limit = (1 - (0.1 - 0.2 * np.exp(-tl)) / (0.1 + 0.882 / fh1)) / cos_zenith
+        dni = np.minimum(dni, ghi * np.clip(limit, 0, 1e20))
+
+    up = cos_zenith > 0
+    ghi = np.where(up, np.nan_to_num(ghi), 0.0)
+    dni = np.where(up, np.nan_to_num(dni), 0.0)
+    dhi = np.maximum(ghi - dni * cos_zenith, 0)
+
+    return ghi, dni, dhi
+
+
+def simplified_solis(
+    solar_zenith, dni_extra, altitude=0.0, aod700=0.1, precipitable_water=1.0
+):
+    """Simplified Solis clear-sky model (Ineichen, 2008).
+
+    Parameters
+    ----------
+    aod700 : float or array-like
+        Aerosol optical depth at 700 nm.
+    precipitable_water : float or array-like
+        Atmospheric water content in cm, at least 0.2.
+    """
+
+    elevation = 90 - np.asarray(solar_zenith, dtype=float)
+    sin_elevation = np.sin(np.radians(np.maximum(elevation, 0)))
+    aod = np.asarray(aod700, dtype=float)
+    w = np.maximum(np.asarray(precipitable_water, dtype=float), 0.2)
+    log_w = np.log(w)
+    log_p = np.log(_pressure_ratio(altitude))
+
+    # enhanced extraterrestrial irradiance
+    i0p = dni_extra * (
+        0.12 * w**0.56 * aod**2 + 0.97 * w**0.032 * aod + 1.08 * w**0.0051
+    )
+    i0p = i0p + dni_extra * 0.071 * log_p
+
+    # beam
+    taub = (
+        (1.82 + 0.056 * log_w + 0.0071 * log_w**2) * aod
+        + 0.33
+        + 0.045 * log_w
+        + 0.0096 * log_w**2
+        + (0.0089 * w + 0.13) * log_p
+    )
+    b = (0.00925 * aod**2 + 0.0148 * aod - 0.0172) * log_w + (
+        -0.7565 * aod**2 + 0.5057 * aod + 0.4557
+    )
+
+    # global
+    taug = (
+        (1.24 + 0.047 * log_w + 0.0061 * log_w**2) * aod
+        + 0.27
+        + 0.043 * log_w
+        + 0.0090 * log_w**2
+        + (0.0079 * w + 0.1) * log_p
+    )
+    g = -0.0147 * log_w - 0.3079 * aod**2 + 0.2846 * aod + 0.3798
+
+    # diffuse
+    clean = aod < 0.05
+    td4 = np.where(clean, 86 * w - 13800, -0.21 * w + 11.6)
+    td3 = np.where(clean, -3.11 * w + 79.4, 0.27 * w - 20.7)
+    td2 = np.where(clean, -0.23 * w + 74.8, -0.134 * w + 15.5)
+    td1 = np.where(clean, 0.092 * w - 8.86, 0.0554 * w - 5.71)
+    td0 = np.where(clean, 0.0042 * w + 3.12, 0.0057 * w + 2.94)
+    tdp = np.where(clean, -0.83 * (1 + aod) ** -17.2, -0.71 * (1 + aod) ** -15.0)
+    taud = td4 * aod**4 + td3 * aod**3 + td2 * aod**2 + td1 * aod + td0 + tdp * log_p
+    d = -0.337 * aod**2 + 0.63 * aod + 0.116 + log_p / (18 + 152 * aod)
+
+    up = elevation > 0
+    with np.errstate(divide="ignore", over="ignore", invalid="ignore"):
+        dni = i0p * np.exp(-taub / sin_elevation**b)
+        ghi = i0p * np.exp(-taug / sin_elevation**g) * sin_elevation
+        dhi = i0p * np.exp(-taud / sin_elevation**d)
+
+    return tuple(np.where(up, np.nan_to_num(x), 0.0) for x in (ghi, dni, dhi))
+
+
+# Registry of the clear-sky models by name.
+MODELS = {
+    "haurwitz": haurwitz,
+    "ineichen": ineichen,
+    "simplified_solis": simplified_solis,
+}
+
+
+def clear_sky(solar_zenith, times, model="ineichen", altitude=0.0, **params):
+    """Clear-sky irradiance for a solar zenith series or (time x site)
+    array, see MODELS.
+
+    Parameters
+    ----------
+    solar_zenith : array-like
+        Solar zenith in degrees, shaped (time,) or (time x site).
+    times : DateTimeIndex
+        Times of the first axis, for the extraterrestrial irradiance.
+    model : string or callable
+        Name of a model of MODELS, or a model function.
+    altitude : float or array-like
+        Site elevation in meters, e.g. one per site.
+    **params
+        Parameters of the model, e.g. linke_turbidity for ineichen.
+
+    Return
+    ------
+    A dict of arrays shaped like solar_zenith, with the keys "GHI",
+    "DNI", "DHI" in [W/m2].
+    """
+
+    if not callable(model):
+        if model not in MODELS:
+            raise ValueError(
+                "model must be one of {}, got {!r}".format(list(MODELS), model)
+            )
+        model = MODELS[model]
+
+    solar_zenith = np.asarray(solar_zenith, dtype=float)
+    dni_extra = extraterrestrial_irradiance(times).reshape(
+        (-1,) + (1,) * (solar_zenith.ndim - 1)
+    )
+    ghi, dni, dhi = model(solar_zenith, dni_extra, altitude, **params)
+
+    shape = solar_zenith.shape
+    return {
+        "GHI": np.broadcast_to(ghi, shape),
+        "DNI": np.broadcast_to(dni, shape),
+        "DHI": np.broadcast_to(dhi, shape),
+    }
+
+
+class ClearSkyFetcher:
+    """TMY fetcher returning a clear-sky typical year instead of
+    downloading it, so Fleet.get_TMY_file, the batch runner and the
+    service can run offline. It is elevation_dependent: tmy.fetch_tmy
+    and tmy.download_tmy pass the elevation of the systems.
+
+    Parameters
+    ----------
+    model : string or callable
+        Clear-sky model, see clear_sky.
+    year : int
+        Non-leap year whose hours make the typical year.
+    **params
+        Parameters of the model.
+    """
+
+    elevation_dependent = True
+
+    def __init__(self, model="ineichen", year=2015, **params):
+
+        self.model = model
+        self.params = params
+        self.times = pd.date_range(str(year), periods=8760, freq="1h")
+        self.ephemeris = Ephemeris(self.times)
+
+    def fetch(self, lat, lon, startyear=None, endyear=None, elevation=0.0):
+
+        _, solar_zenith, _ = self.ephemeris.solar_position(lat, lon)
+        irradiance = clear_sky(
+            solar_zenith, self.times, self.model, elevation, **self.params
+        )
+
+        df_tmy = pd.DataFrame(irradiance)
+        df_tmy.insert(0, "time_pvgis", self.times.strftime("%Y%m%d:%H%M"))
+
+        return df_tmy
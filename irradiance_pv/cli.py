@@ -0,0 +1,273 @@
+# irradiance pv command line
+
+"""
+Batch runner transposing the TMY irradiance of a list of sites to
+plane-of-array irradiance, in a single process:
+
+    $ irradiance-pv sites.csv --start 2015 --end 2016 --output poa.csv
+
+The site list is a csv file, or a json list of objects, with the fields
+name, lat, lon, tilt, azimuth and optionally elevation (the PVSystem
+argument names latitude, longitude, surface_tilt, surface_azimuth are also
+accepted). Sites are processed in batches: the TMY data of a batch is
+downloaded concurrently, evaluated as a Fleet and appended to the output
+in long format, one row per time step and site. Outputs named .parquet,
+.arrow or .npz are written in that columnar format instead of csv.
+"""
+
+import argparse
+import csv
+import json
+import os
+import sys
+
+# Models of clearsky.MODELS, listed here so that parsing the arguments
+# does not import the numerical stack.
+CLEARSKY_MODELS = ("haurwitz", "ineichen", "simplified_solis")
+
+# Field names accepted for each PVSystem argument.
+SITE_FIELDS = {
+    "name": ("name",),
+    "latitude": ("lat", "latitude"),
+    "longitude": ("lon", "longitude"),
+    "surface_tilt": ("tilt", "surface_tilt"),
+    "surface_azimuth": ("azimuth", "surface_azimuth"),
+    "elevation": ("elevation", "elev"),
+}
+
+
+def _field(record, argument):
+    for field in SITE_FIELDS[argument]:
+        if record.get(field) not in (None, ""):
+            return record[field]
+    if argument == "elevation":
+        return 0
+    raise ValueError(
+        "site {} has no {} field".format(record, " or ".join(SITE_FIELDS[argument]))
+    )
+
+
+def read_sites(path):
+    """Reads a csv or json site list.
+
+    Return
+    ------
+    A list of PVSystem.
+    """
+
+    from .irradiance_pv import PVSystem
+
+    with open(path, newline="") as f:
+        if path.endswith(".json"):
+            records = json.load(f)
+        else:
+            records = list(csv.DictReader(f))
+
+    return [
+        PVSystem(
+            name=str(_field(record, "name")),
+            latitude=float(_field(record, "latitude")),
+            longitude=float(_field(record, "longitude")),
+            surface_azimuth=float(_field(record, "surface_azimuth")),
+            surface_tilt=float(_field(record, "surface_tilt")),
+            elevation=float(_field(record, "elevation")),
+        )
+        for record in records
+    ]
+
+
+def add_source_arguments(parser):
+    """Adds the options selecting the TMY source to an argument parser,
+    see source_fetcher."""
+
+    parser.add_argument("--startyear", type=int, default=2006)
+    parser.add_argument("--endyear", type=int, default=2015)
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument(
+        "--tmy-dir", help="read PVGIS json files from this directory (offline)"
+    )
+    source.add_argument(
+        "--clearsky",
+        choices=CLEARSKY_MODELS,
+        help="use a clear-sky model instead of TMY data (offline)",
+    )
+    parser.add_argument("--cache", help="directory of the local TMY cache")
+
+
+def source_fetcher(parser, args):
+    """TMY fetcher selected by the options of add_source_arguments, None
+    for PVGIS."""
+
+    from .clearsky import ClearSkyFetcher
+    from .tmy import DirectoryFetcher, TMYCache
+
+    if args.clearsky:
+        if args.cache:
+            parser.error("argument --cache: not allowed with argument --clearsky")
+        return ClearSkyFetcher(args.clearsky)
+
+    fetcher = DirectoryFetcher(args.tmy_dir) if args.tmy_dir else None
+    if args.cache:
+        fetcher = TMYCache(args.cache, fetcher=fetcher)
+
+    return fetcher
+
+
+def _evaluate(
+    pvsystems, times, fetcher, startyear, endyear, batch_size, max_workers, failed
+):
+    """Evaluates the sites by batches, the TMY errors are appended to
+    failed.
+
+    Yields
+    ------
+    One dict of long-format columns per batch.
+    """
+
+    import numpy as np
+
+    from .fleet import Fleet
+    from .spa_sb import Ephemeris
+    from .tmy import download_tmy
+
+    # The site-independent solar terms are shared by all the batches.
+    ephemeris = Ephemeris(times)
+
+    for start in range(0, len(pvsystems), batch_size):
+        batch = pvsystems[start : start + batch_size]
+
+        tmys, errors = download_tmy(
+            batch,
+            fetcher=fetcher,
+            startyear=startyear,
+            endyear=endyear,
+            max_workers=max_workers,
+        )
+        for error in errors:
+            error.index += start
+            print(error, file=sys.stderr)
+        failed.extend(errors)
+
+        sites = [(p, tmy) for p, tmy in zip(batch, tmys) if tmy is not None]
+        if not sites:
+            continue
+
+        fleet = Fleet([p for p, _ in sites], times)
+        tmy = fleet.set_tmy_frames([df for _, df in sites])
+        fleet.get_solar_pos_v(ephemeris=ephemeris)
+        poa = fleet.get_poa_irradiance_fast()
+
+        n_times, n_sites = len(fleet.times), len(fleet)
+        columns = {
+            "time": np.repeat(fleet.times, n_sites),
+            "site": np.tile(np.asarray(fleet.names, dtype=object), n_times),
+        }
+        for key in ("GHI", "DNI", "DHI"):
+            columns[key] = tmy[key].ravel()
+        for key in ("POA", "E_b_poa", "E_g_poa", "E_d_poa"):
+            columns[key] = poa[key].ravel()
+
+        yield columns
+
+
+def run(
+    pvsystems,
+    times,
+    output,
+    fetcher=None,
+    startyear=2006,
+    endyear=2015,
+    batch_size=500,
+    max_workers=8,
+    dtype="float64",
+):
+    """Evaluates the sites by batches and appends the results to the file
+    output, csv or a columnar format of the export module (written with
+    dtype) depending on its extension.
+
+    Return
+    ------
+    The list of tmy.TMYFetchError of the sites that were skipped.
+    """
+
+    import pandas as pd
+
+    from .export import FORMATS, ResultWriter
+    from .irradiance_pv import _prepare_times
+
+    failed = []
+    batches = _evaluate(
+        pvsystems,
+        _prepare_times(times),
+        fetcher,
+        startyear,
+        endyear,
+        batch_size,
+        max_workers,
+        failed,
+    )
+
+    if os.path.splitext(output)[1].lower() in FORMATS:
+        with ResultWriter(output, dtype=dtype) as writer:
+            for columns in batches:
+                writer.write(columns, times=columns.pop("time"))
+    else:
+        header = True
+        for columns in batches:
+            pd.DataFrame(columns).to_csv(
+                output, mode="w" if header else "a", header=header, index=False
+            )
+            header = False
+
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="irradiance-pv", description=__doc__.split("\n\n")[0].strip()
+    )
+    parser.add_argument("sites", help="csv or json site list")
+    parser.add_argument(
+        "--output",
+        required=True,
+        help="file of results, .csv, .parquet, .arrow or .npz",
+    )
+    parser.add_argument("--start", default="2015", help="first time step (UTC)")
+    parser.add_argument("--end", default="2016", help="end of the period, excluded")
+    parser.add_argument("--freq", default="1h", help="time step, defaults to 1h")
+    add_source_arguments(parser)
+    parser.add_argument(
+        "--dtype",
+        default="float64",
+        choices=["float64", "float32"],
+        help="type of the values written to columnar files",
+    )
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--workers", type=int, default=8, help="concurrent downloads")
+    args = parser.parse_args(argv)
+    fetcher = source_fetcher(parser, args)
+
+    # The numerical stack is only imported once the arguments are valid.
+    import pandas as pd
+
+    times = pd.date_range(
+        start=args.start, end=args.end, freq=args.freq, inclusive="left"
+    )
+
+    failed = run(
+        read_sites(args.sites),
+        times,
+        args.output,
+        fetcher=fetcher,
+        startyear=args.startyear,
+        endyear=args.endyear,
+        batch_size=args.batch_size,
+        max_workers=args.workers,
+        dtype=args.dtype,
+    )
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
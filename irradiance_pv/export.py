@@ -0,0 +1,241 @@
+# irradiance pv export module
+
+"""
+Typed columnar export of the results, written chunk by chunk.
+
+    >>> with ResultWriter("poa.parquet", dtype="float32") as writer:
+    ...     for chunk in irradiance.iter_chunks():
+    ...         writer.write(chunk, columns=["POA"])
+
+The format follows the file extension:
+
+    .parquet           Parquet, requires pyarrow.
+    .arrow, .feather   Arrow IPC file, requires pyarrow.
+    .npz               NumPy zip archive, each chunk of each column is
+                       stored as a member "<column>/<chunk>", see
+                       read_results.
+
+Every file holds a "time" column (UTC timestamps) followed by the written
+columns. The float columns are cast to dtype, other columns (e.g. the
+site names of long-format fleet results) keep their type.
+"""
+
+import os
+import zipfile
+
+import numpy as np
+import pandas as pd
+
+FORMATS = {
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+    ".npz": "npz",
+}
+
+
+def _format(path, format):
+
+    if format is None:
+        format = FORMATS.get(os.path.splitext(str(path))[1].lower())
+    if format not in set(FORMATS.values()):
+        raise ValueError(
+            "unknown export format for {!r}, use one of {}".format(
+                str(path), sorted(set(FORMATS.values()))
+            )
+        )
+
+    return format
+
+
+def _pyarrow():
+
+    try:
+        import pyarrow
+    except ImportError as err:
+        raise ImportError(
+            "pyarrow is required to write Parquet and Arrow files, "
+            "install it or use the .npz format"
+        ) from err
+
+    return pyarrow
+
+
+class ResultWriter:
+    """Writes result columns to a columnar file, one chunk at a time.
+
+    Parameters
+    ----------
+    path : string
+        Output file, overwritten.
+    format : {"parquet", "arrow", "npz"}, optional
+        Guessed from the extension when None.
+    dtype : numpy dtype
+        Type of the float columns, float32 halves the file size.
+    """
+
+    def __init__(self, path, format=None, dtype=np.float64):
+
+        self.path = path
+        self.format = _format(path, format)
+        self.dtype = np.dtype(dtype)
+        self.schema = None
+        self.chunks = 0
+        self._writer = None
+
+        if self.format == "npz":
+            self._writer = zipfile.ZipFile(path, mode="w", allowZip64=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _columns(self, data, times, columns):
+        """Ordered dict of 1-D arrays to write, including time."""
+
+        if isinstance(data, pd.DataFrame):
+            if times is None:
+                times = data.index
+            if columns is None:
+                columns = list(data.columns)
+            get = data.__getitem__
+        else:
+            if columns is None:
+                columns = list(data)
+            get = data.get
+
+        if times is None:
+            raise ValueError("times must be given when data is not a dataframe")
+
+        times = pd.DatetimeIndex(times)
+        if times.tz is not None:
+            times = times.tz_convert("UTC").tz_localize(None)
+
+        arrays = {"time": times.values.astype("datetime64[ns]")}
+        for column in columns:
+            values = np.asarray(get(column))
+            if values.dtype.kind == "f":
+                values = values.astype(self.dtype, copy=False)
+            elif values.dtype.kind == "O":
+                values = values.astype(str)
+            if len(values) != len(times):
+                raise ValueError(
+                    "column {!r} has {} rows, times has {}".format(
+                        column, len(values), len(times)
+                    )
+                )
+            arrays[column] = values
+
+        return arrays
+
+    def write(self, data, times=None, columns=None):
+        """Appends a chunk of results.
+
+        Parameters
+        ----------
+        data : dataframe or dict of 1-D arrays
+            Results of consecutive time steps. A dict lets columns coming
+            from several objects be written without concatenating them.
+        times : DatetimeIndex, optional
+            Time of each row, defaults to the index of data.
+        columns : list of string, optional
+            Columns of data to write, defaults to all. Every chunk must
+            write the same columns.
+        """
+
+        arrays = self._columns(data, times, columns)
+
+        schema = [(key, value.dtype.kind) for key, value in arrays.items()]
+        if self.schema is None:
+            self.schema = schema
+        elif schema != self.schema:
+            raise ValueError("every chunk must write the same columns and types")
+
+        if self.format == "npz":
+            for key, values in arrays.items():
+                name = "{}/{:06d}.npy".format(key, self.chunks)
+                with self._writer.open(name, mode="w", force_zip64=True) as f:
+                    np.lib.format.write_array(f, values, allow_pickle=False)
+        else:
+            self._write_arrow(arrays)
+
+        self.chunks += 1
+
+    def _write_arrow(self, arrays):
+
+        pa = _pyarrow()
+        table = pa.table(
+            {
+                key: pa.array(
+                    values, type=pa.timestamp("ns", tz="UTC") if key == "time" else None
+                )
+                for key, values in arrays.items()
+            }
+        )
+
+        if self._writer is None:
+            if self.format == "parquet":
+                import pyarrow.parquet
+
+                self._writer = pyarrow.parquet.ParquetWriter(self.path, table.schema)
+            else:
+                import pyarrow.ipc
+
+                self._writer = pyarrow.ipc.new_file(self.path, table.schema)
+
+        self._writer.write_table(table)
+
+    def close(self):
+
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+def read_results(path, format=None, columns=None):
+    """Reads a file written by ResultWriter.
+
+    Return
+    ------
+    A dataframe indexed by time (naive UTC) with the written columns.
+    """
+
+    format = _format(path, format)
+
+    if format == "npz":
+        with np.load(path, allow_pickle=False) as data:
+            names = data.files
+            keys = list(dict.fromkeys(name.split("/")[0] for name in names))
+            if columns is not None:
+                keys = ["time"] + list(columns)
+            arrays = {
+                key: np.concatenate(
+                    [data[name] for name in names if name.split("/")[0] == key]
+                )
+                for key in keys
+            }
+        df = pd.DataFrame(arrays)
+    else:
+        _pyarrow()
+        if format == "parquet":
+            import pyarrow.parquet
+
+            table = pyarrow.parquet.read_table(
+                path, columns=None if columns is None else ["time"] + list(columns)
+            )
+        else:
+            import pyarrow.ipc
+
+            table = pyarrow.ipc.open_file(path).read_all()
+            if columns is not None:
+                table = table.select(["time"] + list(columns))
+        df = table.to_pandas()
+
+    # naive UTC, like the times of Irradiance and Fleet.
+    df = df.set_index(pd.DatetimeIndex(df.pop("time")))
+    if df.index.tz is not None:
+        df.index = df.index.tz_convert("UTC").tz_localize(None)
+
+    return df
@@ -0,0 +1,490 @@
+# irradiance pv fleet module
+
+"""
+Evaluate many PV systems sharing the same simulation period in a single
+vectorized pass. Results are 2-D arrays shaped (time x site), where the
+site axis follows the order of the systems passed to the Fleet.
+"""
+
+import pandas as pd
+import numpy as np
+
+from .clearsky import clear_sky
+from .irradiance_pv import (
+    PVSystem,
+    _prepare_times,
+    daylight_mask,
+    poa_irradiance_array,
+    poa_irradiance_sparse,
+    step_hours,
+)
+from .spa_sb import solar_position_fleet
+from .timing import timed
+from .tmy import (
+    TMY_HOURS,
+    TMYDownloadError,
+    align_values,
+    download_tmy,
+    typical_year_hours,
+)
+
+
+class Fleet:
+    """Represents a group of pv systems evaluated over one shared times
+    DateTimeIndex (assumed UTC). It mirrors the Irradiance workflow, but
+    every step is broadcast over all sites at once.
+
+    Parameters
+    ----------
+    pvsystems : list of PVSystem
+        Systems to be evaluated, defines the order of the site axis.
+    times : DateTimeIndex
+        Simulation period, shared by all systems.
+    """
+
+    def __init__(
+        self,
+        pvsystems,
+        times,
+    ):
+
+        self.times = _prepare_times(times)
+        self.pvsystems = list(pvsystems)
+
+        self.names = [pvsystem.name for pvsystem in self.pvsystems]
+        self.lat = np.array([pvsystem.lat for pvsystem in self.pvsystems], dtype=float)
+        self.lon = np.array([pvsystem.lon for pvsystem in self.pvsystems], dtype=float)
+        self.elev = np.array(
+            [pvsystem.elev for pvsystem in self.pvsystems], dtype=float
+        )
+        self.surface_azimuth = np.array(
+            [pvsystem.surface_azimuth for pvsystem in self.pvsystems], dtype=float
+        )
+        self.surface_tilt = np.array(
+            [pvsystem.surface_tilt for pvsystem in self.pvsystems], dtype=float
+        )
+
+        self.solar_pos = None
+        self.aoi = None
+        self.tmy = None
+
+    @classmethod
+    def from_arrays(
+        cls,
+        times,
+        latitude,
+        longitude,
+        surface_azimuth,
+        surface_tilt,
+        elevation=0,
+        names=None,
+    ):
+        """Creates a Fleet from arrays of system attributes, scalars are
+        broadcast to all sites. Systems are named by position unless
+        names are given."""
+
+        latitude, longitude, surface_azimuth, surface_tilt, elevation = (
+            np.broadcast_arrays(
+                *[
+                    np.atleast_1d(np.asarray(a, dtype=float))
+                    for a in (
+                        latitude,
+                        longitude,
+                        surface_azimuth,
+                        surface_tilt,
+                        elevation,
+                    )
+                ]
+            )
+        )
+
+        if names is None:
+            names = range(len(latitude))
+
+        pvsystems = [
+            PVSystem(
+                name=name,
+                latitude=lat,
+                longitude=lon,
+                surface_azimuth=azimuth,
+                surface_tilt=tilt,
+                elevation=elev,
+            )
+            for name, lat, lon, azimuth, tilt, elev in zip(
+                names, latitude, longitude, surface_azimuth, surface_tilt, elevation
+            )
+        ]
+
+        return cls(pvsystems, times)
+
+    def __len__(self):
+        return len(self.pvsystems)
+
+    def __repr__(self):
+        return "Fleet of {} PV Systems over {} time steps".format(
+            len(self), len(self.times)
+        )
+
+    def set_tmy(self, ghi, dni, dhi):
+        """Sets the irradiance components of every site.
+
+        Parameters
+        ----------
+        ghi, dni, dhi : array-like
+            Irradiance in [W/m2], shaped (time x site). 1-D arrays are
+            shared by all sites.
+        """
+
+        shape = (len(self.times), len(self))
+        self.tmy = {
+            key: np.broadcast_to(
+                np.asarray(value, dtype=float).reshape(len(self.times), -1), shape
+            )
+            for key, value in (("GHI", ghi), ("DNI", dni), ("DHI", dhi))
+        }
+
+        return self.tmy
+
+    def get_TMY_file(self, startyear=2006, endyear=2015, fetcher=None, max_workers=8):
+        """Retrieves the PVGIS Typical Meteorological Year of every site
+        concurrently, see tmy.download_tmy and Irradiance.get_TMY_file.
+
+        Raises
+        ------
+        tmy.TMYDownloadError
+            Once all the downloads are finished, if any site could not be
+            retrieved. Its errors attribute holds the tmy.TMYFetchError
+            of every failing site.
+
+        Return
+        ------
+        A dict of (time x site) arrays with keys "GHI", "DNI" and "DHI".
+        """
+
+        frames, errors = download_tmy(
+            self.pvsystems,
+            fetcher=fetcher,
+            startyear=startyear,
+            endyear=endyear,
+            max_workers=max_workers,
+        )
+        if errors:
+            raise TMYDownloadError(errors, len(self))
+
+        return self.set_tmy_frames(frames)
+
+    def set_tmy_frames(self, frames, interpolate=True):
+        """Sets the irradiance of every site from one TMY dataframe per
+        site. Typical years of 8760 hours are aligned onto times by day of
+        year and hour, see tmy.align_tmy.
+
+        Parameters
+        ----------
+        frames : list of dataframe
+            TMY data with the columns "GHI", "DNI" and "DHI", in the order
+            of the sites.
+        interpolate : bool
+            Interpolate between hours for sub-hourly times.
+        """
+
+        hours = typical_year_hours(self.times)
+
+        arrays = []
+        for key in ("GHI", "DNI", "DHI"):
+            values = np.column_stack(
+                [frame[key].to_numpy(dtype=float) for frame in frames]
+            )
+            if len(values) == TMY_HOURS:
+                values = align_values(values, hours, interpolate)
+            elif len(values) != len(self.times):
+                raise ValueError(
+                    "TMY data has {} rows, times has {}".format(
+                        len(values), len(self.times)
+                    )
+                )
+            arrays.append(values)
+
+        return self.set_tmy(*arrays)
+
+    def get_clearsky(self, model="ineichen", **params):
+        """Sets the clear-sky irradiance of every site in one call, from
+        the solar zenith of get_solar_pos_v, see Irradiance.get_clearsky.
+
+        Parameters
+        ----------
+        model : string or callable
+            Clear-sky model of clearsky.MODELS, defaults to "ineichen".
+        **params
+            Parameters of the model, scalars or arrays broadcasting
+            against (time x site), e.g. one linke_turbidity per site.
+
+        Return
+        ------
+        A dict of (time x site) arrays with keys "GHI", "DNI" and "DHI".
+        """
+
+        irradiance = clear_sky(
+            self.solar_pos["solar_zenith"], self.times, model, self.elev, **params
+        )
+
+        return self.set_tmy(irradiance["GHI"], irradiance["DNI"], irradiance["DHI"])
+
+    def get_solar_pos_v(self, ephemeris=None):
+        """Calculates the position of the sun for every site, see
+        Irradiance.get_solar_pos_v.
+
+        Parameters
+        ----------
+        ephemeris : spa_sb.Ephemeris, optional
+            Site-independent terms computed for the same times.
+
+        Returns
+        -------
+        A dict of (time x site) arrays with keys :
+        - solar_altitude
+        - solar_zenith
+        - solar_azimuth
+        """
+
+        altitude, zenith, azimuth = solar_position_fleet(
+            self.times, self.lat, self.lon, ephemeris=ephemeris
+        )
+        self.solar_pos = {
+            "solar_altitude": altitude,
+            "solar_zenith": zenith,
+            "solar_azimuth": azimuth,
+        }
+
+        return self.solar_pos
+
+    @timed("aoi")
+    def get_aoi(self):
+        """Calculates the Angle of Incidence (AOI) of every site, in degrees,
+        see Irradiance.get_aoi.
+
+        Returns
+        -------
+        A (time x site) array.
+        """
+
+        theta_A = np.radians(self.solar_pos["solar_azimuth"])  # azimuth
+        theta_Z = np.radians(self.solar_pos["solar_zenith"])  # zenith
+        theta_T = np.radians(self.surface_tilt)  # surface tilt
+        theta_A_array = np.radians(self.surface_azimuth)  # surface azimuth
+
+        c_zenith_cos = np.cos(theta_Z) * np.cos(theta_T)
+        c_zenith_sin = (
+            np.sin(theta_Z) * np.sin(theta_T) * np.cos(theta_A - theta_A_array)
+        )
+
+        self.aoi = np.degrees(np.arccos(c_zenith_cos + c_zenith_sin))
+
+        return self.aoi
+
+    @timed("poa")
+    def get_poa_irradiance(self):
+        """Calculates plane-of-array irradiance and its components for
+        every site, see Irradiance.get_poa_irradiance.
+
+        Return
+        ------
+        A dict of (time x site) arrays with keys :
+            "POA" : Total Plane of array irradiance.
+            "E_b_poa" : Beam component of poa irradiance.
+            "E_g_poa" : Ground reflected component of poa irradiance.
+            "E_d_poa" : Diffue component of poa irradiance.
+        """
+
+        ghi = self.tmy["GHI"]
+        dni = self.tmy["DNI"]
+        dhi = self.tmy["DHI"]
+        albedo = 0.16  # Urban environement is 0.14 - 0.22
+
+        cos_tilt = np.cos(np.radians(self.surface_tilt))
+
+        E_b_poa = dni * np.cos(np.radians(self.aoi))
+        E_g_poa = ghi * albedo * ((1 - cos_tilt) / 2)
+        E_d_poa = dhi * ((1 + cos_tilt) / 2) + ghi * (
+            (0.012 * self.solar_pos["solar_zenith"] * (1 - cos_tilt)) / 2
+        )
+
+        # remove negative values, missing values are also set to 0.
+        poa = {}
+        for key, value in (
+            ("E_b_poa", E_b_poa),
+            ("E_g_poa", E_g_poa),
+            ("E_d_poa", E_d_poa),
+        ):
+            poa[key] = np.where(value > 0, value, 0.0)
+
+        poa["POA"] = poa["E_b_poa"] + poa["E_g_poa"] + poa["E_d_poa"]
+
+        return {key: poa[key] for key in ("POA", "E_b_poa", "E_g_poa", "E_d_poa")}
+
+    def get_poa_irradiance_fast(self):
+        """Calculates the angle of incidence and the plane-of-array
+        irradiance of every site in one fused pass, see
+        poa_irradiance_array. The aoi attribute is also updated.
+
+        Return
+        ------
+        A dict of (time x site) arrays, see get_poa_irradiance.
+        """
+
+        aoi, poa, E_b_poa, E_g_poa, E_d_poa = poa_irradiance_array(
+            self.solar_pos["solar_zenith"],
+            self.solar_pos["solar_azimuth"],
+            self.surface_tilt,
+            self.surface_azimuth,
+            self.tmy["GHI"],
+            self.tmy["DNI"],
+            self.tmy["DHI"],
+        )
+        self.aoi = aoi
+
+        return {"POA": poa, "E_b_poa": E_b_poa, "E_g_poa": E_g_poa, "E_d_poa": E_d_poa}
+
+    def get_poa_irradiance_daylight(self, horizon=0.0):
+        """Calculates the angle of incidence and the plane-of-array
+        irradiance of every site on its daylight time steps only, see
+        Irradiance.get_poa_irradiance_daylight.
+
+        Return
+        ------
+        A SparsePOA of shape (time x site).
+        """
+
+        mask = daylight_mask(self.solar_pos["solar_altitude"], horizon)
+
+        return poa_irradiance_sparse(
+            mask,
+            self.solar_pos["solar_zenith"],
+            self.solar_pos["solar_azimuth"],
+            self.surface_tilt,
+            self.surface_azimuth,
+            self.tmy["GHI"],
+            self.tmy["DNI"],
+            self.tmy["DHI"],
+        )
+
+    def aggregate(
+        self,
+        freq=None,
+        columns=("POA",),
+        percentiles=(),
+        bins=None,
+        chunk_size=None,
+    ):
+        """Statistics of the plane-of-array irradiance of every site,
+        reduced chunk by chunk, see Irradiance.aggregate. The solar
+        position and the results are only evaluated for one chunk of time
+        steps at a time. Requires the TMY data.
+
+        Parameters
+        ----------
+        columns : list of string
+            Keys of get_poa_irradiance_fast to reduce, or "aoi".
+        chunk_size : int, optional
+            Time steps per chunk, defaults to about one million values
+            per column.
+
+        Return
+        ------
+        A dataframe indexed by (period, site) with MultiIndex columns
+        (column, statistic).
+        """
+
+        from .aggregate import Aggregator
+        from .spa_sb import Ephemeris
+
+        if chunk_size is None:
+            chunk_size = max(1, 2**20 // max(1, len(self)))
+
+        aggregator = Aggregator(
+            columns,
+            freq=freq,
+            percentiles=percentiles,
+            bins=bins,
+            step_hours=step_hours(self.times),
+            sites=self.names,
+        )
+
+        for start in range(0, len(self.times), chunk_size):
+            rows = slice(start, start + chunk_size)
+            _, zenith, azimuth = Ephemeris(self.times[rows]).solar_position(
+                self.lat, self.lon
+            )
+            aoi, *poa = poa_irradiance_array(
+                zenith,
+                azimuth,
+                self.surface_tilt,
+                self.surface_azimuth,
+                self.tmy["GHI"][rows],
+                self.tmy["DNI"][rows],
+                self.tmy["DHI"][rows],
+            )
+            result = dict(zip(("POA", "E_b_poa", "E_g_poa", "E_d_poa"), poa), aoi=aoi)
+            aggregator.update(self.times[rows], result)
+
+        return aggregator.result()
+
+    def export(
+        self, path, result, columns=None, format=None, dtype=np.float64, chunk_size=None
+    ):
+        """Writes a fleet result and the TMY data to a columnar file in
+        long format, one row per time step and site with a "site" column,
+        see the export module.
+
+        Parameters
+        ----------
+        path : string
+            Output file, .parquet, .arrow or .npz.
+        result : dict
+            (time x site) arrays, e.g. from get_poa_irradiance_fast.
+        columns : list of string, optional
+            Keys of result, or "GHI", "DNI", "DHI", to write. Defaults to
+            the TMY data followed by every key of result.
+        format : {"parquet", "arrow", "npz"}, optional
+            Guessed from the extension when None.
+        dtype : numpy dtype
+            Type of the written values, e.g. np.float32.
+        chunk_size : int, optional
+            Time steps written at once, bounds the memory used by the
+            long-format copy. Defaults to about one million rows.
+        """
+
+        from .export import ResultWriter
+
+        sources = dict(self.tmy or {}, **result)
+        if columns is None:
+            columns = list(sources)
+        if chunk_size is None:
+            chunk_size = max(1, 2**20 // max(1, len(self)))
+
+        names = np.asarray(self.names).astype(str)
+
+        with ResultWriter(path, format=format, dtype=dtype) as writer:
+            for start in range(0, len(self.times), chunk_size):
+                rows = slice(start, start + chunk_size)
+                times = self.times[rows]
+                data = {"site": np.tile(names, len(times))}
+                data.update({c: sources[c][rows].ravel() for c in columns})
+                writer.write(data, times=times.repeat(len(self)))
+
+    def to_frame(self, result):
+        """Wraps a fleet result into a time-indexed dataframe.
+
+        A (time x site) array gives one column per site. A dict of arrays
+        gives MultiIndex columns (quantity, site).
+        """
+
+        if isinstance(result, dict):
+            columns = pd.MultiIndex.from_product(
+                [list(result), self.names], names=["quantity", "site"]
+            )
+            values = np.hstack([result[key] for key in result])
+        else:
+            columns = pd.Index(self.names, name="site")
+            values = result
+
+        return pd.DataFrame(values, index=self.times, columns=columns)
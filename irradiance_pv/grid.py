@@ -0,0 +1,217 @@
+# irradiance pv grid module
+
+"""
+Plane-of-array irradiation maps over a regular latitude/longitude grid.
+
+The raster is evaluated in tiles of cells and chunks of time steps, so
+the memory used is bounded by tile_size x chunk_size whatever the size of
+the grid. The site-independent solar terms (see solar_tiers) are
+computed once and shared by every tile, and each tile is written to the
+output raster as soon as it is done:
+
+    >>> grid = Grid((30, 35), (-115, -109), resolution=0.05)
+    >>> source = UniformSource(tmy["GHI"], tmy["DNI"], tmy["DHI"])
+    >>> energy = grid.poa_map(times, source, surface_tilt=latitude_tilt,
+    ...                       out="poa.npy")
+
+An irradiance source is a callable source(lat, lon, rows) returning the
+GHI, DNI and DHI of the cells at lat, lon (1-D arrays) for the time steps
+rows (a slice), as arrays broadcastable to (time x cell).
+"""
+
+import os
+
+import numpy as np
+
+from .irradiance_pv import _prepare_times, poa_irradiance_array, step_hours
+from .solar_tiers import solar_ephemeris
+
+
+def latitude_tilt(lat):
+    """Orientation rule tilting the surfaces by their absolute latitude."""
+
+    return np.abs(lat)
+
+
+def equator_facing(lat):
+    """Orientation rule facing the surfaces south in the northern
+    hemisphere and north in the southern one."""
+
+    return np.where(np.asarray(lat) >= 0, 180.0, 0.0)
+
+
+class UniformSource:
+    """Irradiance source giving the same series to every cell.
+
+    Parameters
+    ----------
+    ghi, dni, dhi : array-like
+        Irradiance in [W/m2], one value per time step.
+    """
+
+    def __init__(self, ghi, dni, dhi):
+
+        self.components = [np.asarray(c, dtype=float) for c in (ghi, dni, dhi)]
+
+    def __call__(self, lat, lon, rows):
+
+        return [c[rows, np.newaxis] for c in self.components]
+
+
+class ArraySource:
+    """Irradiance source reading gridded arrays, at the nearest source
+    cell of each grid cell. The arrays may be memory-mapped (np.load with
+    mmap_mode), only the rows and cells of a tile are read.
+
+    Parameters
+    ----------
+    lat, lon : array-like
+        Sorted coordinates of the source cells, in degrees.
+    ghi, dni, dhi : arrays
+        Irradiance in [W/m2], shaped (time x lat x lon).
+    """
+
+    def __init__(self, lat, lon, ghi, dni, dhi):
+
+        self.lat = np.asarray(lat, dtype=float)
+        self.lon = np.asarray(lon, dtype=float)
+        self.components = (ghi, dni, dhi)
+
+    @staticmethod
+    def _nearest(axis, values):
+        """Index of the nearest element of the sorted axis to values."""
+
+        if len(axis) == 1:
+            return np.zeros(len(values), dtype=np.intp)
+
+        index = np.clip(np.searchsorted(axis, values), 1, len(axis) - 1)
+        left = values - axis[index - 1] < axis[index] - values
+
+        return index - left
+
+    def __call__(self, lat, lon, rows):
+
+        i = self._nearest(self.lat, lat)
+        j = self._nearest(self.lon, lon)
+
+        return [np.asarray(c[rows])[:, i, j] for c in self.components]
+
+
+class Grid:
+    """Regular grid of cell centers.
+
+    Parameters
+    ----------
+    lat_bounds, lon_bounds : tuple of float
+        (min, max) of the area, in degrees.
+    resolution : float
+        Cell size in degrees.
+    """
+
+    def __init__(self, lat_bounds, lon_bounds, resolution):
+
+        self.resolution = resolution
+        self.lat = np.arange(lat_bounds[0] + resolution / 2, lat_bounds[1], resolution)
+        self.lon = np.arange(lon_bounds[0] + resolution / 2, lon_bounds[1], resolution)
+
+    @property
+    def shape(self):
+        return (len(self.lat), len(self.lon))
+
+    def __len__(self):
+        return len(self.lat) * len(self.lon)
+
+    def __repr__(self):
+        return "Grid of {} x {} cells at {} deg.".format(*self.shape, self.resolution)
+
+    def cells(self, start, stop):
+        """Coordinates of the cells start to stop, in row-major order."""
+
+        i, j = np.unravel_index(np.arange(start, min(stop, len(self))), self.shape)
+
+        return self.lat[i], self.lon[j]
+
+    def poa_map(
+        self,
+        times,
+        source,
+        surface_tilt,
+        surface_azimuth=equator_facing,
+        albedo=0.16,
+        tile_size=4096,
+        chunk_size=None,
+        out=None,
+        tier="usno",
+    ):
+        """Calculates the plane-of-array irradiation of every cell over
+        times, using the model of Irradiance.get_poa_irradiance.
+
+        Parameters
+        ----------
+        times : DateTimeIndex
+            Simulation period (assumed UTC).
+        source : callable
+            Irradiance source, see UniformSource and ArraySource.
+        surface_tilt, surface_azimuth : float or callable
+            Orientation of the surfaces, in degrees, fixed or as a
+            function of the cell latitudes, e.g. latitude_tilt.
+            surface_azimuth defaults to equator_facing.
+        albedo : float
+            Ground reflectance, defaults to 0.16 (urban environement).
+        tile_size : int
+            Cells evaluated at once.
+        chunk_size : int, optional
+            Time steps evaluated at once. About 12 arrays of tile_size x
+            chunk_size float64 are held at a time, the default keeps
+            tile_size x chunk_size around one million (about 100 MB).
+        out : string, path-like or array, optional
+            Raster receiving the results, filled tile by tile. A path
+            creates a memory-mapped .npy file.
+        tier : {"low", "usno", "spa"}
+            Solar position precision tier, see solar_tiers.
+
+        Return
+        ------
+        An array (lat x lon) of irradiation in [kWh/m2], rows following
+        the grid latitudes.
+        """
+
+        times = _prepare_times(times)
+        ephemeris = solar_ephemeris(times, tier)
+        chunk_size = chunk_size or max(1, 2**20 // tile_size)
+        scale = step_hours(times) / 1000
+
+        if out is None:
+            out = np.empty(self.shape)
+        elif isinstance(out, (str, os.PathLike)):
+            out = np.lib.format.open_memmap(os.fspath(out), mode="w+", shape=self.shape)
+        elif out.shape != self.shape or not out.flags.c_contiguous:
+            raise ValueError(
+                "out must be a C-contiguous array of shape {}".format(self.shape)
+            )
+        raster = out.reshape(-1)
+
+        for start in range(0, len(self), tile_size):
+            lat, lon = self.cells(start, start + tile_size)
+            tilt = surface_tilt(lat) if callable(surface_tilt) else surface_tilt
+            azimuth = (
+                surface_azimuth(lat) if callable(surface_azimuth) else surface_azimuth
+            )
+            tilt, azimuth = np.broadcast_arrays(tilt, azimuth, np.empty(len(lat)))[:2]
+
+            energy = np.zeros(len(lat))
+            for first in range(0, len(times), chunk_size):
+                rows = slice(first, first + chunk_size)
+                _, zenith, solar_azimuth = ephemeris[rows].solar_position(lat, lon)
+                ghi, dni, dhi = source(lat, lon, rows)
+                _, poa, *_ = poa_irradiance_array(
+                    zenith, solar_azimuth, tilt, azimuth, ghi, dni, dhi, albedo=albedo
+                )
+                energy += poa.sum(axis=0)
+
+            raster[start : start + len(lat)] = energy * scale
+
+        if isinstance(out, np.memmap):
+            out.flush()
+
+        return out
@@ -2,22 +2,278 @@
 
 """
 The main classes to create and transform the irradiance components
-falling into a photovoltaic system, represented by a location and a 
+falling into a photovoltaic system, represented by a location and a
 surface.
 """
+
 # Created by Sergio Badillo. 2020
 
 import pandas as pd
 import numpy as np
-import time
-import requests
-import sys
 
-sys.path.append(".")
+from .clearsky import clear_sky
+from .spa_sb import (
+    solar_position_array,
+    solar_position_interp,
+    solar_position_vect,
+)
+from .timing import timed
+from .transposition import MODELS, Geometry, transpose
+
+# Columns of the dataframes yielded by Irradiance.iter_chunks
+CHUNK_COLUMNS = [
+    "solar_altitude",
+    "solar_zenith",
+    "solar_azimuth",
+    "aoi",
+    "POA",
+    "E_b_poa",
+    "E_g_poa",
+    "E_d_poa",
+]
+
+
+def _prepare_times(times):
+    """Returns times as a UTC DateTimeIndex, as expected by the
+    solar position and irradiance calculations."""
+
+    # check if times arrays is datetimeindex
+
+    if not isinstance(times, pd.DatetimeIndex):
+        try:
+            times = pd.DatetimeIndex(times)
+        except (TypeError, ValueError):
+            times = pd.DatetimeIndex(
+                [
+                    times,
+                ]
+            )
+
+    # if localized, convert to UTC. otherwise, assume UTC.
+
+    try:
+        times = times.tz_convert("UTC")
+    except TypeError:
+        times = times
+
+    return times
+
+
+def step_hours(times):
+    """Duration of one time step in hours, from the median spacing."""
+
+    if len(times) < 2:
+        return 1.0
+
+    return float(np.median(np.diff(times.values) / np.timedelta64(1, "h")))
+
+
+@timed("poa")
+def poa_irradiance_array(
+    solar_zenith,
+    solar_azimuth,
+    surface_tilt,
+    surface_azimuth,
+    ghi,
+    dni,
+    dhi,
+    albedo=0.16,
+    out=None,
+):
+    """Calculates the angle of incidence and the plane-of-array irradiance
+    in a single pass over float64 arrays. Inputs broadcast against each
+    other, e.g. (time,) for a single system or (time x site) for a fleet
+    with (site,) surface angles.
+
+    The surface tilt trigonometry is evaluated once, the cosine of the
+    angle of incidence is used directly for the beam component and
+    negative (or missing) components are clipped to 0 in place.
+
+    Parameters
+    ----------
+    solar_zenith, solar_azimuth : array-like
+        Solar position in degrees.
+    surface_tilt, surface_azimuth : array-like
+        Surface orientation in degrees.
+    ghi, dni, dhi : array-like
+        Irradiance components in [W/m2].
+    albedo : float
+        Ground reflectance, defaults to 0.16 (urban environement).
+    out : tuple of arrays, optional
+        Five preallocated float64 arrays of the broadcast shape, filled
+        in the order of the returned values.
+
+    Return
+    ------
+    A tuple of arrays (aoi, POA, E_b_poa, E_g_poa, E_d_poa), see
+    Irradiance.get_aoi and Irradiance.get_poa_irradiance.
+    """
+
+    solar_zenith = np.asarray(solar_zenith, dtype=float)
+    solar_azimuth = np.asarray(solar_azimuth, dtype=float)
+    ghi = np.asarray(ghi, dtype=float)
+    dni = np.asarray(dni, dtype=float)
+    dhi = np.asarray(dhi, dtype=float)
+
+    theta_T = np.radians(np.asarray(surface_tilt, dtype=float))
+    cos_tilt = np.cos(theta_T)
+    sin_tilt = np.sin(theta_T)
+    theta_Z = np.radians(solar_zenith)
+
+    if out is None:
+        shape = np.broadcast_shapes(
+            solar_zenith.shape,
+            solar_azimuth.shape,
+            cos_tilt.shape,
+            np.shape(surface_azimuth),
+            ghi.shape,
+            dni.shape,
+            dhi.shape,
+        )
+        out = tuple(np.empty(shape) for _ in range(5))
+    aoi, poa, E_b_poa, E_g_poa, E_d_poa = out
+
+    # cosine of the angle of incidence, kept in the aoi buffer.
+    cos_aoi = np.subtract(solar_azimuth, surface_azimuth, out=aoi)
+    np.cos(np.radians(cos_aoi, out=cos_aoi), out=cos_aoi)
+    cos_aoi *= np.sin(theta_Z) * sin_tilt
+    cos_aoi += np.cos(theta_Z) * cos_tilt
+
+    # POA Beam component
+    np.multiply(dni, cos_aoi, out=E_b_poa)
+
+    with np.errstate(invalid="ignore"):
+        np.degrees(np.arccos(cos_aoi, out=aoi), out=aoi)
+
+    # POA Ground component
+    np.multiply(ghi, albedo * ((1 - cos_tilt) / 2), out=E_g_poa)
+
+    # POA Sky Diffuse component, isotropic plus zenith correction.
+    np.multiply(dhi, (1 + cos_tilt) / 2, out=E_d_poa)
+    E_d_poa += ghi * solar_zenith * (0.012 * (1 - cos_tilt) / 2)
+
+    # remove negative values, missing values are also set to 0.
+    for component in (E_b_poa, E_g_poa, E_d_poa):
+        np.copyto(component, 0.0, where=~(component > 0))
+
+    np.add(E_b_poa, E_g_poa, out=poa)
+    poa += E_d_poa
+
+    return aoi, poa, E_b_poa, E_g_poa, E_d_poa
+
 
+def daylight_mask(solar_altitude, horizon=0.0):
+    """Time steps where the sun is above the horizon.
 
-from .spa_sb import solar_position_vect
-from requests.exceptions import HTTPError
+    Parameters
+    ----------
+    solar_altitude : array-like
+        Solar altitude in degrees.
+    horizon : float
+        Altitude threshold in degrees, e.g. -0.83 to include the
+        refraction at sunrise and sunset, or a few degrees to exclude
+        the steps where an obstructed horizon shades the array.
+
+    Return
+    ------
+    A boolean array of the shape of solar_altitude.
+    """
+
+    return np.asarray(solar_altitude, dtype=float) > horizon
+
+
+class SparsePOA:
+    """Angle of incidence and plane-of-array irradiance stored for the
+    daylight time steps only, see poa_irradiance_sparse.
+
+    Parameters
+    ----------
+    mask : boolean array
+        Daylight steps, shaped (time,) or (time x site).
+    values : array
+        One row per daylight step, in the order of mask.nonzero(), and
+        one column per name of COLUMNS.
+    """
+
+    COLUMNS = ["aoi", "POA", "E_b_poa", "E_g_poa", "E_d_poa"]
+
+    def __init__(self, mask, values):
+
+        self.mask = mask
+        self.values = values
+
+    @property
+    def shape(self):
+        return self.mask.shape
+
+    @property
+    def n_daylight(self):
+        return len(self.values)
+
+    def __getitem__(self, key):
+        """Daylight values of one column, as a 1-D array."""
+
+        return self.values[:, self.COLUMNS.index(key)]
+
+    def to_array(self, key):
+        """Expands one column to the full shape. Night steps are 0, and
+        NaN for the angle of incidence."""
+
+        array = np.full(self.shape, np.nan if key == "aoi" else 0.0)
+        array[self.mask] = self[key]
+
+        return array
+
+    def to_frame(self, index, columns=None):
+        """Expands a (time,) result to a dataframe indexed by index, with
+        the given columns, all by default."""
+
+        columns = self.COLUMNS if columns is None else columns
+
+        return pd.DataFrame({key: self.to_array(key) for key in columns}, index=index)
+
+
+def poa_irradiance_sparse(
+    mask,
+    solar_zenith,
+    solar_azimuth,
+    surface_tilt,
+    surface_azimuth,
+    ghi,
+    dni,
+    dhi,
+    albedo=0.16,
+):
+    """Evaluates poa_irradiance_array on the daylight time steps only.
+
+    The inputs are broadcast to the shape of mask and gathered on its
+    True elements, so the cost and the memory of the calculation scale
+    with the number of daylight steps.
+
+    Return
+    ------
+    A SparsePOA.
+    """
+
+    mask = np.asarray(mask, dtype=bool)
+    values = np.empty((np.count_nonzero(mask), len(SparsePOA.COLUMNS)), order="F")
+
+    def daylight(a):
+        return np.broadcast_to(np.asarray(a, dtype=float), mask.shape)[mask]
+
+    poa_irradiance_array(
+        daylight(solar_zenith),
+        daylight(solar_azimuth),
+        daylight(surface_tilt),
+        daylight(surface_azimuth),
+        daylight(ghi),
+        daylight(dni),
+        daylight(dhi),
+        albedo=albedo,
+        out=tuple(values.T),
+    )
+
+    return SparsePOA(mask, values)
 
 
 class PVSystem:
@@ -71,45 +327,96 @@ class PVSystem:
         )
 
 
+# Results of the Irradiance stages, and the attributes they depend on.
+STAGE_DEPENDENCIES = {
+    "solar_pos": ("times", "lat", "lon"),
+    "aoi": ("solar_pos", "surface_tilt", "surface_azimuth"),
+    "geometry": ("solar_pos", "surface_tilt", "surface_azimuth"),
+    "poa": ("solar_pos", "surface_tilt", "surface_azimuth", "tmy"),
+}
+
+
+class _Tracked:
+    """Attribute of Irradiance whose assignment invalidates the stages
+    depending on it, see STAGE_DEPENDENCIES. prepare converts the
+    assigned values."""
+
+    def __init__(self, prepare=None):
+
+        self.prepare = prepare
+
+    def __set_name__(self, owner, name):
+
+        self.name = name
+
+    def __get__(self, obj, objtype=None):
+
+        if obj is None:
+            return self
+
+        return obj._values.get(self.name)
+
+    def __set__(self, obj, value):
+
+        if self.prepare is not None and value is not None:
+            value = self.prepare(value)
+
+        obj._values[self.name] = value
+        obj._invalidate(self.name)
+
+
+class _Stage(_Tracked):
+    """Result of an Irradiance stage, computed by calling the method
+    compute on first access and kept until a dependency changes."""
+
+    def __init__(self, compute):
+
+        super().__init__()
+        self.compute = compute
+
+    def __get__(self, obj, objtype=None):
+
+        if obj is None:
+            return self
+
+        if obj._values.get(self.name) is None:
+            getattr(obj, self.compute)()
+
+        return obj._values[self.name]
+
+
 class Irradiance:
     """Represents the irradiance profiles and includes the conversion
     methods in order to obtain the Plane-of-Array (POA) Irradiance.
     Irradiance reauires a PVSystem objects to be passed, along with a
     times DateTimeIndex (assumed UTC) object to specify the simulation period.
+
+    The stage results solar_pos, aoi, geometry and poa are computed on first access
+    and memoized. Assigning times, lat, lon, surface_tilt, surface_azimuth
+    or tmy drops the results depending on it (see STAGE_DEPENDENCIES), so
+    that a new orientation only recomputes aoi and poa. The get_* methods
+    always recompute their stage.
     """
 
+    times = _Tracked(prepare=_prepare_times)
+    lat = _Tracked()
+    lon = _Tracked()
+    surface_tilt = _Tracked()
+    surface_azimuth = _Tracked()
+    tmy = _Tracked()
+
+    solar_pos = _Stage("get_solar_pos_v")
+    aoi = _Stage("get_aoi")
+    geometry = _Stage("get_geometry")
+    poa = _Stage("get_poa_irradiance_fast")
+
     def __init__(
         self,
         pvsystem,
         times,
     ):
 
-        # check if times arrays is datetimeindex
-
-        if not isinstance(times, pd.DatetimeIndex):
-            print("warning times is not datetime, ")
-            try:
-                times = pd.DatetimeIndex(times)
-            except (TypeError, ValueError):
-                times = pd.DatetimeIndex(
-                    [
-                        times,
-                    ]
-                )
-
-        # if localized, convert to UTC. otherwise, assume UTC.
-
-        try:
-            print(times[0])
-            times = times.tz_convert("UTC")
-            print(times[0])
-        except TypeError:
-            times = times
-
-        # if index (times) is not closed to left then drop last value.
-
-        if len(times) == 8761:
-            times = times[:8760]
+        self._values = {}
 
         self.times = times
         self.lat = pvsystem.lat
@@ -119,75 +426,170 @@ class Irradiance:
         self.surface_tilt = pvsystem.surface_tilt
         self.pvsystem = pvsystem
 
-        self.solar_pos = None
-        self.aoi = None
         self.tmy = None
 
-    def read_TMY_file(file):
-        """ "read the standard components GHI, DNI, DHI."""
-        # work in progress
+    def _invalidate(self, name):
+        """Drops the stage results depending on the attribute name."""
+
+        for stage, dependencies in STAGE_DEPENDENCIES.items():
+            if name in dependencies:
+                self._values.pop(stage, None)
+                self._invalidate(stage)
 
-    def get_TMY_file(self):
+    def _check_tmy(self):
+
+        if self.tmy is None:
+            raise ValueError("TMY data is missing, see get_TMY_file and read_TMY_file")
+        if len(self.tmy) != len(self.times):
+            raise ValueError(
+                "TMY data has {} rows, times has {}".format(
+                    len(self.tmy), len(self.times)
+                )
+            )
+        # time-indexed data must be aligned on times, e.g. after times
+        # was changed. Other data is taken as one row per time step.
+        index = self.tmy.index
+        if isinstance(index, pd.DatetimeIndex) and not np.array_equal(
+            index.tz_convert("UTC").values if index.tz is not None else index.values,
+            self.times.values,
+        ):
+            raise ValueError(
+                "TMY data is indexed from {} to {}, times from {} to {}, "
+                "see tmy.align_tmy".format(
+                    index[0], index[-1], self.times[0], self.times[-1]
+                )
+            )
+
+    def read_TMY_file(
+        self, path, format=None, columns=None, cache=True, cache_dir=None
+    ):
+        """Reads the standard components GHI, DNI, DHI from a local
+        weather file, see tmy.read_tmy.
+
+        Parameters
+        ----------
+        path : string
+            PVGIS json or csv, EPW or generic csv file. A typical year of
+            8760 hours is aligned onto times (see tmy.align_tmy), other
+            files must have one row per element of times.
+        format : {"pvgis_json", "pvgis_csv", "epw", "csv"}, optional
+            Guessed from the file when None.
+        columns : dict, optional
+            For generic csv files, names of the columns holding "GHI",
+            "DNI", "DHI" when they differ.
+        cache : bool
+            Read through a memory-mapped cache of the file, created next
+            to it on first use. Defaults to True.
+        cache_dir : string, optional
+            Directory of the cache files, e.g. for a read-only data
+            directory.
+
+        Return
+        ------
+        A dataframe indexed by times with the columns "time_pvgis", "GHI",
+        "DNI", "DHI". With cache, the irradiance columns are read-only.
+        """
+
+        from .tmy import align_tmy, read_tmy
+
+        df_tmy = read_tmy(
+            path, format=format, columns=columns, cache=cache, cache_dir=cache_dir
+        )
+        df_tmy = align_tmy(df_tmy, self.times)
+        self.tmy = df_tmy
+
+        return df_tmy
+
+    def get_TMY_file(self, startyear=2006, endyear=2015, fetcher=None):
         """Uses PVGIS webservice to create a Typical Meteorological Year (TMY)
          file using the PVSystem coordinates.
 
         more about TMY files
         https://ec.europa.eu/jrc/en/PVGIS/tools/tmy
 
+        Parameters
+        ----------
+        startyear, endyear : int
+            Period of the data used to build the typical year.
+        fetcher : object, optional
+            Source of the TMY data, with a fetch(lat, lon, startyear,
+            endyear) method, see the tmy module. Pass a tmy.TMYCache to
+            avoid repeated requests. Defaults to the PVGIS webservice.
+
         Return
         ------
         A dataframe instance consisting of 1 year (or several years) of hourly
-        data,  with the following columns:
+        data,  with the following columns, aligned onto times by day of year
+        and hour (see tmy.align_tmy):
 
             "time_pvgis" : UTC for normal CSV, local timezone time
             "GHI" : Global horizontal irradiance G(h) in [W/m2].
             "DNI" : Direct (beam) irradiance Gb(n) in [W/m2].
             "DHI" : Diffuse horizontal irradiance Gd(h) in [W/m2].
-        """
 
-        url = "https://re.jrc.ec.europa.eu/api/tmy"
+        Raises
+        ------
+        tmy.TMYFetchError
+            When the data could not be retrieved, with the error of the
+            fetcher as its cause, as reported by Fleet.get_TMY_file.
+        """
 
-        params = {
-            "lat": self.lat,
-            "lon": self.lon,
-            "startyear": 2006,
-            "endyear": 2015,
-            "outputformat": "json",  # csv, json, epw
-        }
+        from .tmy import PVGISFetcher, TMYFetchError, align_tmy, fetch_tmy
 
-        start = time.time()
+        if fetcher is None:
+            fetcher = PVGISFetcher()
 
         try:
-            r = requests.get(url, params=params)
+            df_tmy = fetch_tmy(fetcher, self.pvsystem, startyear, endyear)
+        except Exception as err:
+            raise TMYFetchError(0, self.pvsystem, err) from err
 
-            # If the respons was successful, no Exception will be raised
-            r.raise_for_status()
+        df_tmy = align_tmy(df_tmy, self.times)
+        self.tmy = df_tmy
 
-        except HTTPError as http_err:
-            print(f"HTTP error occurred: {http_err}")
+        return df_tmy
 
-        except Exception as err:
-            print(f"Other error occurred: {err}")
+    def get_clearsky(self, model="ineichen", **params):
+        """Sets clear-sky irradiance components as TMY data, computed from
+        the solar zenith of the run and the elevation of the system, see
+        clearsky.clear_sky. No download is involved.
 
-        else:
-            print("get_TMY_file: done in {:.2f} seconds.".format(time.time() - start))
+        Parameters
+        ----------
+        model : string or callable
+            Clear-sky model of clearsky.MODELS, defaults to "ineichen".
+        **params
+            Parameters of the model, e.g. linke_turbidity=3.5.
+
+        Return
+        ------
+        A dataframe indexed by times with the columns "GHI", "DNI", "DHI".
+        """
 
-            tmy_json = r.json()
-            df_r = pd.DataFrame.from_dict(data=tmy_json["outputs"]["tmy_hourly"])
-            df_tmy = df_r[["time(UTC)", "G(h)", "Gb(n)", "Gd(h)"]].copy()
-            df_tmy.set_index(self.times, inplace=True)
-            df_tmy.columns = ["time_pvgis", "GHI", "DNI", "DHI"]
-            self.tmy = df_tmy
+        irradiance = clear_sky(
+            self.solar_pos["solar_zenith"].to_numpy(dtype=float),
+            self.times,
+            model,
+            self.elev,
+            **params,
+        )
+        self.tmy = pd.DataFrame(irradiance, index=self.times)
 
-            return df_tmy
+        return self.tmy
 
-    def get_solar_pos_v(self):
+    def get_solar_pos_v(self, ephemeris=None):
         """
         Calculate the position of the sun relative to an observer on
          the surface of the Earth.
          spa_sb.solar_position_vect() is an implementation of the
          Astronomical Applications Department of the US Naval Observatory method.
 
+        Parameters
+        ----------
+        ephemeris : spa_sb.Ephemeris, optional
+            Site-independent terms computed for the same times, shared
+            between Irradiance instances to avoid recomputing them.
+
         Returns
         -------
         Time-indexed dataframe consisting of columns :
@@ -197,13 +599,38 @@ class Irradiance:
 
         """
 
-        start = time.time()
-        print("calculating sun positions")
-        self.solar_pos = solar_position_vect(self.times, self.lat, self.lon)
-        print("get_solar_pos_v : done in", time.time() - start)
+        self.solar_pos = solar_position_vect(
+            self.times, self.lat, self.lon, ephemeris=ephemeris
+        )
+
+        return self.solar_pos
+
+    def get_solar_pos_interp(self, step="5min", max_error=None):
+        """Calculates the solar position on a sub-minute times index by
+        interpolating positions evaluated every step, see
+        spa_sb.solar_position_interp.
+
+        Parameters
+        ----------
+        step : string or Timedelta
+            Spacing of the evaluated positions, defaults to 5 minutes.
+        max_error : float, optional
+            Maximum angle in degrees between the interpolated and the
+            exact sun direction, the step is refined until it is met.
+
+        Returns
+        -------
+        Time-indexed dataframe with the columns of get_solar_pos_v. Its
+        attrs hold the "step" used and the estimated "max_error".
+        """
+
+        self.solar_pos = solar_position_interp(
+            self.times, self.lat, self.lon, step=step, max_error=max_error
+        )
 
         return self.solar_pos
 
+    @timed("aoi")
     def get_aoi(self):
         """Calculates the Angle of Incidence (AOI) between
         the Sun's rays and the surface of the PV Array.
@@ -233,6 +660,7 @@ class Irradiance:
 
         return df_aoi
 
+    @timed("poa")
     def get_poa_irradiance(self):
         """Calculates plane-of-array irradiance and its components.
 
@@ -247,6 +675,8 @@ class Irradiance:
 
         """
 
+        self._check_tmy()
+
         df_poa = pd.DataFrame(
             index=self.times, columns=["POA", "E_b_poa", "E_g_poa", "E_d_poa"]
         )
@@ -286,5 +716,292 @@ class Irradiance:
         # remove negative values
         df_poa = df_poa.where(df_poa > 0, other=0)
         df_poa["POA"] = df_poa["E_b_poa"] + df_poa["E_g_poa"] + df_poa["E_d_poa"]
+        self.poa = df_poa
 
         return df_poa
+
+    def get_poa_irradiance_fast(self):
+        """Calculates the angle of incidence and the plane-of-array
+        irradiance in one fused pass, see poa_irradiance_array.
+
+        Equivalent to calling get_aoi and get_poa_irradiance, but works
+        on float64 arrays and only builds the dataframes on return.
+        Requires the TMY data. This is how the poa attribute is computed.
+
+        Return
+        ------
+        Time-indexed dataframe consisting of the columns of
+        get_poa_irradiance. The aoi and poa attributes are also updated.
+        """
+
+        self._check_tmy()
+
+        n = len(self.times)
+        values = np.empty((n, 4), order="F")
+        aoi = np.empty(n)
+
+        poa_irradiance_array(
+            self.solar_pos["solar_zenith"].to_numpy(dtype=float),
+            self.solar_pos["solar_azimuth"].to_numpy(dtype=float),
+            self.surface_tilt,
+            self.surface_azimuth,
+            self.tmy["GHI"].to_numpy(dtype=float),
+            self.tmy["DNI"].to_numpy(dtype=float),
+            self.tmy["DHI"].to_numpy(dtype=float),
+            out=(aoi, *values.T),
+        )
+
+        self.aoi = pd.DataFrame({"aoi": aoi}, index=self.times)
+        self.poa = pd.DataFrame(
+            values,
+            index=self.times,
+            columns=["POA", "E_b_poa", "E_g_poa", "E_d_poa"],
+            copy=False,
+        )
+
+        return self.poa
+
+    def get_geometry(self):
+        """Calculates the terms shared by the transposition models, see
+        transposition.Geometry. This is how the geometry attribute is
+        computed.
+        """
+
+        self.geometry = Geometry(
+            self.solar_pos["solar_zenith"].to_numpy(dtype=float),
+            self.solar_pos["solar_azimuth"].to_numpy(dtype=float),
+            self.surface_tilt,
+            self.surface_azimuth,
+            self.times,
+        )
+
+        return self.geometry
+
+    @timed("poa")
+    def get_poa_irradiance_model(self, model="isotropic_zenith", albedo=0.16):
+        """Calculates the plane-of-array irradiance and its components
+        with a sky diffuse model of transposition.MODELS, e.g. "perez".
+
+        The default model is the one of get_poa_irradiance. The poa
+        attribute is left unchanged.
+
+        Parameters
+        ----------
+        model : string or callable
+            Sky diffuse model, see transposition.transpose.
+        albedo : float or array-like
+            Ground reflectance, defaults to 0.16 (urban environement).
+
+        Return
+        ------
+        Time-indexed dataframe consisting of the columns of
+        get_poa_irradiance.
+        """
+
+        self._check_tmy()
+
+        components = transpose(
+            self.geometry,
+            self.tmy["GHI"].to_numpy(dtype=float),
+            self.tmy["DNI"].to_numpy(dtype=float),
+            self.tmy["DHI"].to_numpy(dtype=float),
+            model=model,
+            albedo=albedo,
+        )
+
+        return pd.DataFrame(
+            np.column_stack(components),
+            index=self.times,
+            columns=["POA", "E_b_poa", "E_g_poa", "E_d_poa"],
+        )
+
+    def compare_transposition(self, models=None, albedo=0.16):
+        """Calculates the plane-of-array irradiance with several sky
+        diffuse models, sharing the geometry and TMY data of the run.
+
+        Parameters
+        ----------
+        models : list, optional
+            Names (or functions) of the models, defaults to all of
+            transposition.MODELS.
+
+        Return
+        ------
+        Time-indexed dataframe with one POA column per model.
+        """
+
+        self._check_tmy()
+
+        models = list(MODELS) if models is None else list(models)
+        ghi, dni, dhi = (
+            self.tmy[c].to_numpy(dtype=float) for c in ("GHI", "DNI", "DHI")
+        )
+
+        return pd.DataFrame(
+            {
+                getattr(model, "__name__", model): transpose(
+                    self.geometry, ghi, dni, dhi, model=model, albedo=albedo
+                )[0]
+                for model in models
+            },
+            index=self.times,
+        )
+
+    def get_poa_irradiance_daylight(self, horizon=0.0):
+        """Calculates the angle of incidence and the plane-of-array
+        irradiance on the time steps where the solar altitude is above
+        horizon only, see daylight_mask and poa_irradiance_sparse.
+
+        Requires the TMY data. The night steps
+        are assumed to receive no irradiance.
+
+        Return
+        ------
+        A SparsePOA, expanded to the dataframe of get_poa_irradiance by
+        to_frame(self.times).
+        """
+
+        self._check_tmy()
+
+        mask = daylight_mask(self.solar_pos["solar_altitude"], horizon)
+
+        return poa_irradiance_sparse(
+            mask,
+            self.solar_pos["solar_zenith"],
+            self.solar_pos["solar_azimuth"],
+            self.surface_tilt,
+            self.surface_azimuth,
+            self.tmy["GHI"],
+            self.tmy["DNI"],
+            self.tmy["DHI"],
+        )
+
+    def iter_chunks(self, chunk_size=100000):
+        """Evaluates the solar position, the angle of incidence and the
+        plane-of-array irradiance over consecutive slices of times.
+
+        Only one chunk of results is held at a time, so the memory used
+        beyond the inputs is bounded by chunk_size whatever the length of
+        the simulation. The values are identical to get_solar_pos_v and
+        get_poa_irradiance_fast. Requires the TMY data.
+
+        Parameters
+        ----------
+        chunk_size : int
+            Number of time steps per chunk.
+
+        Yields
+        ------
+        Time-indexed dataframes consisting of the columns of
+        get_solar_pos_v, get_aoi and get_poa_irradiance.
+        """
+
+        self._check_tmy()
+
+        ghi = self.tmy["GHI"].to_numpy(dtype=float)
+        dni = self.tmy["DNI"].to_numpy(dtype=float)
+        dhi = self.tmy["DHI"].to_numpy(dtype=float)
+
+        for start in range(0, len(self.times), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            times = self.times[chunk]
+
+            values = np.empty((len(times), len(CHUNK_COLUMNS)), order="F")
+            altitude, zenith, azimuth, aoi, *poa = values.T
+
+            solar_position_array(
+                times, self.lat, self.lon, out=(altitude, zenith, azimuth)
+            )
+            poa_irradiance_array(
+                zenith,
+                azimuth,
+                self.surface_tilt,
+                self.surface_azimuth,
+                ghi[chunk],
+                dni[chunk],
+                dhi[chunk],
+                out=(aoi, *poa),
+            )
+
+            yield pd.DataFrame(values, index=times, columns=CHUNK_COLUMNS, copy=False)
+
+    def aggregate(
+        self, freq=None, columns=("POA",), percentiles=(), bins=None, chunk_size=100000
+    ):
+        """Statistics of the results of iter_chunks, reduced chunk by
+        chunk so the full time series is never held in memory, see
+        aggregate.Aggregator. Requires the TMY data.
+
+        Parameters
+        ----------
+        freq : string, optional
+            Period alias (e.g. "M" or "D"), over the whole simulation if
+            None.
+        columns : list of string
+            Columns of CHUNK_COLUMNS to reduce, defaults to "POA".
+        percentiles : list of float, optional
+            Percentiles (0 to 100) to estimate, within the bin width.
+        bins : array-like, optional
+            Histogram edges of the percentile estimates, in W/m2.
+        chunk_size : int
+            Number of time steps per chunk.
+
+        Return
+        ------
+        A dataframe indexed by period with MultiIndex columns (column,
+        statistic), the statistics being "energy" in [kWh/m2] (irradiance
+        columns only), "mean", "max" and the percentiles.
+        """
+
+        from .aggregate import Aggregator
+
+        aggregator = Aggregator(
+            columns,
+            freq=freq,
+            percentiles=percentiles,
+            bins=bins,
+            step_hours=step_hours(self.times),
+        )
+        for chunk in self.iter_chunks(chunk_size):
+            aggregator.update(chunk.index, chunk)
+
+        return aggregator.result()
+
+    def export(
+        self, path, columns=None, format=None, dtype=np.float64, chunk_size=100000
+    ):
+        """Writes the TMY data and the results of iter_chunks to a
+        columnar file, see the export module. The simulation is evaluated
+        and written chunk by chunk, without building the whole dataframe.
+        Requires the TMY data.
+
+        Parameters
+        ----------
+        path : string
+            Output file, .parquet, .arrow or .npz.
+        columns : list of string, optional
+            Columns to write among "GHI", "DNI", "DHI" and CHUNK_COLUMNS,
+            defaults to all.
+        format : {"parquet", "arrow", "npz"}, optional
+            Guessed from the extension when None.
+        dtype : numpy dtype
+            Type of the written values, e.g. np.float32.
+        chunk_size : int
+            Number of time steps per chunk.
+        """
+
+        from .export import ResultWriter
+
+        if columns is None:
+            columns = ["GHI", "DNI", "DHI"] + CHUNK_COLUMNS
+
+        tmy_columns = [c for c in columns if c in ("GHI", "DNI", "DHI")]
+        tmy = {c: self.tmy[c].to_numpy(dtype=float) for c in tmy_columns}
+
+        with ResultWriter(path, format=format, dtype=dtype) as writer:
+            start = 0
+            for chunk in self.iter_chunks(chunk_size):
+                rows = slice(start, start + len(chunk))
+                data = {c: tmy[c][rows] if c in tmy else chunk[c] for c in columns}
+                writer.write(data, times=chunk.index)
+                start += len(chunk)
@@ -0,0 +1,177 @@
+# irradiance pv parallel module
+
+"""
+Run the fleet pipeline (solar position, AOI and POA) on several cores.
+
+The work is split in blocks of sites or of time steps. Inputs and outputs
+live in shared memory: workers attach to the blocks by name and write
+their results in place, nothing but the block coordinates is pickled.
+"""
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from .irradiance_pv import poa_irradiance_array
+from .spa_sb import Ephemeris
+
+# Order of the results in the shared output block.
+OUTPUT_KEYS = ["aoi", "POA", "E_b_poa", "E_g_poa", "E_d_poa"]
+
+
+def _create_shared(shape, dtype, array=None):
+    """Allocates an array in a new shared memory block, filled with array
+    if given.
+
+    Return
+    ------
+    The SharedMemory, the array mapped on it, and its spec (name, shape,
+    dtype) for the workers.
+    """
+
+    dtype = np.dtype(dtype)
+    size = max(int(np.prod(shape)) * dtype.itemsize, 1)
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    shared = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    if array is not None:
+        shared[...] = array
+
+    return shm, shared, (shm.name, shape, dtype.str)
+
+
+def _attach(spec):
+    """Maps a shared memory block created by _create_shared."""
+
+    name, shape, dtype = spec
+    shm = shared_memory.SharedMemory(name=name)
+
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _fleet_task(specs, sites, rows, cols):
+    """Evaluates one block of (time x site) and writes it to the output."""
+
+    shms, arrays = zip(*[_attach(spec) for spec in specs])
+    times, ghi, dni, dhi, out = arrays
+    lat, lon, surface_tilt, surface_azimuth = [a[cols] for a in sites]
+
+    try:
+        ephemeris = Ephemeris(times[rows])
+        _, zenith, azimuth = ephemeris.solar_position(lat, lon)
+        poa_irradiance_array(
+            zenith,
+            azimuth,
+            surface_tilt,
+            surface_azimuth,
+            ghi[rows, cols],
+            dni[rows, cols],
+            dhi[rows, cols],
+            out=tuple(out[k, rows, cols] for k in range(len(OUTPUT_KEYS))),
+        )
+    finally:
+        del arrays, times, ghi, dni, dhi, out
+        for shm in shms:
+            shm.close()
+
+
+class Executor:
+    """Splits the evaluation of a Fleet across a pool of workers.
+
+    Parameters
+    ----------
+    max_workers : int, optional
+        Number of workers, defaults to the number of cores.
+    chunk_size : int, optional
+        Sites (or time steps) per task. Defaults to an even split of the
+        work between the workers.
+    split : {"site", "time"}
+        Axis along which the work is divided. Splitting by time suits
+        long horizons with few sites.
+    mode : {"process", "thread"}
+        Process pool, or thread pool relying on NumPy releasing the GIL
+        in its array operations.
+    """
+
+    def __init__(self, max_workers=None, chunk_size=None, split="site", mode="process"):
+
+        if split not in ("site", "time"):
+            raise ValueError("split must be 'site' or 'time', got {!r}".format(split))
+        if mode not in ("process", "thread"):
+            raise ValueError(
+                "mode must be 'process' or 'thread', got {!r}".format(mode)
+            )
+
+        self.max_workers = max_workers
+        self.chunk_size = chunk_size
+        self.split = split
+        self.mode = mode
+
+    def _blocks(self, n_times, n_sites, max_workers):
+        """Slices (rows, cols) of the tasks."""
+
+        length = n_sites if self.split == "site" else n_times
+        chunk_size = self.chunk_size or max(1, math.ceil(length / max_workers))
+
+        for start in range(0, length, chunk_size):
+            block = slice(start, start + chunk_size)
+            if self.split == "site":
+                yield slice(None), block
+            else:
+                yield block, slice(None)
+
+    def run(self, fleet):
+        """Evaluates the angle of incidence and the plane-of-array
+        irradiance of every site of the fleet, as
+        Fleet.get_poa_irradiance_fast. Requires the fleet TMY data.
+
+        Return
+        ------
+        A dict of (time x site) arrays with keys "aoi", "POA", "E_b_poa",
+        "E_g_poa" and "E_d_poa". The fleet aoi attribute is also updated.
+        """
+
+        n_times, n_sites = len(fleet.times), len(fleet)
+        pool = ProcessPoolExecutor if self.mode == "process" else ThreadPoolExecutor
+        max_workers = self.max_workers or os.cpu_count() or 1
+
+        # .values holds the UTC instants as datetime64.
+        times = fleet.times.values
+        blocks = [
+            (times.shape, times.dtype, times),
+            ((n_times, n_sites), float, fleet.tmy["GHI"]),
+            ((n_times, n_sites), float, fleet.tmy["DNI"]),
+            ((n_times, n_sites), float, fleet.tmy["DHI"]),
+            ((len(OUTPUT_KEYS), n_times, n_sites), float, None),
+        ]
+        sites = (fleet.lat, fleet.lon, fleet.surface_tilt, fleet.surface_azimuth)
+
+        shms, shared, specs = [], [], []
+        try:
+            for shape, dtype, array in blocks:
+                shm, array, spec = _create_shared(shape, dtype, array)
+                shms.append(shm)
+                shared.append(array)
+                specs.append(spec)
+
+            with pool(max_workers=max_workers) as executor:
+                futures = [
+                    executor.submit(_fleet_task, specs, sites, rows, cols)
+                    for rows, cols in self._blocks(n_times, n_sites, max_workers)
+                ]
+                for future in futures:
+                    future.result()
+
+            result = {key: shared[-1][k].copy() for k, key in enumerate(OUTPUT_KEYS)}
+        finally:
+            # views must be released before the blocks are closed.
+            del shared, array
+            for shm in shms:
+                shm.close()
+                shm.unlink()
+
+        fleet.aoi = result["aoi"]
+
+        return result
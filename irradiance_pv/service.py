@@ -0,0 +1,547 @@
+# irradiance pv service module
+
+"""
+Long-running local HTTP service returning plane-of-array irradiance
+profiles on demand:
+
+    $ irradiance-pv-serve --port 8080 --tmy-dir tmy/
+    $ curl "http://127.0.0.1:8080/poa?lat=52.01&lon=4.36&tilt=35&azimuth=180\\
+    &start=2015-06-01&end=2015-06-08&freq=15min"
+
+The process keeps the time grids and their ephemerides, the TMY data of
+the sites and the results in in-memory LRU caches. Concurrent requests
+for the same time grid are coalesced: the first one waits for a short
+window, then evaluates every site requested meanwhile as one Fleet.
+
+Endpoints (GET, json responses):
+
+    /poa      lat, lon, tilt, azimuth, start, end, optional freq (1h),
+              elevation and columns (comma separated, defaults to POA).
+              Returns {"time": [...], "<column>": [...]}, times in UTC.
+    /metrics  Request counts, latency percentiles, cache hits and misses
+              and coalesced batch sizes.
+    /health   {"status": "ok"}.
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from .cli import add_source_arguments, source_fetcher
+from .fleet import Fleet
+from .irradiance_pv import PVSystem, _prepare_times
+from .spa_sb import Ephemeris
+from .tmy import PVGISFetcher, download_tmy
+
+# Columns served by /poa.
+POA_COLUMNS = ["POA", "E_b_poa", "E_g_poa", "E_d_poa", "GHI", "DNI", "DHI"]
+
+
+class ServiceError(Exception):
+    """Error returned to the client with an http status."""
+
+    def __init__(self, message, status=400):
+
+        super().__init__(message)
+        self.status = status
+
+
+class Metrics:
+    """Thread-safe counters and latencies of the service.
+
+    Parameters
+    ----------
+    window : int
+        Latencies kept for the percentiles, the most recent ones.
+    """
+
+    def __init__(self, window=10000):
+
+        self._lock = threading.Lock()
+        self.counters = defaultdict(int)
+        self.latencies = deque(maxlen=window)
+        self.batch_sizes = deque(maxlen=window)
+
+    def count(self, name, n=1):
+
+        with self._lock:
+            self.counters[name] += n
+
+    def observe(self, seconds):
+
+        with self._lock:
+            self.latencies.append(seconds)
+
+    def observe_batch(self, size):
+
+        with self._lock:
+            self.counters["batches"] += 1
+            self.batch_sizes.append(size)
+
+    def snapshot(self):
+        """Metrics as a json-serializable dict."""
+
+        with self._lock:
+            counters = dict(self.counters)
+            latencies = np.array(self.latencies)
+            batch_sizes = np.array(self.batch_sizes)
+
+        metrics = {"counters": counters, "latency_ms": {"count": len(latencies)}}
+        if len(latencies):
+            metrics["latency_ms"].update(
+                {
+                    "mean": latencies.mean() * 1000,
+                    "p50": np.percentile(latencies, 50) * 1000,
+                    "p95": np.percentile(latencies, 95) * 1000,
+                    "max": latencies.max() * 1000,
+                }
+            )
+        if len(batch_sizes):
+            metrics["batch_size"] = {
+                "mean": batch_sizes.mean(),
+                "max": int(batch_sizes.max()),
+            }
+
+        caches = {}
+        for name in sorted({key.split(".")[0] for key in counters if "." in key}):
+            hits = counters.get(name + ".hit", 0)
+            misses = counters.get(name + ".miss", 0)
+            caches[name] = {
+                "hits": hits,
+                "misses": misses,
+                "hit_ratio": hits / (hits + misses) if hits + misses else None,
+            }
+        metrics["caches"] = caches
+
+        return metrics
+
+
+class LRUCache:
+    """Thread-safe mapping keeping the most recently used items within
+    maxsize, counting its hits and misses in metrics as
+    "<name>.hit/miss".
+
+    Parameters
+    ----------
+    weigh : callable, optional
+        Size of an item, maxsize then bounds the total size of the items
+        instead of their number. Items larger than maxsize are not kept.
+    """
+
+    def __init__(self, name, maxsize, metrics, weigh=None):
+
+        self.name = name
+        self.maxsize = maxsize
+        self.metrics = metrics
+        self.weigh = weigh
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                self._items.move_to_end(key)
+
+        self.metrics.count(self.name + (".miss" if item is None else ".hit"))
+
+        return None if item is None else item[0]
+
+    def put(self, key, value):
+
+        weight = 1 if self.weigh is None else self.weigh(value)
+        if weight > self.maxsize:
+            return
+
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._items[key] = (value, weight)
+            self.size += weight
+            while self.size > self.maxsize:
+                _, (_, dropped) = self._items.popitem(last=False)
+                self.size -= dropped
+
+
+def _result_nbytes(result):
+    """Bytes of the arrays of a /poa result, the time labels are shared
+    with the grid cache."""
+
+    return sum(result[key].nbytes for key in POA_COLUMNS)
+
+
+def _utc_naive(timestamp):
+
+    if timestamp.tz is not None:
+        timestamp = timestamp.tz_convert("UTC").tz_localize(None)
+
+    return timestamp
+
+
+class _Batch:
+    """Requests of one time grid waiting to be evaluated together."""
+
+    def __init__(self):
+
+        self.requests = []
+        self.full = threading.Event()
+
+
+class POAService:
+    """Evaluates plane-of-array irradiance requests with warm caches and
+    request coalescing, independently of the http layer.
+
+    Parameters
+    ----------
+    fetcher : object, optional
+        Source of the TMY data (see tmy), defaults to PVGIS.
+    startyear, endyear : int
+        Period of the typical years.
+    window : float
+        Seconds the first request of a time grid waits for others.
+    max_batch : int
+        Sites evaluated at once, a full batch starts without waiting.
+    max_steps : int
+        Largest time grid accepted.
+    grid_cache, tmy_cache : int
+        Number of time grids and sites kept in memory.
+    result_cache_bytes : int
+        Total size of the results kept in memory, defaults to 512 MB. A
+        result takes 56 bytes per time step, e.g. 0.5 MB for a year of
+        hours.
+    """
+
+    def __init__(
+        self,
+        fetcher=None,
+        startyear=2006,
+        endyear=2015,
+        window=0.005,
+        max_batch=256,
+        max_steps=1000000,
+        grid_cache=16,
+        tmy_cache=1024,
+        result_cache_bytes=512 * 2**20,
+    ):
+
+        self.fetcher = fetcher
+        self.startyear = startyear
+        self.endyear = endyear
+        self.window = window
+        self.max_batch = max_batch
+        self.max_steps = max_steps
+
+        self.metrics = Metrics()
+        self.grids = LRUCache("grid", grid_cache, self.metrics)
+        self.tmys = LRUCache("tmy", tmy_cache, self.metrics)
+        self.results = LRUCache(
+            "result", result_cache_bytes, self.metrics, weigh=_result_nbytes
+        )
+
+        self._lock = threading.Lock()
+        self._pending = {}
+
+    def _grid(self, key):
+        """Times index, ephemeris and time labels (ISO strings) of a time
+        grid key (start, end, freq)."""
+
+        grid = self.grids.get(key)
+        if grid is None:
+            start, end, freq = key
+            times = _prepare_times(
+                pd.date_range(start=start, end=end, freq=freq, inclusive="left")
+            )
+            labels = np.datetime_as_string(times.values, unit="s").tolist()
+            grid = (times, Ephemeris(times), labels)
+            self.grids.put(key, grid)
+
+        return grid
+
+    def _fetch_tmys(self, pvsystems):
+        """TMY dataframes of the systems (None on failure) and the errors
+        by position, from the cache or the fetcher. Each location (and
+        elevation, for elevation_dependent fetchers) is retrieved once, whatever the number of orientations.
+        """
+
+        if getattr(self.fetcher, "elevation_dependent", False):
+            keys = [(p.lat, p.lon, p.elev) for p in pvsystems]
+        else:
+            keys = [(p.lat, p.lon) for p in pvsystems]
+        locations = {key: self.tmys.get(key) for key in dict.fromkeys(keys)}
+        missing = [key for key, tmy in locations.items() if tmy is None]
+        failed = {}
+
+        if missing:
+            if self.fetcher is None:
+                self.fetcher = PVGISFetcher(rate=25)
+            fetched, failures = download_tmy(
+                [pvsystems[keys.index(key)] for key in missing],
+                fetcher=self.fetcher,
+                startyear=self.startyear,
+                endyear=self.endyear,
+            )
+            for error in failures:
+                failed[missing[error.index]] = error
+            for key, tmy in zip(missing, fetched):
+                if tmy is not None:
+                    locations[key] = tmy
+                    self.tmys.put(key, tmy)
+
+        tmys = [locations[key] for key in keys]
+        errors = {i: failed[key] for i, key in enumerate(keys) if key in failed}
+
+        return tmys, errors
+
+    def _evaluate(self, grid_key, requests):
+        """Evaluates the sites of a batch as one Fleet and resolves the
+        futures of its requests."""
+
+        # identical sites are evaluated once.
+        sites = {}
+        for site_key, future in requests:
+            sites.setdefault(site_key, []).append(future)
+        self.metrics.observe_batch(len(sites))
+        self.metrics.count("coalesced", len(requests) - 1)
+
+        try:
+            times, ephemeris, labels = self._grid(grid_key)
+            pvsystems = [
+                PVSystem("site", lat, lon, azimuth, tilt, elevation)
+                for lat, lon, tilt, azimuth, elevation in sites
+            ]
+            tmys, errors = self._fetch_tmys(pvsystems)
+
+            valid = [i for i, tmy in enumerate(tmys) if tmy is not None]
+            if valid:
+                fleet = Fleet([pvsystems[i] for i in valid], times)
+                irradiance = dict(fleet.set_tmy_frames([tmys[i] for i in valid]))
+                fleet.get_solar_pos_v(ephemeris=ephemeris)
+                irradiance.update(fleet.get_poa_irradiance_fast())
+        except Exception as err:
+            for futures in sites.values():
+                for future in futures:
+                    future.set_exception(err)
+            return
+
+        for i, (site_key, futures) in enumerate(sites.items()):
+            if i in errors:
+                error = ServiceError(
+                    "TMY data unavailable: {}".format(errors[i].cause), 502
+                )
+                for future in futures:
+                    future.set_exception(error)
+                continue
+
+            column = valid.index(i)
+            result = {
+                key: np.ascontiguousarray(irradiance[key][:, column])
+                for key in POA_COLUMNS
+            }
+            result["time"] = labels
+            self.results.put((grid_key, site_key), result)
+            for future in futures:
+                future.set_result(result)
+
+    def poa(self, lat, lon, tilt, azimuth, start, end, freq="1h", elevation=0.0):
+        """Plane-of-array irradiance of a site over a time grid, blocking
+        until its batch is evaluated.
+
+        Return
+        ------
+        A dict with the keys "time" (list of ISO strings, UTC) and
+        POA_COLUMNS (arrays).
+        """
+
+        try:
+            grid_key = (
+                _utc_naive(pd.Timestamp(start)),
+                _utc_naive(pd.Timestamp(end)),
+                pd.Timedelta(freq),
+            )
+            site_key = tuple(float(v) for v in (lat, lon, tilt, azimuth, elevation))
+        except (TypeError, ValueError) as err:
+            raise ServiceError(str(err)) from err
+
+        if not np.isfinite(site_key).all():
+            raise ServiceError("lat, lon, tilt, azimuth and elevation must be finite")
+        if abs(site_key[0]) > 90 or abs(site_key[1]) > 180:
+            raise ServiceError("lat must be within [-90, 90] and lon [-180, 180]")
+
+        start, end, step = grid_key
+        if not end > start or step <= pd.Timedelta(0):
+            raise ServiceError("end must be after start and freq positive")
+        if (end - start) / step > self.max_steps:
+            raise ServiceError("time grid larger than {} steps".format(self.max_steps))
+
+        result = self.results.get((grid_key, site_key))
+        if result is not None:
+            return result
+
+        future = Future()
+        with self._lock:
+            batch = self._pending.get(grid_key)
+            leader = batch is None
+            if leader:
+                batch = self._pending[grid_key] = _Batch()
+            batch.requests.append((site_key, future))
+            if len(batch.requests) >= self.max_batch:
+                del self._pending[grid_key]
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._pending.get(grid_key) is batch:
+                    del self._pending[grid_key]
+            self._evaluate(grid_key, batch.requests)
+
+        return future.result()
+
+    def handle(self, path, query):
+        """Answers a request of the http layer.
+
+        Return
+        ------
+        A tuple (status, json-serializable body).
+        """
+
+        start = time.perf_counter()
+        self.metrics.count("requests")
+
+        try:
+            if path == "/health":
+                return 200, {"status": "ok"}
+            if path == "/metrics":
+                return 200, self.metrics.snapshot()
+            if path != "/poa":
+                raise ServiceError("unknown path {}".format(path), 404)
+
+            params = {key: values[-1] for key, values in query.items()}
+            missing = [
+                key
+                for key in ("lat", "lon", "tilt", "azimuth", "start", "end")
+                if key not in params
+            ]
+            if missing:
+                raise ServiceError("missing parameters: {}".format(", ".join(missing)))
+            columns = params.get("columns", "POA").split(",")
+            unknown = set(columns) - set(POA_COLUMNS)
+            if unknown:
+                raise ServiceError("unknown columns: {}".format(", ".join(unknown)))
+
+            result = self.poa(
+                params["lat"],
+                params["lon"],
+                params["tilt"],
+                params["azimuth"],
+                params["start"],
+                params["end"],
+                freq=params.get("freq", "1h"),
+                elevation=params.get("elevation", 0.0),
+            )
+
+            body = {"time": result["time"]}
+            for column in columns:
+                body[column] = result[column].tolist()
+
+            return 200, body
+
+        except ServiceError as err:
+            self.metrics.count("errors")
+            return err.status, {"error": str(err)}
+        except Exception as err:
+            self.metrics.count("errors")
+            return 500, {"error": "{}: {}".format(type(err).__name__, err)}
+        finally:
+            self.metrics.observe(time.perf_counter() - start)
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+
+        url = urlparse(self.path)
+        status, body = self.server.service.handle(url.path, parse_qs(url.query))
+        payload = json.dumps(body).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+
+def serve(service=None, host="127.0.0.1", port=8080, verbose=False):
+    """Creates the http server of a POAService, each request is handled
+    in its own thread. Run it with serve_forever(), stop it with
+    shutdown().
+
+    Return
+    ------
+    A ThreadingHTTPServer, its address is server.server_address (port 0
+    picks a free port).
+    """
+
+    server = ThreadingHTTPServer((host, port), _Handler)
+    server.daemon_threads = True
+    server.service = service if service is not None else POAService()
+    server.verbose = verbose
+
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="irradiance-pv-serve", description=__doc__.split("\n\n")[0].strip()
+    )
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    add_source_arguments(parser)
+    parser.add_argument(
+        "--window", type=float, default=0.005, help="coalescing window in seconds"
+    )
+    parser.add_argument("--verbose", action="store_true", help="log every request")
+    args = parser.parse_args(argv)
+    fetcher = source_fetcher(parser, args)
+
+    service = POAService(
+        fetcher=fetcher,
+        startyear=args.startyear,
+        endyear=args.endyear,
+        window=args.window,
+    )
+    server = serve(service, args.host, args.port, verbose=args.verbose)
+    print("serving on http://{}:{}".format(*server.server_address), flush=True)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,733 @@
+# irradiance pv solar tiers module
+
+"""
+Solar position precision tiers sharing the interface of spa_sb.Ephemeris.
+
+Each tier tabulates the site-independent terms of a times index once, and
+evaluates any number of observers with solar_position(lat, lon):
+
+    ====  =================  ===========  =========================
+    tier  class              error bound  throughput, 1 / 100 sites
+    ====  =================  ===========  =========================
+    low   LowOrderEphemeris  0.2 deg      5.5 / 24 M steps/s
+    usno  spa_sb.Ephemeris   0.02 deg     5.5 / 14 M steps/s
+    spa   SPAEphemeris       0.005 deg    3.9 / 6.7 M steps/s
+    ====  =================  ===========  =========================
+
+The error bounds (ERROR_BOUNDS) are the maximum angle between the
+computed and the geometric sun direction over 1950-2050, measured against
+SPAEphemeris. SPAEphemeris follows the NREL Solar Position Algorithm
+(Reda and Andreas, 2008), accurate to 0.0003 deg given UT1 times; its
+bound allows for UTC inputs (|UT1 - UTC| < 0.9 s). None of the tiers
+corrects the altitude for refraction.
+
+Throughputs are for a 1-minute year, see benchmarks/run.py. For a single
+site the time is mostly spent in the site-independent terms; on an
+hourly year, which has fewer steps to share them, the spa tier drops to
+0.4 M steps/s for one site.
+
+    >>> ephemeris = solar_ephemeris(times, tolerance=0.01)  # spa tier
+    >>> irradiance.get_solar_pos_v(ephemeris=ephemeris)
+"""
+
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from .spa_sb import Ephemeris, days_since_epoch
+from .timing import timed
+
+# Maximum error of each tier, in degrees, see the module docstring.
+ERROR_BOUNDS = {
+    "low": 0.2,
+    "usno": 0.02,
+    "spa": 0.005,
+}
+
+# Difference between terrestrial and universal time in seconds, ~2020.
+DELTA_T = 69.0
+
+# Earth heliocentric longitude (L), latitude (B) and radius vector (R)
+# periodic terms A, B, C of the NREL SPA, one table per power of the
+# Julian ephemeris millennium.
+L_TERMS = [
+    [
+        (175347046, 0, 0),
+        (3341656, 4.6692568, 6283.07585),
+        (34894, 4.6261, 12566.1517),
+        (3497, 2.7441, 5753.3849),
+        (3418, 2.8289, 3.5231),
+        (3136, 3.6277, 77713.7715),
+        (2676, 4.4181, 7860.4194),
+        (2343, 6.1352, 3930.2097),
+        (1324, 0.7425, 11506.7698),
+        (1273, 2.0371, 529.691),
+        (1199, 1.1096, 1577.3435),
+        (990, 5.233, 5884.927),
+        (902, 2.045, 26.298),
+        (857, 3.508, 398.149),
+        (780, 1.179, 5223.694),
+        (753, 2.533, 5507.553),
+        (505, 4.583, 18849.228),
+        (492, 4.205, 775.523),
+        (357, 2.92, 0.067),
+        (317, 5.849, 11790.629),
+        (284, 1.899, 796.298),
+        (271, 0.315, 10977.079),
+        (243, 0.345, 5486.778),
+        (206, 4.806, 2544.314),
+        (205, 1.869, 5573.143),
+        (202, 2.458, 6069.777),
+        (156, 0.833, 213.299),
+        (132, 3.411, 2942.463),
+        (126, 1.083, 20.775),
+        (115, 0.645, 0.98),
+        (103, 0.636, 4694.003),
+        (102, 0.976, 15720.839),
+        (102, 4.267, 7.114),
+        (99, 6.21, 2146.17),
+        (98, 0.68, 155.42),
+        (86, 5.98, 161000.69),
+        (85, 1.3, 6275.96),
+        (85, 3.67, 71430.7),
+        (80, 1.81, 17260.15),
+        (79, 3.04, 12036.46),
+        (75, 1.76, 5088.63),
+        (74, 3.5, 3154.69),
+        (74, 4.68, 801.82),
+        (70, 0.83, 9437.76),
+        (62, 3.98, 8827.39),
+        (61, 1.82, 7084.9),
+        (57, 2.78, 6286.6),
+        (56, 4.39, 14143.5),
+        (56, 3.47, 6279.55),
+        (52, 0.19, 12139.55),
+        (52, 1.33, 1748.02),
+        (51, 0.28, 5856.48),
+        (49, 0.49, 1194.45),
+        (41, 5.37, 8429.24),
+        (41, 2.4, 19651.05),
+        (39, 6.17, 10447.39),
+        (37, 6.04, 10213.29),
+        (37, 2.57, 1059.38),
+        (36, 1.71, 2352.87),
+        (36, 1.78, 6812.77),
+        (33, 0.59, 17789.85),
+        (30, 0.44, 83996.85),
+        (30, 2.74, 1349.87),
+        (25, 3.16, 4690.48),
+    ],
+    [
+        (628331966747, 0, 0),
+        (206059, 2.678235, 6283.07585),
+        (4303, 2.6351, 12566.1517),
+        (425, 1.59, 3.523),
+        (119, 5.796, 26.298),
+        (109, 2.966, 1577.344),
+        (93, 2.59, 18849.23),
+        (72, 1.14, 529.69),
+        (68, 1.87, 398.15),
+        (67, 4.41, 5507.55),
+        (59, 2.89, 5223.69),
+        (56, 2.17, 155.42),
+        (45, 0.4, 796.3),
+        (36, 0.47, 775.52),
+        (29, 2.65, 7.11),
+        (21, 5.34, 0.98),
+        (19, 1.85, 5486.78),
+        (19, 4.97, 213.3),
+        (17, 2.99, 6275.96),
+        (16, 0.03, 2544.31),
+        (16, 1.43, 2146.17),
+        (15, 1.21, 10977.08),
+        (12, 2.83, 1748.02),
+        (12, 3.26, 5088.63),
+        (12, 5.27, 1194.45),
+        (12, 2.08, 4694),
+        (11, 0.77, 553.57),
+        (10, 1.3, 6286.6),
+        (10, 4.24, 1349.87),
+        (9, 2.7, 242.73),
+        (9, 5.64, 951.72),
+        (8, 5.3, 2352.87),
+        (6, 2.65, 9437.76),
+        (6, 4.67, 4690.48),
+    ],
+    [
+        (52919, 0, 0),
+        (8720, 1.0721, 6283.0758),
+        (309, 0.867, 12566.152),
+        (27, 0.05, 3.52),
+        (16, 5.19, 26.3),
+        (16, 3.68, 155.42),
+        (10, 0.76, 18849.23),
+        (9, 2.06, 77713.77),
+        (7, 0.83, 775.52),
+        (5, 4.66, 1577.34),
+        (4, 1.03, 7.11),
+        (4, 3.44, 5573.14),
+        (3, 5.14, 796.3),
+        (3, 6.05, 5507.55),
+        (3, 1.19, 242.73),
+        (3, 6.12, 529.69),
+        (3, 0.31, 398.15),
+        (3, 2.28, 553.57),
+        (2, 4.38, 5223.69),
+        (2, 3.75, 0.98),
+    ],
+    [
+        (289, 5.844, 6283.076),
+        (35, 0, 0),
+        (17, 5.49, 12566.15),
+        (3, 5.2, 155.42),
+        (1, 4.72, 3.52),
+        (1, 5.3, 18849.23),
+        (1, 5.97, 242.73),
+    ],
+    [
+        (114, 3.142, 0),
+        (8, 4.13, 6283.08),
+        (1, 3.84, 12566.15),
+    ],
+    [
+        (1, 3.14, 0),
+    ],
+]
+B_TERMS = [
+    [
+        (280, 3.199, 84334.662),
+        (102, 5.422, 5507.553),
+        (80, 3.88, 5223.69),
+        (44, 3.7, 2352.87),
+        (32, 4, 1577.34),
+    ],
+    [
+        (9, 3.9, 5507.55),
+        (6, 1.73, 5223.69),
+    ],
+]
+R_TERMS = [
+    [
+        (100013989, 0, 0),
+        (1670700, 3.0984635, 6283.07585),
+        (13956, 3.05525, 12566.1517),
+        (3084, 5.1985, 77713.7715),
+        (1628, 1.1739, 5753.3849),
+        (1576, 2.8469, 7860.4194),
+        (925, 5.453, 11506.77),
+        (542, 4.564, 3930.21),
+        (472, 3.661, 5884.927),
+        (346, 0.964, 5507.553),
+        (329, 5.9, 5223.694),
+        (307, 0.299, 5573.143),
+        (243, 4.273, 11790.629),
+        (212, 5.847, 1577.344),
+        (186, 5.022, 10977.079),
+        (175, 3.012, 18849.228),
+        (110, 5.055, 5486.778),
+        (98, 0.89, 6069.78),
+        (86, 5.69, 15720.84),
+        (86, 1.27, 161000.69),
+        (65, 0.27, 17260.15),
+        (63, 0.92, 529.69),
+        (57, 2.01, 83996.85),
+        (56, 5.24, 71430.7),
+        (49, 3.25, 2544.31),
+        (47, 2.58, 775.52),
+        (45, 5.54, 9437.76),
+        (43, 6.01, 6275.96),
+        (39, 5.36, 4694),
+        (38, 2.39, 8827.39),
+        (37, 0.83, 19651.05),
+        (37, 4.9, 12139.55),
+        (36, 1.67, 12036.46),
+        (35, 1.84, 2942.46),
+        (33, 0.24, 7084.9),
+        (32, 0.18, 5088.63),
+        (32, 1.78, 398.15),
+        (28, 1.21, 6286.6),
+        (28, 1.9, 6279.55),
+        (26, 4.59, 10447.39),
+    ],
+    [
+        (103019, 1.10749, 6283.07585),
+        (1721, 1.0644, 12566.1517),
+        (702, 3.142, 0),
+        (32, 1.02, 18849.23),
+        (31, 2.84, 5507.55),
+        (25, 1.32, 5223.69),
+        (18, 1.42, 1577.34),
+        (10, 5.91, 10977.08),
+        (9, 1.42, 6275.96),
+        (9, 0.27, 5486.78),
+    ],
+    [
+        (4359, 5.7846, 6283.0758),
+        (124, 5.579, 12566.152),
+        (12, 3.14, 0),
+        (9, 3.63, 77713.77),
+        (6, 1.87, 5573.14),
+        (3, 5.47, 18849.23),
+    ],
+    [
+        (145, 4.273, 6283.076),
+        (7, 3.92, 12566.15),
+    ],
+    [
+        (4, 2.56, 6283.08),
+    ],
+]
+
+# Nutation terms: multiples of the mean elongation of the moon, anomaly
+# of the sun, anomaly of the moon, argument of latitude of the moon and
+# longitude of the ascending node, then the coefficients a, b (longitude)
+# and c, d (obliquity) in 0.0001 arcseconds.
+NUTATION_TERMS = np.array(
+    [
+        (0, 0, 0, 0, 1, -171996, -174.2, 92025, 8.9),
+        (-2, 0, 0, 2, 2, -13187, -1.6, 5736, -3.1),
+        (0, 0, 0, 2, 2, -2274, -0.2, 977, -0.5),
+        (0, 0, 0, 0, 2, 2062, 0.2, -895, 0.5),
+        (0, 1, 0, 0, 0, 1426, -3.4, 54, -0.1),
+        (0, 0, 1, 0, 0, 712, 0.1, -7, 0),
+        (-2, 1, 0, 2, 2, -517, 1.2, 224, -0.6),
+        (0, 0, 0, 2, 1, -386, -0.4, 200, 0),
+        (0, 0, 1, 2, 2, -301, 0, 129, -0.1),
+        (-2, -1, 0, 2, 2, 217, -0.5, -95, 0.3),
+        (-2, 0, 1, 0, 0, -158, 0, 0, 0),
+        (-2, 0, 0, 2, 1, 129, 0.1, -70, 0),
+        (0, 0, -1, 2, 2, 123, 0, -53, 0),
+        (2, 0, 0, 0, 0, 63, 0, 0, 0),
+        (0, 0, 1, 0, 1, 63, 0.1, -33, 0),
+        (2, 0, -1, 2, 2, -59, 0, 26, 0),
+        (0, 0, -1, 0, 1, -58, -0.1, 32, 0),
+        (0, 0, 1, 2, 1, -51, 0, 27, 0),
+        (-2, 0, 2, 0, 0, 48, 0, 0, 0),
+        (0, 0, -2, 2, 1, 46, 0, -24, 0),
+        (2, 0, 0, 2, 2, -38, 0, 16, 0),
+        (0, 0, 2, 2, 2, -31, 0, 13, 0),
+        (0, 0, 2, 0, 0, 29, 0, 0, 0),
+        (-2, 0, 1, 2, 2, 29, 0, -12, 0),
+        (0, 0, 0, 2, 0, 26, 0, 0, 0),
+        (-2, 0, 0, 2, 0, -22, 0, 0, 0),
+        (0, 0, -1, 2, 1, 21, 0, -10, 0),
+        (0, 2, 0, 0, 0, 17, -0.1, 0, 0),
+        (2, 0, -1, 0, 1, 16, 0, -8, 0),
+        (-2, 2, 0, 2, 2, -16, 0.1, 7, 0),
+        (0, 1, 0, 0, 1, -15, 0, 9, 0),
+        (-2, 0, 1, 0, 1, -13, 0, 7, 0),
+        (0, -1, 0, 0, 1, -12, 0, 6, 0),
+        (0, 0, 2, -2, 0, 11, 0, 0, 0),
+        (2, 0, -1, 2, 1, -10, 0, 5, 0),
+        (2, 0, 1, 2, 2, -8, 0, 3, 0),
+        (0, 1, 0, 2, 2, 7, 0, -3, 0),
+        (-2, 1, 1, 0, 0, -7, 0, 0, 0),
+        (0, -1, 0, 2, 2, -7, 0, 3, 0),
+        (2, 0, 0, 2, 1, -7, 0, 3, 0),
+        (2, 0, 1, 0, 0, 6, 0, 0, 0),
+        (-2, 0, 2, 2, 2, 6, 0, -3, 0),
+        (-2, 0, 1, 2, 1, 6, 0, -3, 0),
+        (2, 0, -2, 0, 1, -6, 0, 3, 0),
+        (2, 0, 0, 0, 1, -6, 0, 3, 0),
+        (0, -1, 1, 0, 0, 5, 0, 0, 0),
+        (-2, -1, 0, 2, 1, -5, 0, 3, 0),
+        (-2, 0, 0, 0, 1, -5, 0, 3, 0),
+        (0, 0, 2, 2, 1, -5, 0, 3, 0),
+        (-2, 0, 2, 0, 1, 4, 0, 0, 0),
+        (-2, 1, 0, 2, 1, 4, 0, 0, 0),
+        (0, 0, 1, -2, 0, 4, 0, 0, 0),
+        (-1, 0, 1, 0, 0, -4, 0, 0, 0),
+        (-2, 1, 0, 0, 0, -4, 0, 0, 0),
+        (1, 0, 0, 0, 0, -4, 0, 0, 0),
+        (0, 0, 1, 2, 0, 3, 0, 0, 0),
+        (0, 0, -2, 2, 2, -3, 0, 0, 0),
+        (-1, -1, 1, 0, 0, -3, 0, 0, 0),
+        (0, 1, 1, 0, 0, -3, 0, 0, 0),
+        (0, -1, 1, 2, 2, -3, 0, 0, 0),
+        (2, -1, -1, 2, 2, -3, 0, 0, 0),
+        (0, 0, 3, 2, 2, -3, 0, 0, 0),
+        (2, -1, 0, 2, 2, -3, 0, 0, 0),
+    ]
+)
+
+
+def _periodic_sum(tables, JME):
+    """Sums the periodic terms of each table, weighted by the powers of
+    JME, as in the earth heliocentric position of the NREL SPA."""
+
+    total = np.zeros_like(JME)
+    # Horner scheme over the powers of JME.
+    for table in reversed(tables):
+        terms = np.zeros_like(JME)
+        for a, b, c in table:
+            terms += a * np.cos(b + c * JME)
+        total = total * JME + terms
+
+    return total / 1e8
+
+
+def _azimuth_altitude(sin_lat, cos_lat, sin_dec, cos_dec, sin_ha, cos_ha):
+    """Topocentric altitude and azimuth (from north, eastward) in
+    degrees, from the declination and hour angle."""
+
+    solar_altitude = np.degrees(
+        np.arcsin(np.clip(sin_lat * sin_dec + cos_lat * cos_dec * cos_ha, -1, 1))
+    )
+    solar_azimuth = np.degrees(
+        np.arctan2(sin_ha * cos_dec, cos_ha * cos_dec * sin_lat - sin_dec * cos_lat)
+    )
+    solar_azimuth += 180
+
+    return solar_altitude, solar_azimuth
+
+
+class _TabulatedEphemeris(ABC):
+    """Base of the tiers tabulating the declination and the Greenwich
+    hour angle of the sun. solar_position evaluates the observers in
+    blocks of rows, so the temporaries stay bounded for large fleets."""
+
+    # (time x site) values evaluated at once.
+    block_size = 2**18
+
+    def __len__(self):
+        return len(self.D)
+
+    def __getitem__(self, rows):
+        """Ephemeris of a slice of times, sharing the tabulated terms."""
+
+        ephemeris = self.__class__.__new__(self.__class__)
+        for name, value in vars(self).items():
+            if name == "times" or isinstance(value, np.ndarray):
+                value = value[rows]
+            setattr(ephemeris, name, value)
+
+        return ephemeris
+
+    @abstractmethod
+    def _position(self, rows, lat, lon, **kwargs):
+        """Altitude and azimuth in degrees for the rows (a slice)."""
+
+    @timed("solar_position")
+    def solar_position(self, lat, lon, out=None, **kwargs):
+        """Evaluates the solar position of one or several observers, see
+        spa_sb.Ephemeris.solar_position."""
+
+        lat, lon = np.broadcast_arrays(
+            np.asarray(lat, dtype=float), np.asarray(lon, dtype=float)
+        )
+
+        if out is None:
+            shape = (len(self),) + lat.shape
+            out = tuple(np.empty(shape, dtype=self.dtype) for _ in range(3))
+        solar_altitude, solar_zenith, solar_azimuth = out
+
+        step = max(1, self.block_size // max(lat.size, 1))
+        for first in range(0, len(self), step):
+            rows = slice(first, first + step)
+            altitude, azimuth = self._position(rows, lat, lon, **kwargs)
+            solar_altitude[rows] = altitude
+            solar_azimuth[rows] = azimuth
+
+        np.subtract(90, solar_altitude, out=solar_zenith)
+
+        return solar_altitude, solar_zenith, solar_azimuth
+
+    def _columns(self, rows, lat, *names):
+        """The tabulated terms names of rows, as columns when there are
+        several observers."""
+
+        columns = [getattr(self, name)[rows] for name in names]
+        if lat.ndim:
+            columns = [column[:, np.newaxis] for column in columns]
+
+        return columns
+
+
+class LowOrderEphemeris(_TabulatedEphemeris):
+    """Low order solar position: declination and equation of time from
+    the Fourier series of Spencer (1971), as in the NOAA general solar
+    position calculations.
+
+    Parameters
+    ----------
+    times : DateTimeIndex, datetime64 array or epoch seconds array
+        Assumed to be in UTC.
+    dtype : numpy dtype
+        Floating point type of the solar positions.
+    """
+
+    @timed("ephemeris")
+    def __init__(self, times, dtype=np.float64):
+
+        self.times = times
+        self.dtype = np.dtype(dtype)
+
+        D = days_since_epoch(times)
+        # fractional year, over mean years from January 1, 2000 0h.
+        day = D + 0.5
+        gamma = 2 * np.pi / 365.2422 * (day % 365.2422)
+        # harmonics by angle addition, two trigonometric functions only.
+        cos1, sin1 = np.cos(gamma), np.sin(gamma)
+        cos2, sin2 = 2 * cos1 * cos1 - 1, 2 * sin1 * cos1
+        cos3, sin3 = cos2 * cos1 - sin2 * sin1, sin2 * cos1 + cos2 * sin1
+
+        declination = (
+            0.006918
+            - 0.399912 * cos1
+            + 0.070257 * sin1
+            - 0.006758 * cos2
+            + 0.000907 * sin2
+            - 0.002697 * cos3
+            + 0.00148 * sin3
+        )
+        # equation of time, in minutes.
+        eot = 229.18 * (
+            0.000075
+            + 0.001868 * cos1
+            - 0.032077 * sin1
+            - 0.014615 * cos2
+            - 0.040849 * sin2
+        )
+
+        self.sin_declination = np.sin(declination)
+        self.cos_declination = np.cos(declination)
+        # hour angle at Greenwich, tabulated as sine and cosine.
+        hour_angle = np.radians((day % 1) * 360 + eot / 4 - 180)
+        self.sin_hour_angle = np.sin(hour_angle)
+        self.cos_hour_angle = np.cos(hour_angle)
+        self.D = D
+
+    def _position(self, rows, lat, lon):
+
+        sin_dec, cos_dec, sin_ha0, cos_ha0 = self._columns(
+            rows,
+            lat,
+            "sin_declination",
+            "cos_declination",
+            "sin_hour_angle",
+            "cos_hour_angle",
+        )
+        phi, lon = np.radians(lat), np.radians(lon)
+        sin_lon, cos_lon = np.sin(lon), np.cos(lon)
+
+        # hour angle = Greenwich hour angle + lon, by angle addition.
+        return _azimuth_altitude(
+            np.sin(phi),
+            np.cos(phi),
+            sin_dec,
+            cos_dec,
+            sin_ha0 * cos_lon + cos_ha0 * sin_lon,
+            cos_ha0 * cos_lon - sin_ha0 * sin_lon,
+        )
+
+
+def _geocentric_sun(D, delta_t):
+    """Apparent right ascension (degrees), declination (radians), earth
+    radius vector (AU) and equation of the equinoxes (degrees) of the sun
+    at D days since J2000.0 (UT), following the NREL SPA."""
+
+    JCE = (D + delta_t / 86400) / 36525
+    JME = JCE / 10
+
+    # Earth heliocentric position, then geocentric sun.
+    L = np.degrees(_periodic_sum(L_TERMS, JME))
+    B = np.degrees(_periodic_sum(B_TERMS, JME))
+    R = _periodic_sum(R_TERMS, JME)
+    theta = (L + 180) % 360
+    beta = np.radians(-B)
+
+    # Nutation in longitude and obliquity, in degrees.
+    X = np.radians(
+        np.stack(
+            [
+                297.85036 + 445267.111480 * JCE - 0.0019142 * JCE**2 + JCE**3 / 189474,
+                357.52772 + 35999.050340 * JCE - 0.0001603 * JCE**2 - JCE**3 / 300000,
+                134.96298 + 477198.867398 * JCE + 0.0086972 * JCE**2 + JCE**3 / 56250,
+                93.27191 + 483202.017538 * JCE - 0.0036825 * JCE**2 + JCE**3 / 327270,
+                125.04452 - 1934.136261 * JCE + 0.0020708 * JCE**2 + JCE**3 / 450000,
+            ]
+        )
+    )
+    arguments = NUTATION_TERMS[:, :5] @ X
+    a, b, c, d = NUTATION_TERMS[:, 5:].T[..., np.newaxis]
+    delta_psi = ((a + b * JCE) * np.sin(arguments)).sum(axis=0) / 36e6
+    delta_epsilon = ((c + d * JCE) * np.cos(arguments)).sum(axis=0) / 36e6
+
+    # True obliquity of the ecliptic.
+    U = JME / 10
+    epsilon0 = np.polyval(
+        [2.45, 5.79, 27.87, 7.12, -39.05, -249.67, -51.38, 1999.25, -1.55], U
+    )
+    epsilon0 = 84381.448 + U * (-4680.93 + U * epsilon0)
+    epsilon = np.radians(epsilon0 / 3600 + delta_epsilon)
+
+    # Apparent sun longitude, with the aberration correction.
+    lamda = np.radians(theta + delta_psi - 20.4898 / (3600 * R))
+
+    alpha = np.degrees(
+        np.arctan2(
+            np.sin(lamda) * np.cos(epsilon) - np.tan(beta) * np.sin(epsilon),
+            np.cos(lamda),
+        )
+    )
+    delta = np.arcsin(
+        np.sin(beta) * np.cos(epsilon) + np.cos(beta) * np.sin(epsilon) * np.sin(lamda)
+    )
+
+    return alpha, delta, R, delta_psi * np.cos(epsilon)
+
+
+class SPAEphemeris(_TabulatedEphemeris):
+    """Solar position of the NREL Solar Position Algorithm (Reda and
+    Andreas, 2008), without the atmospheric refraction correction.
+
+    The geocentric position of the sun (some 300 periodic terms) varies
+    slowly: on time indexes denser than 3-hourly it is evaluated every
+    3 hours and interpolated, which changes the positions by less than
+    2e-5 deg. The sidereal time is evaluated at every time step.
+    solar_position then applies the parallax of each observer.
+
+    Parameters
+    ----------
+    times : DateTimeIndex, datetime64 array or epoch seconds array
+        Assumed to be in UTC (taken as UT1).
+    delta_t : float
+        Difference between terrestrial and universal time, in seconds.
+    dtype : numpy dtype
+        Floating point type of the solar positions.
+    """
+
+    # Spacing in days of the interpolated geocentric positions.
+    node_spacing = 1 / 8
+
+    @timed("ephemeris")
+    def __init__(self, times, delta_t=DELTA_T, dtype=np.float64):
+
+        self.times = times
+        self.dtype = np.dtype(dtype)
+
+        D = days_since_epoch(times)
+        JC = D / 36525
+
+        nodes = None
+        if len(D):
+            first = np.floor(D.min() / self.node_spacing)
+            last = np.ceil(D.max() / self.node_spacing)
+            if last - first + 1 < len(D):
+                nodes = np.arange(first, last + 1) * self.node_spacing
+
+        if nodes is None:
+            alpha, delta, R, equinoxes = _geocentric_sun(D, delta_t)
+        else:
+            alpha, delta, R, equinoxes = _geocentric_sun(nodes, delta_t)
+            alpha = np.interp(D, nodes, np.unwrap(alpha, period=360))
+            delta, R, equinoxes = [
+                np.interp(D, nodes, values) for values in (delta, R, equinoxes)
+            ]
+
+        # Apparent sidereal time at Greenwich, in degrees.
+        nu = (
+            280.46061837
+            + 360.98564736629 * D
+            + 0.000387933 * JC**2
+            - JC**3 / 38710000
+            + equinoxes
+        )
+
+        # Greenwich hour angle and geocentric declination of the sun.
+        self.hour_angle = (nu - alpha) % 360
+        self.sin_declination = np.sin(delta)
+        self.cos_declination = np.cos(delta)
+        # Equatorial horizontal parallax of the sun.
+        self.sin_parallax = np.sin(np.radians(8.794 / (3600 * R)))
+        self.D = D
+
+    def solar_position(self, lat, lon, out=None, elevation=0.0):
+        """Evaluates the topocentric solar position of one or several
+        observers, see spa_sb.Ephemeris.solar_position.
+
+        Parameters
+        ----------
+        elevation : float
+            Observers elevation in meters, for the parallax.
+        """
+
+        return super().solar_position(lat, lon, out=out, elevation=elevation)
+
+    def _position(self, rows, lat, lon, elevation):
+
+        sin_dec, cos_dec, hour_angle, sin_xi = self._columns(
+            rows,
+            lat,
+            "sin_declination",
+            "cos_declination",
+            "hour_angle",
+            "sin_parallax",
+        )
+        phi = np.radians(lat)
+        ha = np.radians(hour_angle + lon)
+        sin_ha, cos_ha = np.sin(ha), np.cos(ha)
+
+        # Parallax in right ascension and topocentric declination.
+        u = np.arctan(0.99664719 * np.tan(phi))
+        x = np.cos(u) + elevation / 6378140 * np.cos(phi)
+        y = 0.99664719 * np.sin(u) + elevation / 6378140 * np.sin(phi)
+
+        denominator = cos_dec - x * sin_xi * cos_ha
+        delta_alpha = np.arctan2(-x * sin_xi * sin_ha, denominator)
+        dec = np.arctan2((sin_dec - y * sin_xi) * np.cos(delta_alpha), denominator)
+        ha = ha - delta_alpha
+
+        return _azimuth_altitude(
+            np.sin(phi), np.cos(phi), np.sin(dec), np.cos(dec), np.sin(ha), np.cos(ha)
+        )
+
+
+# Ephemeris class of each tier, from the cheapest to the most accurate.
+TIERS = {
+    "low": LowOrderEphemeris,
+    "usno": Ephemeris,
+    "spa": SPAEphemeris,
+}
+
+
+def select_tier(tolerance):
+    """Name of the cheapest tier whose error bound is within tolerance,
+    in degrees."""
+
+    for tier in TIERS:
+        if ERROR_BOUNDS[tier] <= tolerance:
+            return tier
+
+    raise ValueError(
+        "no solar position tier is accurate to {} deg, the best is {} deg".format(
+            tolerance, min(ERROR_BOUNDS.values())
+        )
+    )
+
+
+def solar_ephemeris(times, tier="usno", tolerance=None, dtype=np.float64):
+    """Site-independent solar position terms of times for a tier.
+
+    Parameters
+    ----------
+    times : DateTimeIndex, datetime64 array or epoch seconds array
+        Assumed to be in UTC.
+    tier : {"low", "usno", "spa"}
+        Ignored when tolerance is given.
+    tolerance : float, optional
+        Required accuracy in degrees, selects the cheapest tier meeting
+        it (see select_tier).
+
+    Return
+    ------
+    An ephemeris of TIERS, to be passed to get_solar_pos_v or evaluated
+    with solar_position(lat, lon).
+    """
+
+    if tolerance is not None:
+        tier = select_tier(tolerance)
+    if tier not in TIERS:
+        raise ValueError("tier must be one of {}, got {!r}".format(list(TIERS), tier))
+
+    return TIERS[tier](times, dtype=dtype)
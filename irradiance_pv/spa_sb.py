@@ -18,6 +18,8 @@ import math
 import numpy as np
 import pandas as pd
 
+from .timing import timed
+
 # TDB Julian date of epoch J2000.0
 EPOCHS_JULIAN_DATE = 2451545
 
@@ -241,7 +243,220 @@ def solar_position(time, lat, lon):
     return [altitude, azimuth]
 
 
-def solar_position_vect(times, lat, lon):
+def days_since_epoch(times):
+    """Calculates the days elapsed since the J2000.0 epoch (2000 noon UTC).
+
+    Args:
+      times : A DateTimeIndex, an array of datetime64 (assumed UTC) or an
+        array of seconds since January 1, 1970.
+    Return :
+      Array of float64 days.
+    """
+
+    if isinstance(times, pd.DatetimeIndex):
+        # .values holds the UTC instants, also for localized indexes.
+        times = times.values
+    times = np.asarray(times)
+
+    if np.issubdtype(times.dtype, np.datetime64):
+        return (times - np.datetime64("2000-01-01T12:00:00")) / np.timedelta64(1, "D")
+
+    return times / 86400 + (2440587.5 - EPOCHS_JULIAN_DATE)
+
+
+class Ephemeris:
+    """Site-independent terms of the solar position for a times index.
+
+    The days since epoch, the ecliptic longitude of the sun, the earth
+    axial tilt and the Greenwich mean sidereal time only depend on times.
+    They are computed once, together with their sines and cosines, and
+    can then be reused to evaluate any number of observers.
+
+    Args
+    ----
+    times : A DateTimeIndex, datetime64 array or epoch seconds array,
+        assumed to be in UTC.
+    dtype : Floating point type of the tabulated terms and of the solar
+        positions evaluated from them. The angles themselves are always
+        computed in float64, float32 only halves the memory footprint.
+    """
+
+    @timed("ephemeris")
+    def __init__(self, times, dtype=np.float64):
+
+        self.times = times
+        self.dtype = np.dtype(dtype)
+
+        D = days_since_epoch(times)
+
+        # Intermediate angles are released as soon as they are tabulated.
+
+        sun_mean_ano = np.radians(
+            (SUNS_MEAN_ANOMALY_AT_EPOCH + EARTHS_MEAN_ANGULAR_ROTATION * D) % 360
+        )
+        sun_ecliptic_lon = (SUNS_MEAN_LONGITUDE_AT_EPOCH + 0.98564736 * D) % 360
+        sun_ecliptic_lon += 1.915 * np.sin(sun_mean_ano)
+        sun_ecliptic_lon += 0.020 * np.sin(2 * sun_mean_ano)
+        del sun_mean_ano
+        sun_ecliptic_lon = np.radians(sun_ecliptic_lon, out=sun_ecliptic_lon)
+
+        self.sin_ecliptic_lon = np.sin(sun_ecliptic_lon).astype(dtype, copy=False)
+        self.cos_ecliptic_lon = np.cos(sun_ecliptic_lon).astype(dtype, copy=False)
+        del sun_ecliptic_lon
+
+        earth_axial_tilt = np.radians(
+            EARTHS_ECLIPTIC_MEAN_OBLIQUITY - EARTHS_ECLIPTIC_OBLIQUITY_CHANGE_RATE * D
+        )
+        self.sin_axial_tilt = np.sin(earth_axial_tilt).astype(dtype, copy=False)
+        self.cos_axial_tilt = np.cos(earth_axial_tilt).astype(dtype, copy=False)
+        del earth_axial_tilt
+
+        # Greenwich mean sideral time (gmst), as an angle in radians.
+        gmst = (
+            18.697374558 + (24.06570982441908 * D) + (0.000026 * ((D / 36525) ** 2))
+        ) % 24
+        gmst = np.radians(gmst * 15, out=gmst)
+        self.sin_gmst = np.sin(gmst).astype(dtype, copy=False)
+        self.cos_gmst = np.cos(gmst).astype(dtype, copy=False)
+
+        self.D = D
+
+    def __len__(self):
+        return len(self.D)
+
+    def __getitem__(self, rows):
+        """Ephemeris of a slice of times, sharing the tabulated terms."""
+
+        ephemeris = Ephemeris.__new__(Ephemeris)
+        ephemeris.times = self.times[rows]
+        ephemeris.dtype = self.dtype
+        for name in (
+            "D",
+            "sin_ecliptic_lon",
+            "cos_ecliptic_lon",
+            "sin_axial_tilt",
+            "cos_axial_tilt",
+            "sin_gmst",
+            "cos_gmst",
+        ):
+            setattr(ephemeris, name, getattr(self, name)[rows])
+
+        return ephemeris
+
+    @timed("solar_position")
+    def solar_position(self, lat, lon, out=None):
+        """Evaluates the solar position of one or several observers.
+
+        The local mean sidereal time is obtained from the tabulated gmst
+        by angle addition, so no trigonometric function of time is
+        evaluated per observer. Intermediate terms are computed in the
+        output buffers, which bounds the memory used to the outputs and
+        a single temporary array.
+
+        Args
+        ----
+        lat, lon : observers coordinates in degrees, scalars or 1-D arrays.
+        out : optional tuple of three preallocated arrays of the output
+            shape and dtype, filled in place.
+
+        Returns
+        -------
+        A tuple of arrays, shaped (len(times),) for scalar coordinates or
+        (len(times), len(lat)) otherwise :
+            solar_altitude
+            solar_zenith
+            solar_azimuth
+        """
+
+        lat, lon = np.broadcast_arrays(
+            np.radians(np.asarray(lat, dtype=self.dtype)),
+            np.radians(np.asarray(lon, dtype=self.dtype)),
+        )
+        sin_lat, cos_lat = np.sin(lat), np.cos(lat)
+        sin_lon, cos_lon = np.sin(lon), np.cos(lon)
+
+        sin_L = self.sin_ecliptic_lon
+        cos_L = self.cos_ecliptic_lon
+        sin_gmst = self.sin_gmst
+        cos_gmst = self.cos_gmst
+        cos_eps_sin_L = self.cos_axial_tilt * sin_L
+        sin_eps_sin_L = self.sin_axial_tilt * sin_L
+        if lat.ndim:
+            cos_L, sin_gmst, cos_gmst, cos_eps_sin_L, sin_eps_sin_L = [
+                column[:, np.newaxis]
+                for column in (cos_L, sin_gmst, cos_gmst, cos_eps_sin_L, sin_eps_sin_L)
+            ]
+
+        if out is None:
+            shape = (len(self),) + lat.shape
+            out = tuple(np.empty(shape, dtype=self.dtype) for _ in range(3))
+        solar_altitude, solar_zenith, solar_azimuth = out
+
+        # lmst = gmst + lon, kept in the zenith and azimuth buffers.
+        sin_lmst = np.multiply(sin_gmst, cos_lon, out=solar_zenith)
+        sin_lmst += cos_gmst * sin_lon
+        cos_lmst = np.multiply(cos_gmst, cos_lon, out=solar_azimuth)
+        cos_lmst -= sin_gmst * sin_lon
+
+        # Term shared by the altitude and azimuth components.
+        p = np.multiply(cos_lmst, cos_L, out=solar_altitude)
+        p += sin_lmst * cos_eps_sin_L
+
+        # Azimuth components # nu (ν) and xi (ξ)
+
+        nu = sin_lmst
+        nu *= -cos_L
+        nu += cos_lmst * cos_eps_sin_L
+
+        xi = np.multiply(p, -sin_lat, out=cos_lmst)
+        xi += cos_lat * sin_eps_sin_L
+
+        # Altitude components zeta (ζ)
+
+        zeta = p
+        zeta *= cos_lat
+        zeta += sin_lat * sin_eps_sin_L
+
+        np.degrees(np.arcsin(zeta, out=zeta), out=solar_altitude)
+
+        east = xi < 0
+        west = (xi > 0) & (nu < 0)
+        with np.errstate(divide="ignore"):
+            np.divide(nu, xi, out=solar_azimuth)
+        np.degrees(np.arctan(solar_azimuth, out=solar_azimuth), out=solar_azimuth)
+        np.add(solar_azimuth, 180, out=solar_azimuth, where=east)
+        np.add(solar_azimuth, 360, out=solar_azimuth, where=west)
+
+        np.subtract(90, solar_altitude, out=solar_zenith)
+
+        return solar_altitude, solar_zenith, solar_azimuth
+
+
+def solar_position_array(times, lat, lon, out=None, dtype=np.float64):
+    """
+    Calculate the solar position using the Astronomical Applications
+    Department of the US Naval Observatory method, on plain arrays.
+
+    Args
+    ----
+    times : A DateTimeIndex, datetime64 array or epoch seconds array,
+        assumed to be in UTC.
+    lat, lon : observers coordinates in degrees, scalars or 1-D arrays.
+    out : optional tuple of three preallocated output arrays.
+    dtype : float64 (default) or float32 output.
+
+    Returns
+    -------
+    A tuple of arrays, see Ephemeris.solar_position :
+        solar_altitude
+        solar_zenith
+        solar_azimuth
+    """
+
+    return Ephemeris(times, dtype=dtype).solar_position(lat, lon, out=out)
+
+
+def solar_position_vect(times, lat, lon, ephemeris=None):
     """
     Calculate the solar position using the Astronomical Applications
     Department of the US Naval Observatory method.
@@ -251,78 +466,154 @@ def solar_position_vect(times, lat, lon):
     Args
     ----
     times : A DateTimeIndex object assumed to be in UTC.
+    ephemeris : An Ephemeris of times, to be reused between sites.
+        Computed from times when not given.
 
     Returns
     -------
     A dataframe object indexed to times with the columns :
         solar_altitude
-        solar_azimuth
         solar_zenith
+        solar_azimuth
     """
 
-    df = pd.DataFrame(index=times)
+    if ephemeris is None:
+        ephemeris = Ephemeris(times)
 
-    df["D"] = df.index.to_julian_date() - EPOCHS_JULIAN_DATE
-    df["sun_mean_lon"] = (SUNS_MEAN_LONGITUDE_AT_EPOCH + 0.98564736 * df["D"]) % 360
-    df["sun_mean_ano"] = (
-        SUNS_MEAN_ANOMALY_AT_EPOCH + EARTHS_MEAN_ANGULAR_ROTATION * df["D"]
-    ) % 360
+    altitude, zenith, azimuth = ephemeris.solar_position(lat, lon)
 
-    df["sun_ecliptic_lon"] = (
-        df["sun_mean_lon"]
-        + 1.915 * np.sin(np.radians(df["sun_mean_ano"]))
-        + 0.020 * np.sin(2 * np.radians(df["sun_mean_ano"]))
+    return pd.DataFrame(
+        {
+            "solar_altitude": altitude,
+            "solar_zenith": zenith,
+            "solar_azimuth": azimuth,
+        },
+        index=times,
     )
 
-    df["earth_axial_tilt"] = (
-        EARTHS_ECLIPTIC_MEAN_OBLIQUITY - EARTHS_ECLIPTIC_OBLIQUITY_CHANGE_RATE * df["D"]
-    )
 
-    df["gmst"] = (
-        18.697374558
-        + (24.06570982441908 * df["D"])
-        + (0.000026 * ((df["D"] / 36525) ** 2))
-    ) % 24
+def solar_position_fleet(times, lat, lon, ephemeris=None):
+    """
+    Calculate the solar position of several observers sharing the same
+    times index. The site-independent terms are computed once, see
+    Ephemeris, and broadcast against the site coordinates so that the
+    whole fleet is evaluated as a single (time x site) array operation.
 
-    df["lmst"] = (df["gmst"] * 15) + lon
+    Args
+    ----
+    times : A DateTimeIndex object assumed to be in UTC.
+    lat, lon : array-like of observers coordinates, in degrees.
+    ephemeris : An Ephemeris of times. Computed from times when not given.
 
-    # Convert inputs to radians (being lazy to avoid enormous formulas here)
+    Returns
+    -------
+    A tuple of 2-D arrays shaped (len(times), len(lat)) :
+        solar_altitude
+        solar_zenith
+        solar_azimuth
+    """
 
-    sun_ecliptic_lon = np.radians(df["sun_ecliptic_lon"])
-    earth_axial_tilt = np.radians(df["earth_axial_tilt"])
-    lat = np.radians(lat)
-    lmst = np.radians(df["lmst"])
+    if ephemeris is None:
+        ephemeris = Ephemeris(times)
 
-    # Altitude components zeta (ζ)
+    return ephemeris.solar_position(np.atleast_1d(lat), np.atleast_1d(lon))
 
-    zeta = np.cos(lat) * np.cos(lmst) * np.cos(sun_ecliptic_lon) + (
-        np.cos(lat) * np.sin(lmst) * np.cos(earth_axial_tilt)
-        + np.sin(lat) * np.sin(earth_axial_tilt)
-    ) * np.sin(sun_ecliptic_lon)
 
-    df["solar_altitude"] = np.degrees(np.arcsin(zeta))
+def _angular_distance(alt1, az1, alt2, az2):
+    """Great-circle angle between two sun directions, in degrees."""
 
-    df["solar_zenith"] = 90 - df["solar_altitude"]
+    alt1, az1, alt2, az2 = [np.radians(a) for a in (alt1, az1, alt2, az2)]
+    h = np.sin((alt2 - alt1) / 2) ** 2
+    h += np.cos(alt1) * np.cos(alt2) * np.sin((az2 - az1) / 2) ** 2
 
-    # Azimuth components # nu (ν) and xi (ξ)
+    return np.degrees(2 * np.arcsin(np.sqrt(np.clip(h, 0, 1))))
 
-    nu = -1 * (np.sin(lmst) * np.cos(sun_ecliptic_lon)) + (
-        np.cos(lmst) * np.cos(earth_axial_tilt) * np.sin(sun_ecliptic_lon)
-    )
 
-    xi = -1 * (np.sin(lat) * np.cos(lmst) * np.cos(sun_ecliptic_lon)) - (
-        (np.sin(lat) * np.sin(lmst) * np.cos(earth_axial_tilt))
-        - (np.cos(lat) * np.sin(earth_axial_tilt))
-    ) * np.sin(sun_ecliptic_lon)
+def _interpolate_position(D, D_nodes, altitude, azimuth):
+    """Linear interpolation of the altitude and the azimuth, unwrapped so
+    that it does not sweep back across the 0/360 boundary."""
+
+    solar_altitude = np.interp(D, D_nodes, altitude)
+    solar_azimuth = np.interp(D, D_nodes, np.unwrap(azimuth, period=360))
+    np.mod(solar_azimuth, 360, out=solar_azimuth)
+
+    return solar_altitude, solar_azimuth
 
-    df["solar_azimuth"] = np.degrees(np.arctan(nu / xi))
-    df["solar_azimuth"] = np.where(
-        (xi < 0), df["solar_azimuth"] + 180, df["solar_azimuth"]
-    )
-    df["solar_azimuth"] = np.where(
-        (xi > 0) & (nu < 0), df["solar_azimuth"] + 360, df["solar_azimuth"]
-    )
 
-    output_cols = ["solar_altitude", "solar_zenith", "solar_azimuth"]
+def solar_position_interp(times, lat, lon, step="5min", max_error=None):
+    """
+    Calculate the solar position on a fine time grid by evaluating the
+    ephemeris every step and interpolating the altitude and azimuth.
+
+    The error is estimated at the middle of each step, where the linear
+    interpolation deviates most from the smooth solar path. With
+    max_error, the step is halved until the estimate is within it (down to
+    the spacing of times, where the exact positions are returned).
+
+    Args
+    ----
+    times : A sorted DateTimeIndex object assumed to be in UTC.
+    lat, lon : observer coordinates in degrees.
+    step : Spacing of the evaluated positions, a pandas offset or
+        Timedelta, defaults to 5 minutes.
+    max_error : Maximum angle in degrees between the interpolated and the
+        exact sun direction, optional.
+
+    Returns
+    -------
+    A dataframe object indexed to times with the columns :
+        solar_altitude
+        solar_zenith
+        solar_azimuth
+    and the attrs "step" (the step used) and "max_error" (the estimated
+    maximum error in degrees).
+    """
+
+    step = pd.Timedelta(step)
+    D = days_since_epoch(times)
+    spacing = np.sort(np.diff(times.values))
+    spacing = pd.Timedelta(spacing[len(spacing) // 2]) if len(spacing) else step
+
+    while step > spacing:
+        start = times.min().floor(step)
+        end = max(times.max().ceil(step), start + step)
+        nodes = pd.date_range(start, end, freq=step)
+        middles = nodes[:-1] + step / 2
+
+        D_nodes = days_since_epoch(nodes)
+        altitude, _, azimuth = Ephemeris(nodes).solar_position(lat, lon)
+
+        # error at the middle of the steps
+        exact_altitude, _, exact_azimuth = Ephemeris(middles).solar_position(lat, lon)
+        error = _angular_distance(
+            exact_altitude,
+            exact_azimuth,
+            *_interpolate_position(
+                days_since_epoch(middles), D_nodes, altitude, azimuth
+            ),
+        ).max()
+
+        if max_error is None or error <= max_error:
+            solar_altitude, solar_azimuth = _interpolate_position(
+                D, D_nodes, altitude, azimuth
+            )
+            break
+
+        step = step / 2
+
+    else:
+        solar_altitude, _, solar_azimuth = Ephemeris(times).solar_position(lat, lon)
+        step, error = spacing, 0.0
+
+    solar_pos = pd.DataFrame(
+        {
+            "solar_altitude": solar_altitude,
+            "solar_zenith": 90 - solar_altitude,
+            "solar_azimuth": solar_azimuth,
+        },
+        index=times,
+    )
+    solar_pos.attrs["step"] = step
+    solar_pos.attrs["max_error"] = float(error)
 
-    return df[output_cols]
+    return solar_pos
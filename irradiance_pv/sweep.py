@@ -0,0 +1,143 @@
+# irradiance pv sweep module
+
+"""
+Plane-of-array energy over a grid of surface orientations, to find the
+tilt and azimuth maximizing the yield of a site.
+
+The solar position and the TMY data of the site are computed once. The
+ground and sky diffuse components only depend on the tilt, and the beam
+component of every orientation is obtained as a matrix product between
+the sun direction (time x 3) and the surface normals (3 x orientation).
+"""
+
+import pandas as pd
+import numpy as np
+
+from .irradiance_pv import step_hours
+
+
+def orientation_sweep(
+    irradiance, surface_tilt, surface_azimuth, freq=None, albedo=0.16, chunk_size=2048
+):
+    """Calculates the plane-of-array irradiation of every combination of
+    surface_tilt and surface_azimuth, using the model of
+    Irradiance.get_poa_irradiance.
+
+    Parameters
+    ----------
+    irradiance : Irradiance
+        The site, with its TMY data.
+    surface_tilt, surface_azimuth : array-like
+        Candidate tilts and azimuths, in degrees.
+    freq : string, optional
+        Period alias (e.g. "M" or "D") to report per-period totals,
+        the whole simulation is summed if None.
+    albedo : float
+        Ground reflectance, defaults to 0.16 (urban environement).
+    chunk_size : int
+        Orientations evaluated at once, bounds the memory used to
+        chunk_size x len(times) floats.
+
+    Return
+    ------
+    A dataframe of irradiation in [kWh/m2], indexed by surface_tilt (and
+    by period first when freq is given), with one column per
+    surface_azimuth.
+    """
+
+    times = irradiance.times
+    zenith = irradiance.solar_pos["solar_zenith"].to_numpy(dtype=float)
+    azimuth = np.radians(irradiance.solar_pos["solar_azimuth"].to_numpy(dtype=float))
+    ghi = irradiance.tmy["GHI"].to_numpy(dtype=float)
+    dni = irradiance.tmy["DNI"].to_numpy(dtype=float)
+    dhi = irradiance.tmy["DHI"].to_numpy(dtype=float)
+
+    tilts = np.atleast_1d(np.asarray(surface_tilt, dtype=float))
+    azimuths = np.atleast_1d(np.asarray(surface_azimuth, dtype=float))
+    cos_tilt = np.cos(np.radians(tilts))
+    sin_tilt = np.sin(np.radians(tilts))
+
+    # Periods as contiguous slices of times.
+    if freq is None:
+        periods = pd.Index(["total"])
+        bounds = [0, len(times)]
+    else:
+        labels = (times.tz_localize(None) if times.tz else times).to_period(freq)
+        if not labels.is_monotonic_increasing:
+            raise ValueError("times must be sorted to report per-period totals")
+        starts = np.flatnonzero(labels[1:] != labels[:-1]) + 1
+        bounds = [0] + list(starts) + [len(times)]
+        periods = labels[bounds[:-1]]
+    slices = [slice(a, b) for a, b in zip(bounds[:-1], bounds[1:])]
+
+    # Ground and sky diffuse components, (time x tilt), clipped to 0.
+    ghi_pos = np.where(ghi > 0, ghi, 0)[:, np.newaxis]
+    E_g_poa = ghi_pos * (albedo * (1 - cos_tilt) / 2)
+    E_d_poa = dhi[:, np.newaxis] * ((1 + cos_tilt) / 2)
+    E_d_poa += (ghi * zenith)[:, np.newaxis] * (0.012 * (1 - cos_tilt) / 2)
+    diffuse = E_g_poa + np.where(E_d_poa > 0, E_d_poa, 0)
+
+    energy = np.empty((len(periods), len(tilts), len(azimuths)))
+    for p, rows in enumerate(slices):
+        energy[p] = diffuse[rows].sum(axis=0)[:, np.newaxis]
+
+    # Beam component, only time steps with direct irradiance contribute.
+    theta_Z = np.radians(zenith)
+    sun = np.column_stack(
+        [
+            np.cos(theta_Z),
+            np.sin(theta_Z) * np.cos(azimuth),
+            np.sin(theta_Z) * np.sin(azimuth),
+        ]
+    )
+    theta_A = np.radians(azimuths)
+    normals = np.stack(
+        [
+            np.repeat(cos_tilt[:, np.newaxis], len(azimuths), axis=1),
+            sin_tilt[:, np.newaxis] * np.cos(theta_A),
+            sin_tilt[:, np.newaxis] * np.sin(theta_A),
+        ]
+    ).reshape(3, -1)
+
+    beam = np.zeros((len(periods), normals.shape[1]))
+    for p, rows in enumerate(slices):
+        lit = dni[rows] > 0
+        sun_p = sun[rows][lit]
+        dni_p = dni[rows][lit]
+        for start in range(0, normals.shape[1], chunk_size):
+            block = slice(start, start + chunk_size)
+            cos_aoi = sun_p @ normals[:, block]
+            np.maximum(cos_aoi, 0, out=cos_aoi)
+            beam[p, block] = dni_p @ cos_aoi
+
+    energy += beam.reshape(energy.shape)
+    energy *= step_hours(times) / 1000
+
+    columns = pd.Index(azimuths, name="surface_azimuth")
+    if freq is None:
+        return pd.DataFrame(
+            energy[0], index=pd.Index(tilts, name="surface_tilt"), columns=columns
+        )
+
+    index = pd.MultiIndex.from_product(
+        [periods, tilts], names=["period", "surface_tilt"]
+    )
+    return pd.DataFrame(energy.reshape(-1, len(azimuths)), index=index, columns=columns)
+
+
+def optimum_orientation(energy):
+    """Finds the orientation of highest irradiation in the result of
+    orientation_sweep, summed over the periods if any.
+
+    Return
+    ------
+    A tuple (surface_tilt, surface_azimuth, irradiation in [kWh/m2]).
+    """
+
+    if isinstance(energy.index, pd.MultiIndex):
+        energy = energy.groupby(level="surface_tilt").sum()
+
+    values = energy.to_numpy()
+    i, j = np.unravel_index(np.nanargmax(values), values.shape)
+
+    return energy.index[i], energy.columns[j], values[i, j]
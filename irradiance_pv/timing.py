@@ -0,0 +1,199 @@
+# irradiance pv timing module
+
+"""
+Per-stage timers of the irradiance pipeline.
+
+The stages (fetch, parse, cache, ephemeris, solar_position, aoi, poa)
+report to the module registry, timers. It is disabled by default, in
+which case a stage costs a single attribute check:
+
+    >>> from irradiance_pv.timing import timers
+    >>> timers.enable(memory=True)
+    >>> ...  # run the pipeline
+    >>> timers.summary()
+
+Hooks registered with timers.add_hook(func) are called after every stage
+as func(name, seconds, peak_bytes), e.g. to feed a metrics system.
+"""
+
+import functools
+import threading
+import time
+import tracemalloc
+from collections import defaultdict
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+
+_NULL_STAGE = nullcontext()
+
+
+class _Stage:
+    """Context manager recording one execution of a stage."""
+
+    def __init__(self, timers, name):
+
+        self.timers = timers
+        self.name = name
+
+    def __enter__(self):
+
+        self.base = None
+        if self.timers.memory and tracemalloc.is_tracing():
+            with self.timers._lock:
+                self.timers._fold_peak()
+                self.base = self.peak = tracemalloc.get_traced_memory()[0]
+                self.timers._active.add(self)
+
+        self.start = time.perf_counter()
+
+        return self
+
+    def __exit__(self, *exc):
+
+        seconds = time.perf_counter() - self.start
+        peak = None
+
+        if self.base is not None:
+            with self.timers._lock:
+                self.timers._fold_peak()
+                self.timers._active.discard(self)
+            peak = self.peak - self.base
+
+        self.timers.record(self.name, seconds, peak)
+
+
+class Timers:
+    """Registry of the durations (and optionally the peak memory) of the
+    pipeline stages, aggregated over any number of runs."""
+
+    def __init__(self):
+
+        self.enabled = False
+        self.memory = False
+        self.hooks = []
+        self._lock = threading.Lock()
+        self._active = set()
+        self._started_tracing = False
+        self.reset()
+
+    def enable(self, memory=False):
+        """Starts recording. With memory, tracemalloc is started and the
+        peak of the memory allocated during each stage is traced, which
+        slows it down.
+
+        Traced memory is process-wide: the peak of a stage includes the
+        allocations of the stages running inside it, or concurrently in
+        other threads (e.g. the downloads of tmy.download_tmy)."""
+
+        self.enabled = True
+        self.memory = memory
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def disable(self):
+
+        self.enabled = False
+        self.memory = False
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+
+    def _fold_peak(self):
+        """Folds the global peak into the active stages before resetting
+        it, so that no stage loses the peak of another. Called with the
+        lock held."""
+
+        peak = tracemalloc.get_traced_memory()[1]
+        for stage in self._active:
+            stage.peak = max(stage.peak, peak)
+        tracemalloc.reset_peak()
+
+    def reset(self):
+        """Drops the recorded values."""
+
+        self.seconds = defaultdict(list)
+        self.peak_bytes = defaultdict(list)
+
+    def add_hook(self, func):
+        """Calls func(name, seconds, peak_bytes) after every stage,
+        peak_bytes is None unless memory is traced."""
+
+        self.hooks.append(func)
+
+    def remove_hook(self, func):
+
+        self.hooks.remove(func)
+
+    def stage(self, name):
+        """Context manager timing one execution of the stage name."""
+
+        if not self.enabled:
+            return _NULL_STAGE
+
+        return _Stage(self, name)
+
+    def record(self, name, seconds, peak_bytes=None):
+
+        self.seconds[name].append(seconds)
+        if peak_bytes is not None:
+            self.peak_bytes[name].append(peak_bytes)
+
+        for hook in self.hooks:
+            hook(name, seconds, peak_bytes)
+
+    def histogram(self, name, bins=10):
+        """Histogram of the durations of a stage, see numpy.histogram.
+
+        Return
+        ------
+        A tuple (counts, bin edges in seconds).
+        """
+
+        return np.histogram(self.seconds[name], bins=bins)
+
+    def summary(self):
+        """Statistics of the recorded stages.
+
+        Return
+        ------
+        A dataframe indexed by stage with the columns count, total, mean,
+        p50, p95 and max (in seconds), and peak_mb when memory is traced.
+        """
+
+        rows = {}
+        for name, seconds in self.seconds.items():
+            seconds = np.asarray(seconds)
+            rows[name] = {
+                "count": len(seconds),
+                "total": seconds.sum(),
+                "mean": seconds.mean(),
+                "p50": np.percentile(seconds, 50),
+                "p95": np.percentile(seconds, 95),
+                "max": seconds.max(),
+            }
+            if self.peak_bytes[name]:
+                rows[name]["peak_mb"] = max(self.peak_bytes[name]) / 1e6
+
+        return pd.DataFrame.from_dict(rows, orient="index")
+
+
+timers = Timers()
+
+
+def timed(name):
+    """Decorator timing every call of a function as the stage name."""
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not timers.enabled:
+                return func(*args, **kwargs)
+            with _Stage(timers, name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,748 @@
+# irradiance pv tmy module
+
+"""
+Sources of Typical Meteorological Year (TMY) data.
+
+A fetcher is any object with a ``fetch(lat, lon, startyear, endyear)``
+method returning a dataframe with the columns "time_pvgis", "GHI", "DNI"
+and "DHI", one row per hour of the typical year. The PVGIS webservice is
+the default source, TMYCache wraps any fetcher with a local on-disk cache.
+Fetchers whose data depends on the site elevation (e.g. the clear-sky
+models, see clearsky.ClearSkyFetcher) set elevation_dependent = True, and
+are passed it as fetch(..., elevation=), see fetch_tmy.
+
+read_tmy reads the same dataframe from a local weather file (PVGIS json
+or csv, EPW, or any csv) through a memory-mapped cache.
+"""
+
+import hashlib
+import io
+import os
+import glob
+import json
+import time
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import numpy as np
+
+from .timing import timed, timers
+
+PVGIS_TMY_URL = "https://re.jrc.ec.europa.eu/api/tmy"
+
+TMY_COLUMNS = ["time_pvgis", "GHI", "DNI", "DHI"]
+
+
+def parse_pvgis_json(tmy_json):
+    """Extracts the standard components GHI, DNI, DHI from a PVGIS TMY
+    json response.
+
+    Return
+    ------
+    A dataframe with the columns "time_pvgis", "GHI", "DNI", "DHI".
+    """
+
+    df_r = pd.DataFrame.from_dict(data=tmy_json["outputs"]["tmy_hourly"])
+    df_tmy = df_r[["time(UTC)", "G(h)", "Gb(n)", "Gd(h)"]].copy()
+    df_tmy.columns = TMY_COLUMNS
+
+    return df_tmy
+
+
+class RateLimiter:
+    """Spaces calls evenly to stay under a number of calls per second,
+    shared by all the threads using it.
+
+    Parameters
+    ----------
+    rate : float
+        Maximum calls per second.
+    """
+
+    def __init__(self, rate):
+
+        self.interval = 1.0 / rate
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def wait(self):
+        """Blocks until the next call is allowed."""
+
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class PVGISFetcher:
+    """Fetches TMY data from the PVGIS webservice.
+
+    more about TMY files
+    https://ec.europa.eu/jrc/en/PVGIS/tools/tmy
+
+    Requests go through one pooled session, so connections are kept alive
+    between sites, and the fetcher can be shared by several threads.
+    Connection errors, time outs and the status codes of RETRY_STATUS are
+    retried with an exponential backoff.
+
+    Parameters
+    ----------
+    url : string
+        Address of the TMY api, defaults to PVGIS.
+    timeout : float, optional
+        Seconds to wait for the server, passed to requests.
+    retries : int
+        Attempts made after a failed request, defaults to 3.
+    backoff : float
+        Seconds waited before the first retry, doubled on each attempt.
+    rate : float, optional
+        Maximum requests per second, PVGIS allows 30. Unlimited if None.
+    pool_size : int
+        Connections kept alive, should match the number of threads.
+    """
+
+    RETRY_STATUS = (429, 500, 502, 503, 504)
+
+    def __init__(
+        self,
+        url=PVGIS_TMY_URL,
+        timeout=None,
+        retries=3,
+        backoff=0.5,
+        rate=None,
+        pool_size=10,
+    ):
+
+        self.url = url
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.rate_limiter = RateLimiter(rate) if rate else None
+
+        # requests is imported on first use, it is slow to load.
+        import requests
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=pool_size, pool_maxsize=pool_size
+        )
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fetch(self, lat, lon, startyear, endyear):
+
+        import requests
+
+        params = {
+            "lat": lat,
+            "lon": lon,
+            "startyear": startyear,
+            "endyear": endyear,
+            "outputformat": "json",  # csv, json, epw
+        }
+
+        for attempt in range(self.retries + 1):
+
+            if self.rate_limiter is not None:
+                self.rate_limiter.wait()
+
+            last_attempt = attempt == self.retries
+
+            try:
+                with timers.stage("fetch"):
+                    r = self.session.get(self.url, params=params, timeout=self.timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                if last_attempt:
+                    raise
+            else:
+                if last_attempt or r.status_code not in self.RETRY_STATUS:
+                    # If the respons was successful, no Exception will be raised
+                    r.raise_for_status()
+                    with timers.stage("parse"):
+                        return parse_pvgis_json(r.json())
+
+            time.sleep(self.backoff * 2**attempt)
+
+
+class DirectoryFetcher:
+    """Reads TMY data from PVGIS json responses saved in a directory, as
+    an offline stand-in for the webservice.
+
+    Files are looked up by name, see filename.
+
+    Parameters
+    ----------
+    path : string
+        Directory holding the json files.
+    """
+
+    def __init__(self, path):
+
+        self.path = path
+
+    @staticmethod
+    def filename(lat, lon, startyear, endyear):
+        return "tmy_{:.4f}_{:.4f}_{}_{}.json".format(lat, lon, startyear, endyear)
+
+    def fetch(self, lat, lon, startyear, endyear):
+
+        path = os.path.join(self.path, self.filename(lat, lon, startyear, endyear))
+
+        with timers.stage("fetch"), open(path) as f:
+            tmy_json = json.load(f)
+
+        with timers.stage("parse"):
+            return parse_pvgis_json(tmy_json)
+
+
+class TMYCache:
+    """Local on-disk cache of parsed TMY data, keyed by
+    (lat, lon, startyear, endyear) and stored as uncompressed npz files.
+
+    The cache is itself a fetcher: entries missing or older than max_age
+    are retrieved from the wrapped fetcher and stored. When the cache
+    grows over max_bytes, the least recently used entries are evicted.
+
+    Parameters
+    ----------
+    path : string
+        Cache directory, created if needed.
+    fetcher : object, optional
+        Source of the entries missing in the cache, defaults to PVGIS.
+    max_bytes : int, optional
+        Size limit of the cache directory, unlimited if None.
+    max_age : float, optional
+        Seconds after which an entry is considered stale, never if None.
+    """
+
+    def __init__(self, path, fetcher=None, max_bytes=None, max_age=None):
+
+        self.path = path
+        self.fetcher = fetcher if fetcher is not None else PVGISFetcher()
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(path, exist_ok=True)
+
+    def _entry(self, lat, lon, startyear, endyear):
+        name = "tmy_{:.4f}_{:.4f}_{}_{}.npz".format(lat, lon, startyear, endyear)
+        return os.path.join(self.path, name)
+
+    def _entries(self):
+        return glob.glob(os.path.join(self.path, "tmy_*.npz"))
+
+    def __contains__(self, key):
+        return os.path.exists(self._entry(*key))
+
+    def fetch(self, lat, lon, startyear, endyear):
+
+        path = self._entry(lat, lon, startyear, endyear)
+
+        try:
+            stored = os.path.getmtime(path)
+            if self.max_age is None or time.time() - stored <= self.max_age:
+                df_tmy = self.load(path)
+                # the access time keeps the eviction order, the
+                # modification time the age of the entry.
+                os.utime(path, (time.time(), stored))
+                self.hits += 1
+                return df_tmy
+        except FileNotFoundError:
+            pass
+
+        self.misses += 1
+        df_tmy = self.fetcher.fetch(lat, lon, startyear, endyear)
+        self.store(path, df_tmy)
+
+        return df_tmy
+
+    @staticmethod
+    @timed("cache")
+    def load(path):
+        """Reads a cache entry into a TMY dataframe."""
+
+        with np.load(path, allow_pickle=False) as data:
+            return pd.DataFrame({column: data[column] for column in TMY_COLUMNS})
+
+    def store(self, path, df_tmy):
+        """Writes a TMY dataframe to a cache entry, then applies the size
+        limit. The file is written aside and renamed, so concurrent
+        readers never see a partial entry."""
+
+        arrays = {
+            "time_pvgis": df_tmy["time_pvgis"].to_numpy(dtype=str),
+            "GHI": df_tmy["GHI"].to_numpy(dtype=float),
+            "DNI": df_tmy["DNI"].to_numpy(dtype=float),
+            "DHI": df_tmy["DHI"].to_numpy(dtype=float),
+        }
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp_path, path)
+
+        self.evict()
+
+    def evict(self):
+        """Removes the least recently used entries until the cache fits
+        in max_bytes."""
+
+        if self.max_bytes is None:
+            return
+
+        entries = [
+            (os.path.getatime(p), os.path.getsize(p), p) for p in self._entries()
+        ]
+        total = sum(size for _, size, _ in entries)
+
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    def invalidate(self, lat, lon, startyear, endyear):
+        """Removes one entry, it will be fetched again on next use."""
+
+        try:
+            os.remove(self._entry(lat, lon, startyear, endyear))
+        except FileNotFoundError:
+            pass
+
+    def clear(self):
+        """Removes every entry of the cache."""
+
+        for path in self._entries():
+            os.remove(path)
+
+
+class TMYFetchError(Exception):
+    """Failure to retrieve the TMY data of one system of a bulk download.
+
+    Attributes
+    ----------
+    index : int
+        Position of the system in the downloaded list.
+    pvsystem : PVSystem
+        The system whose data could not be retrieved.
+    cause : Exception
+        The error raised by the fetcher.
+    """
+
+    def __init__(self, index, pvsystem, cause):
+
+        super().__init__(
+            "TMY of '{}' (lat {}, lon {}) failed: {!r}".format(
+                pvsystem.name, pvsystem.lat, pvsystem.lon, cause
+            )
+        )
+        self.index = index
+        self.pvsystem = pvsystem
+        self.cause = cause
+
+
+class TMYDownloadError(Exception):
+    """Failure to retrieve the TMY data of some systems of a bulk
+    download, listing every failing system and its cause.
+
+    Attributes
+    ----------
+    errors : list of TMYFetchError
+        One per failing system, in the order of the downloaded list.
+    """
+
+    def __init__(self, errors, total):
+
+        self.errors = sorted(errors, key=lambda error: error.index)
+        super().__init__(
+            "TMY of {} of {} systems failed:\n".format(len(self.errors), total)
+            + "\n".join("  " + str(error) for error in self.errors)
+        )
+
+
+def fetch_tmy(fetcher, pvsystem, startyear=2006, endyear=2015):
+    """TMY data of one system from a fetcher, passing its elevation to
+    the fetchers that are elevation_dependent."""
+
+    if getattr(fetcher, "elevation_dependent", False):
+        return fetcher.fetch(
+            pvsystem.lat, pvsystem.lon, startyear, endyear, elevation=pvsystem.elev
+        )
+
+    return fetcher.fetch(pvsystem.lat, pvsystem.lon, startyear, endyear)
+
+
+def download_tmy(pvsystems, fetcher=None, startyear=2006, endyear=2015, max_workers=8):
+    """Retrieves the TMY data of several systems concurrently.
+
+    Parameters
+    ----------
+    pvsystems : list of PVSystem
+    fetcher : object, optional
+        Source of the TMY data, shared by all threads. Defaults to a
+        PVGISFetcher limited to 25 requests per second.
+    startyear, endyear : int
+        Period of the data used to build the typical year.
+    max_workers : int
+        Number of concurrent requests.
+
+    Return
+    ------
+    A tuple (tmys, errors). tmys is a list of TMY dataframes in the order
+    of pvsystems, with None for the failed systems. errors is a list of
+    TMYFetchError, one per failed system.
+    """
+
+    if fetcher is None:
+        fetcher = PVGISFetcher(rate=25, pool_size=max_workers)
+
+    def fetch(pvsystem):
+        return fetch_tmy(fetcher, pvsystem, startyear, endyear)
+
+    tmys = [None] * len(pvsystems)
+    errors = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = [executor.submit(fetch, pvsystem) for pvsystem in pvsystems]
+
+        for index, (pvsystem, future) in enumerate(zip(pvsystems, futures)):
+            try:
+                tmys[index] = future.result()
+            except Exception as err:
+                errors.append(TMYFetchError(index, pvsystem, err))
+
+    return tmys, errors
+
+
+# Hourly rows of a typical meteorological year.
+TMY_HOURS = 8760
+
+
+def typical_year_hours(times):
+    """Position of times in a typical (non-leap) year, in hours since
+    January 1 00:00 UTC. February 29 is mapped onto February 28, and the
+    following days of leap years are shifted back by one day.
+
+    Return
+    ------
+    Array of float64 hours in [0, 8760).
+    """
+
+    times = pd.DatetimeIndex(times)
+    if times.tz is not None:
+        times = times.tz_convert("UTC").tz_localize(None)
+
+    values = times.values
+    hours = (values - values.astype("datetime64[Y]")) / np.timedelta64(1, "h")
+    hours[times.is_leap_year & (hours >= 59 * 24)] -= 24
+
+    return hours
+
+
+def align_values(values, hours, interpolate=True):
+    """Maps rows of a typical year onto the positions hours, see
+    typical_year_hours. Positions between two hours are linearly
+    interpolated, or take the value of the previous hour when interpolate
+    is False. The last hour of the year wraps to the first one.
+
+    Parameters
+    ----------
+    values : array
+        Hourly values, shaped (8760,) or (8760 x site).
+    hours : array of float
+
+    Return
+    ------
+    An array of len(hours) rows. values itself when hours are exactly
+    its rows, nothing is copied then.
+    """
+
+    values = np.asarray(values)
+    n = len(values)
+    index = np.floor(hours).astype(np.intp)
+    fraction = hours - index
+
+    exact = not fraction.any()
+    if exact and len(index) == n and np.array_equal(index, np.arange(n)):
+        return values
+
+    index %= n
+    aligned = values[index]
+    if interpolate and not exact:
+        fraction = fraction.reshape((-1,) + (1,) * (values.ndim - 1))
+        aligned += fraction * (values[(index + 1) % n] - aligned)
+
+    return aligned
+
+
+def align_tmy(df_tmy, times, interpolate=True):
+    """Maps a typical year of hourly TMY data onto any times index, e.g.
+    several years, leap years, sub-hourly steps or a few days, by
+    day-of-year and hour lookup (see align_values).
+
+    Data that is not a typical year of 8760 rows is taken as one row per
+    element of times.
+
+    Return
+    ------
+    A dataframe indexed by times with the columns of df_tmy. When times is
+    exactly the hours of one non-leap year, it shares the data of df_tmy.
+    """
+
+    if len(df_tmy) != TMY_HOURS:
+        if len(df_tmy) != len(times):
+            raise ValueError(
+                "TMY data has {} rows, expected a typical year of {} hours "
+                "or one row per time step ({})".format(
+                    len(df_tmy), TMY_HOURS, len(times)
+                )
+            )
+        return df_tmy.set_axis(times)
+
+    hours = typical_year_hours(times)
+    if len(hours) == TMY_HOURS and np.array_equal(hours, np.arange(TMY_HOURS)):
+        return df_tmy.set_axis(times)
+
+    aligned = {}
+    for column in df_tmy.columns:
+        values = df_tmy[column].to_numpy()
+        if values.dtype.kind == "f":
+            aligned[column] = align_values(values, hours, interpolate)
+        else:
+            # labels such as time_pvgis are not interpolated.
+            aligned[column] = align_values(values, np.floor(hours), False)
+
+    return pd.DataFrame(aligned, index=times)
+
+
+# Columns of the EPW format holding the year, month, day, hour and the
+# global horizontal, direct normal and diffuse horizontal irradiance.
+EPW_COLUMNS = {
+    0: "year",
+    1: "month",
+    2: "day",
+    3: "hour",
+    13: "GHI",
+    14: "DNI",
+    15: "DHI",
+}
+
+# Irradiance columns of the memory-mapped weather cache, in file order.
+WEATHER_COLUMNS = ["GHI", "DNI", "DHI"]
+
+
+def _read_pvgis_json(path, columns):
+
+    with open(path) as f:
+        return parse_pvgis_json(json.load(f))
+
+
+def _read_pvgis_csv(path, columns):
+    """PVGIS csv, the hourly table sits between a header of site
+    information and a footer of notes."""
+
+    with open(path) as f:
+        lines = f.read().splitlines()
+
+    start = next(i for i, line in enumerate(lines) if line.startswith("time(UTC)"))
+    stop = start + 1
+    while stop < len(lines) and lines[stop][:1].isdigit():
+        stop += 1
+
+    df_r = pd.read_csv(
+        io.StringIO("\n".join(lines[start:stop])),
+        usecols=["time(UTC)", "G(h)", "Gb(n)", "Gd(h)"],
+        dtype={"time(UTC)": str, "G(h)": float, "Gb(n)": float, "Gd(h)": float},
+    )
+    df_tmy = df_r[["time(UTC)", "G(h)", "Gb(n)", "Gd(h)"]]
+    df_tmy.columns = TMY_COLUMNS
+
+    return df_tmy
+
+
+def _read_epw(path, columns):
+    """EnergyPlus weather file, in local standard time. The rows are
+    rotated by the time zone of the LOCATION header, rounded to the hour,
+    so that the first row is 00:00 UTC like the PVGIS data."""
+
+    with open(path) as f:
+        tz = float(f.readline().split(",")[8])
+
+    df_r = pd.read_csv(
+        path,
+        skiprows=8,
+        header=None,
+        usecols=list(EPW_COLUMNS),
+        dtype={i: (int if i < 4 else float) for i in EPW_COLUMNS},
+    ).rename(columns=EPW_COLUMNS)
+
+    # EPW hours run from 1 to 24, the end of each interval.
+    local = pd.to_datetime(df_r[["year", "month", "day"]]) + pd.to_timedelta(
+        df_r["hour"] - 1, unit="h"
+    )
+    utc = local - pd.Timedelta(hours=tz)
+
+    df_tmy = pd.DataFrame(
+        {
+            "time_pvgis": utc.dt.strftime("%Y%m%d:%H%M"),
+            "GHI": df_r["GHI"],
+            "DNI": df_r["DNI"],
+            "DHI": df_r["DHI"],
+        }
+    )
+    order = np.roll(np.arange(len(df_tmy)), -int(round(tz)))
+
+    return df_tmy.iloc[order].reset_index(drop=True)
+
+
+def _read_csv(path, columns):
+    """Generic csv, columns maps GHI, DNI, DHI and optionally time_pvgis
+    to the names used in the file."""
+
+    columns = {**{key: key for key in WEATHER_COLUMNS}, **(columns or {})}
+    names = {name: key for key, name in columns.items()}
+
+    df_r = pd.read_csv(
+        path,
+        usecols=list(names),
+        dtype={
+            name: (str if key == "time_pvgis" else float) for name, key in names.items()
+        },
+    ).rename(columns=names)
+
+    if "time_pvgis" not in df_r:
+        df_r["time_pvgis"] = np.arange(len(df_r)).astype(str)
+
+    return df_r[TMY_COLUMNS]
+
+
+WEATHER_READERS = {
+    "pvgis_json": _read_pvgis_json,
+    "pvgis_csv": _read_pvgis_csv,
+    "epw": _read_epw,
+    "csv": _read_csv,
+}
+
+
+def _weather_format(path):
+    """Guesses the format of a weather file from its extension, and from
+    the first line of csv files."""
+
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".json":
+        return "pvgis_json"
+    if extension == ".epw":
+        return "epw"
+
+    with open(path) as f:
+        if f.readline().startswith("Latitude"):
+            return "pvgis_csv"
+
+    return "csv"
+
+
+def _weather_cache(path, cache_dir, format, columns):
+    """Paths of the irradiance and time arrays caching the file path,
+    read with format and the columns mapping."""
+
+    directory, name = os.path.split(os.path.abspath(path))
+    # one cache per way of reading the file.
+    key = json.dumps([format, sorted((columns or {}).items())])
+    digest = hashlib.sha1(key.encode()).hexdigest()[:10]
+    stem = os.path.join(cache_dir or directory, "{}.{}".format(name, digest))
+
+    return stem + ".irr.npy", stem + ".time.npy"
+
+
+def read_tmy(path, format=None, columns=None, cache=True, cache_dir=None):
+    """Reads the standard components GHI, DNI, DHI from a local weather
+    file.
+
+    On first read, the irradiance is converted to a (3 x time) float64
+    .npy file next to the source (or in cache_dir). Later reads map that
+    file instead of parsing the source: the dataframe columns are
+    read-only views of the mapping, so processes reading the same file
+    share one copy of it in memory. The cache is rebuilt when the source
+    is modified, and kept apart for each format and columns mapping.
+
+    Parameters
+    ----------
+    path : string
+        Weather file.
+    format : {"pvgis_json", "pvgis_csv", "epw", "csv"}, optional
+        Guessed from the file when None.
+    columns : dict, optional
+        For generic csv files, names of the columns holding "GHI", "DNI",
+        "DHI" and optionally "time_pvgis", when they differ.
+    cache : bool
+        Use and create the memory-mapped cache, defaults to True. When
+        the cache cannot be written, the parsed file is returned.
+    cache_dir : string, optional
+        Directory of the cache files, defaults to the source directory.
+
+    Return
+    ------
+    A dataframe with the columns "time_pvgis", "GHI", "DNI", "DHI".
+    """
+
+    if format is None:
+        format = _weather_format(path)
+    if format not in WEATHER_READERS:
+        raise ValueError(
+            "format must be one of {}, got {!r}".format(list(WEATHER_READERS), format)
+        )
+
+    irr_path, time_path = _weather_cache(path, cache_dir, format, columns)
+
+    if cache:
+        try:
+            if os.path.getmtime(irr_path) >= os.path.getmtime(path):
+                return _load_weather(irr_path, time_path)
+        except FileNotFoundError:
+            pass
+
+    with timers.stage("parse"):
+        df_tmy = WEATHER_READERS[format](path, columns)
+
+    if not cache:
+        return df_tmy
+
+    values = np.stack([df_tmy[key].to_numpy(dtype=float) for key in WEATHER_COLUMNS])
+    times = df_tmy["time_pvgis"].to_numpy(dtype=str)
+    try:
+        for target, array in ((time_path, times), (irr_path, values)):
+            # written aside and renamed, the irradiance last as it marks
+            # the cache as complete.
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    np.save(f, array)
+                os.replace(tmp_path, target)
+            except OSError:
+                os.unlink(tmp_path)
+                raise
+    except OSError:
+        # e.g. a read-only data directory, the file is read uncached.
+        return df_tmy
+
+    return _load_weather(irr_path, time_path)
+
+
+@timed("cache")
+def _load_weather(irr_path, time_path):
+
+    values = np.load(irr_path, mmap_mode="r")
+    df_tmy = pd.DataFrame(values.T, columns=WEATHER_COLUMNS, copy=False)
+    df_tmy.insert(0, "time_pvgis", np.load(time_path))
+
+    return df_tmy
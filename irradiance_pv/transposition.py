@@ -0,0 +1,265 @@
+# irradiance pv transposition module
+
+"""
+Sky diffuse transposition models, evaluated on a shared Geometry.
+
+The geometry of a run (cosine of the angle of incidence and of the solar
+zenith, tilt trigonometry, extraterrestrial irradiance and air mass) is
+computed once, after which every model is a few array operations:
+
+    >>> geometry = Geometry(zenith, azimuth, surface_tilt, surface_azimuth, times)
+    >>> poa = {m: transpose(geometry, ghi, dni, dhi, model=m)[0] for m in MODELS}
+
+Each model is a function model(geometry, ghi, dni, dhi) returning the
+sky diffuse irradiance on the surface, registered in MODELS. Inputs
+broadcast against each other, e.g. (time,) or (time x site).
+"""
+
+import numpy as np
+import pandas as pd
+
+# Solar constant in [W/m2].
+SOLAR_CONSTANT = 1367.0
+
+# Perez et al. (1990) coefficients F11, F12, F13, F21, F22, F23, one row
+# per sky clearness bin, all sites composite.
+PEREZ_COEFFICIENTS = np.array(
+    [
+        [-0.0083117, 0.5877285, -0.0620636, -0.0596012, 0.0721249, -0.0220216],
+        [0.1299457, 0.6825954, -0.1513752, -0.0189325, 0.065965, -0.0288748],
+        [0.3296958, 0.4868735, -0.2210958, 0.055414, -0.0639588, -0.0260542],
+        [0.5682053, 0.1874525, -0.295129, 0.1088631, -0.1519229, -0.0139754],
+        [0.873028, -0.3920403, -0.3616149, 0.2255647, -0.4620442, 0.0012448],
+        [1.1326077, -1.2367284, -0.4118494, 0.2877813, -0.8230357, 0.0558651],
+        [1.0601591, -1.5999137, -0.3589221, 0.2642124, -1.127234, 0.1310694],
+        [0.677747, -0.3272588, -0.2504286, 0.1561313, -1.3765031, 0.2506212],
+    ]
+)
+# Upper bounds of the sky clearness bins, the last one is open.
+PEREZ_CLEARNESS_BINS = np.array([1.065, 1.23, 1.5, 1.95, 2.8, 4.5, 6.2])
+
+
+def extraterrestrial_irradiance(times):
+    """Extraterrestrial normal irradiance in [W/m2] (Spencer, 1971).
+
+    Parameters
+    ----------
+    times : DateTimeIndex
+
+    Return
+    ------
+    Array of float64, one value per time.
+    """
+
+    day_angle = 2 * np.pi * (pd.DatetimeIndex(times).dayofyear.to_numpy() - 1) / 365
+
+    return SOLAR_CONSTANT * (
+        1.00011
+        + 0.034221 * np.cos(day_angle)
+        + 0.00128 * np.sin(day_angle)
+        + 0.000719 * np.cos(2 * day_angle)
+        + 0.000077 * np.sin(2 * day_angle)
+    )
+
+
+def relative_airmass(solar_zenith):
+    """Relative air mass (Kasten and Young, 1989), NaN below the horizon.
+
+    Parameters
+    ----------
+    solar_zenith : array-like
+        Solar zenith in degrees.
+
+    Return
+    ------
+    Array of float64 shaped like solar_zenith.
+    """
+
+    zenith = np.asarray(solar_zenith, dtype=float)
+    with np.errstate(invalid="ignore"):
+        airmass = 1 / (
+            np.cos(np.radians(zenith)) + 0.50572 * (96.07995 - zenith) ** -1.6364
+        )
+
+    return np.where(zenith < 90, airmass, np.nan)
+
+
+class Geometry:
+    """Terms shared by the transposition models for one run.
+
+    Parameters
+    ----------
+    solar_zenith, solar_azimuth : array-like
+        Solar position in degrees, shaped (time,) or (time x site).
+    surface_tilt, surface_azimuth : array-like
+        Surface orientation in degrees.
+    times : DateTimeIndex
+        Times of the first axis, for the extraterrestrial irradiance.
+
+    Attributes
+    ----------
+    zenith, cos_zenith, cos_aoi, cos_tilt, sin_tilt : arrays
+    dni_extra : array
+        Extraterrestrial normal irradiance in [W/m2], shaped to broadcast
+        along the first axis.
+    airmass : array
+        Relative air mass (Kasten and Young, 1989), NaN below the horizon.
+    """
+
+    def __init__(
+        self, solar_zenith, solar_azimuth, surface_tilt, surface_azimuth, times
+    ):
+
+        self.zenith = np.asarray(solar_zenith, dtype=float)
+        theta_Z = np.radians(self.zenith)
+        theta_T = np.radians(np.asarray(surface_tilt, dtype=float))
+
+        self.cos_zenith = np.cos(theta_Z)
+        self.cos_tilt = np.cos(theta_T)
+        self.sin_tilt = np.sin(theta_T)
+
+        self.cos_aoi = (
+            np.cos(np.radians(np.asarray(solar_azimuth, dtype=float) - surface_azimuth))
+            * np.sin(theta_Z)
+            * self.sin_tilt
+            + self.cos_zenith * self.cos_tilt
+        )
+
+        self.dni_extra = extraterrestrial_irradiance(times).reshape(
+            (-1,) + (1,) * (self.zenith.ndim - 1)
+        )
+
+        self.airmass = relative_airmass(self.zenith)
+
+    @property
+    def beam_ratio(self):
+        """Ratio of the beam irradiance on the surface to the horizontal
+        one, with the zenith limited to 89 degrees."""
+
+        return np.maximum(self.cos_aoi, 0) / np.maximum(self.cos_zenith, 0.01745)
+
+
+def isotropic(geometry, ghi, dni, dhi):
+    """Isotropic sky (Liu and Jordan, 1963)."""
+
+    return dhi * ((1 + geometry.cos_tilt) / 2)
+
+
+def isotropic_zenith(geometry, ghi, dni, dhi):
+    """Isotropic sky plus the 0.012 x zenith correction of
+    Irradiance.get_poa_irradiance."""
+
+    return isotropic(geometry, ghi, dni, dhi) + ghi * (
+        0.012 * geometry.zenith * (1 - geometry.cos_tilt) / 2
+    )
+
+
+def _anisotropy(geometry, dni):
+
+    return np.clip(dni / geometry.dni_extra, 0, 1)
+
+
+def haydavies(geometry, ghi, dni, dhi):
+    """Circumsolar and isotropic sky (Hay and Davies, 1980)."""
+
+    A = _anisotropy(geometry, dni)
+
+    return dhi * (A * geometry.beam_ratio + (1 - A) * (1 + geometry.cos_tilt) / 2)
+
+
+def reindl(geometry, ghi, dni, dhi):
+    """Circumsolar, isotropic and horizon brightening sky (Reindl et al.,
+    1990)."""
+
+    A = _anisotropy(geometry, dni)
+    beam_horizontal = np.maximum(dni * geometry.cos_zenith, 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        brightening = np.where(ghi > 0, np.sqrt(beam_horizontal / ghi), 0)
+    # sin(tilt / 2) ** 3
+    horizon = ((1 - geometry.cos_tilt) / 2) ** 1.5
+
+    return dhi * (
+        A * geometry.beam_ratio
+        + (1 - A) * (1 + geometry.cos_tilt) / 2 * (1 + brightening * horizon)
+    )
+
+
+def perez(geometry, ghi, dni, dhi):
+    """Circumsolar, isotropic and horizon brightening sky with empirical
+    coefficients (Perez et al., 1990)."""
+
+    dhi, dni = np.broadcast_arrays(dhi, dni)
+    kappa_z3 = 1.041 * np.radians(geometry.zenith) ** 3
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        clearness = ((dhi + dni) / dhi + kappa_z3) / (1 + kappa_z3)
+        brightness = dhi * geometry.airmass / geometry.dni_extra
+
+    coefficients = PEREZ_COEFFICIENTS[
+        np.searchsorted(PEREZ_CLEARNESS_BINS, np.nan_to_num(clearness, nan=1.0))
+    ]
+    F11, F12, F13, F21, F22, F23 = np.moveaxis(coefficients, -1, 0)
+    z = np.radians(geometry.zenith)
+    F1 = np.maximum(F11 + F12 * brightness + F13 * z, 0)
+    F2 = F21 + F22 * brightness + F23 * z
+
+    a = np.maximum(geometry.cos_aoi, 0)
+    b = np.maximum(geometry.cos_zenith, np.cos(np.radians(85)))
+    sky = dhi * (
+        (1 - F1) * (1 + geometry.cos_tilt) / 2 + F1 * a / b + F2 * geometry.sin_tilt
+    )
+
+    # no diffuse light, or sun below the horizon.
+    return np.where((dhi > 0) & (geometry.zenith < 90), sky, 0)
+
+
+# Registry of the sky diffuse models by name.
+MODELS = {
+    "isotropic": isotropic,
+    "isotropic_zenith": isotropic_zenith,
+    "haydavies": haydavies,
+    "reindl": reindl,
+    "perez": perez,
+}
+
+
+def transpose(geometry, ghi, dni, dhi, model="isotropic_zenith", albedo=0.16):
+    """Calculates the plane-of-array irradiance and its components with
+    a sky diffuse model of MODELS. Negative or missing (NaN) components
+    are set to 0.
+
+    Parameters
+    ----------
+    geometry : Geometry
+    ghi, dni, dhi : array-like
+        Irradiance components in [W/m2].
+    model : string or callable
+        Name of a model of MODELS, or a model function.
+    albedo : float or array-like
+        Ground reflectance, defaults to 0.16 (urban environement).
+
+    Return
+    ------
+    A tuple of arrays (POA, E_b_poa, E_g_poa, E_d_poa).
+    """
+
+    if not callable(model):
+        if model not in MODELS:
+            raise ValueError(
+                "model must be one of {}, got {!r}".format(list(MODELS), model)
+            )
+        model = MODELS[model]
+
+    ghi = np.asarray(ghi, dtype=float)
+    dni = np.asarray(dni, dtype=float)
+    dhi = np.asarray(dhi, dtype=float)
+
+    # np.where rather than np.maximum so missing (NaN) inputs give 0.
+    E_b_poa = dni * geometry.cos_aoi
+    E_b_poa = np.where(E_b_poa > 0, E_b_poa, 0.0)
+    E_g_poa = ghi * albedo * ((1 - geometry.cos_tilt) / 2)
+    E_g_poa = np.where(E_g_poa > 0, E_g_poa, 0.0)
+    E_d_poa = model(geometry, ghi, dni, dhi)
+    E_d_poa = np.where(E_d_poa > 0, E_d_poa, 0.0)
+
+    return E_b_poa + E_g_poa + E_d_poa, E_b_poa, E_g_poa, E_d_poa
@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from irradiance_pv.irradiance_pv import Irradiance, PVSystem
+
+DELFT = PVSystem(
+    "Delft", latitude=52.01, longitude=4.36, surface_azimuth=180, surface_tilt=35
+)
+
+
+def _synthetic_tmy(index, peak=800, beam=0.7, diffuse=0.3):
+    """Half-sine daily GHI peaking at 12:00, split into DNI and DHI by
+    fixed fractions."""
+
+    hours = np.arange(len(index))
+    ghi = np.clip(peak * np.sin((hours % 24 - 6) / 12 * np.pi), 0, None)
+    return pd.DataFrame(
+        {"GHI": ghi, "DNI": beam * ghi, "DHI": diffuse * ghi}, index=index
+    )
+
+
+@pytest.fixture
+def synthetic_tmy():
+    """Factory synthetic_tmy(index, peak=800, beam=0.7, diffuse=0.3)."""
+
+    return _synthetic_tmy
+
+
+@pytest.fixture
+def make_irradiance():
+    """Factory make_irradiance(pvsystem=Delft, times=20 days of hours,
+    **tmy) of an Irradiance with synthetic TMY data."""
+
+    def make(pvsystem=DELFT, times=None, **tmy):
+        if times is None:
+            times = pd.date_range(start="2015", periods=24 * 20, freq="1h")
+        irradiance = Irradiance(pvsystem, times)
+        irradiance.tmy = _synthetic_tmy(irradiance.times, **tmy)
+        return irradiance
+
+    return make
@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+
+from irradiance_pv.irradiance_pv import PVSystem
+from irradiance_pv.aggregate import Aggregator
+from irradiance_pv.fleet import Fleet
+
+times = pd.date_range(start="2015", periods=8760, freq="1h")
+
+systems = [
+    PVSystem(
+        "Delft", latitude=52.01, longitude=4.36, surface_azimuth=180, surface_tilt=35
+    ),
+    PVSystem(
+        "Quito", latitude=-0.18, longitude=-78.47, surface_azimuth=0, surface_tilt=10
+    ),
+]
+
+
+def test_irradiance_aggregate_monthly(make_irradiance):
+    irradiance = make_irradiance(systems[0], times)
+    poa = irradiance.poa["POA"]
+
+    stats = irradiance.aggregate(freq="M", percentiles=[95], chunk_size=1000)
+
+    monthly = poa.groupby(poa.index.month)
+    assert len(stats) == 12
+    np.testing.assert_allclose(
+        stats[("POA", "energy")], monthly.sum() / 1000, rtol=1e-12
+    )
+    np.testing.assert_allclose(stats[("POA", "max")], monthly.max())
+    np.testing.assert_allclose(stats[("POA", "p95")], monthly.quantile(0.95), atol=5)
+
+
+def test_aggregator_chunking():
+    values = np.random.default_rng(0).uniform(0, 1000, len(times))
+
+    whole = Aggregator(["POA"], freq="D", percentiles=[50])
+    whole.update(times, {"POA": values})
+    chunked = Aggregator(["POA"], freq="D", percentiles=[50])
+    for start in range(0, len(times), 100):
+        rows = slice(start, start + 100)
+        chunked.update(times[rows], {"POA": values[rows]})
+
+    pd.testing.assert_frame_equal(whole.result(), chunked.result())
+    assert len(whole.result()) == 365
+
+
+def test_fleet_aggregate_matches_irradiance(make_irradiance, synthetic_tmy):
+    tmy = synthetic_tmy(times)
+    fleet = Fleet(systems, times)
+    fleet.set_tmy(tmy["GHI"], tmy["DNI"], tmy["DHI"])
+
+    stats = fleet.aggregate(freq="M", columns=["POA", "E_b_poa", "aoi"], chunk_size=500)
+
+    assert stats.index.names == ["period", "site"]
+    for pvsystem in systems:
+        expected = make_irradiance(pvsystem, times).aggregate(
+            freq="M", columns=["POA", "E_b_poa", "aoi"]
+        )
+        pd.testing.assert_frame_equal(
+            stats.xs(pvsystem.name, level="site"), expected, rtol=1e-9
+        )
+
+    # angles have no energy.
+    assert stats[("aoi", "energy")].isna().all()
+    assert stats[("POA", "energy")].notna().all()
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from irradiance_pv.cli import main
+from irradiance_pv.clearsky import MODELS, ClearSkyFetcher, clear_sky
+from irradiance_pv.fleet import Fleet
+from irradiance_pv.irradiance_pv import Irradiance, PVSystem
+
+
+def test_models_reference_values():
+    times = pd.DatetimeIndex(["2015-06-21 12:00"] * 3)
+    zenith = np.array([0.0, 60.0, 95.0])
+
+    # sun at the zenith, sea level, Linke turbidity 3
+    result = clear_sky(zenith, times, "ineichen", linke_turbidity=3)
+    np.testing.assert_allclose(result["GHI"][:2], [1022.1, 455.3], atol=0.5)
+    np.testing.assert_allclose(result["DNI"][:2], [913.6, 763.8], atol=0.5)
+
+    for model in MODELS:
+        result = clear_sky(zenith, times, model)
+        assert all(result[key][2] == 0 for key in ("GHI", "DNI", "DHI"))
+        # the components add up to the global irradiance.
+        closure = result["DNI"] * np.cos(np.radians(zenith)) + result["DHI"]
+        np.testing.assert_allclose(closure[:2], result["GHI"][:2], rtol=0.02)
+
+    with pytest.raises(ValueError, match="model must be one of"):
+        clear_sky(zenith, times, "unknown")
+
+
+def test_fleet_matches_irradiance():
+    times = pd.date_range("2015-03-01", periods=96, freq="1h")
+    pvsystems = [
+        PVSystem("a", 45, 5, 180, 30, elevation=0),
+        PVSystem("b", -30, 20, 0, 20, elevation=1500),
+    ]
+
+    fleet = Fleet(pvsystems, times)
+    fleet.get_solar_pos_v()
+    tmy = fleet.get_clearsky("ineichen", linke_turbidity=np.array([3.0, 2.5]))
+    poa = fleet.get_poa_irradiance_fast()
+
+    for k, (pvsystem, tl) in enumerate(zip(pvsystems, [3.0, 2.5])):
+        irradiance = Irradiance(pvsystem, times)
+        irradiance.get_solar_pos_v()
+        expected = irradiance.get_clearsky("ineichen", linke_turbidity=tl)
+        np.testing.assert_allclose(tmy["GHI"][:, k], expected["GHI"], atol=1e-9)
+        np.testing.assert_allclose(
+            poa["POA"][:, k], irradiance.poa["POA"], rtol=1e-6, atol=1e-6
+        )
+
+    # higher site, clearer sky
+    assert tmy["GHI"][:, 1].max() > tmy["GHI"][:, 0].max()
+
+
+def test_main_clearsky_offline(tmp_path):
+    sites = tmp_path / "sites.csv"
+    sites.write_text("name,lat,lon,tilt,azimuth\na,45,5,30,180\nb,46,6,30,180\n")
+    output = tmp_path / "poa.csv"
+
+    status = main([str(sites), "--output", str(output), "--clearsky", "haurwitz"])
+
+    assert status == 0
+    df = pd.read_csv(output)
+    assert len(df) == 2 * 8760
+    assert df["POA"].max() > 800
+
+    # the clear-sky models replace the TMY sources.
+    for other in (["--tmy-dir", str(tmp_path)], ["--cache", str(tmp_path)]):
+        with pytest.raises(SystemExit):
+            main(
+                [str(sites), "--output", str(output), "--clearsky", "ineichen"] + other
+            )
+
+    frame = ClearSkyFetcher("haurwitz").fetch(45, 5)
+    assert list(frame.columns) == ["time_pvgis", "GHI", "DNI", "DHI"]
+    assert len(frame) == 8760
+
+
+def test_fetcher_uses_system_elevation():
+    times = pd.date_range("2015", periods=8760, freq="1h")
+    fleet = Fleet.from_arrays(
+        times, 45, 5, surface_azimuth=180, surface_tilt=30, elevation=[0, 2000]
+    )
+    fleet.get_solar_pos_v()
+    expected = {key: value.copy() for key, value in fleet.get_clearsky().items()}
+
+    tmy = fleet.get_TMY_file(fetcher=ClearSkyFetcher())
+
+    for key in ("GHI", "DNI", "DHI"):
+        np.testing.assert_allclose(tmy[key], expected[key], atol=1e-9)
+    assert tmy["GHI"][:, 1].max() > tmy["GHI"][:, 0].max()
@@ -0,0 +1,122 @@
+import json
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+from irradiance_pv.cli import CLEARSKY_MODELS, main, read_sites
+from irradiance_pv.clearsky import MODELS
+from irradiance_pv.export import read_results
+from irradiance_pv.tmy import DirectoryFetcher
+
+
+def write_tmy(directory, lat, lon):
+    ghi = np.clip(800 * np.sin((np.arange(8760) % 24 - 6) / 12 * np.pi), 0, None)
+    records = [
+        {"time(UTC)": str(i), "G(h)": g, "Gb(n)": 0.7 * g, "Gd(h)": 0.3 * g}
+        for i, g in enumerate(ghi.tolist())
+    ]
+    with open(directory / DirectoryFetcher.filename(lat, lon, 2006, 2015), "w") as f:
+        json.dump({"outputs": {"tmy_hourly": records}}, f)
+
+
+def test_read_sites(tmp_path):
+    path = tmp_path / "sites.json"
+    path.write_text(
+        json.dumps(
+            [
+                {"name": "a", "lat": 10, "lon": 20, "tilt": 15, "azimuth": 180},
+                {
+                    "name": "b",
+                    "latitude": -10,
+                    "longitude": 20,
+                    "surface_tilt": 15,
+                    "surface_azimuth": 0,
+                    "elevation": 300,
+                },
+            ]
+        )
+    )
+
+    a, b = read_sites(str(path))
+    assert (a.lat, a.lon, a.surface_tilt, a.surface_azimuth, a.elev) == (
+        10,
+        20,
+        15,
+        180,
+        0,
+    )
+    assert (b.lat, b.surface_azimuth, b.elev) == (-10, 0, 300)
+
+
+def test_main_batches(tmp_path, capsys):
+    write_tmy(tmp_path, 45, 5)
+    write_tmy(tmp_path, 46, 6)
+    write_tmy(tmp_path, 47, 7)
+    sites = tmp_path / "sites.csv"
+    sites.write_text(
+        "name,lat,lon,tilt,azimuth\n"
+        "a,45,5,30,180\n"
+        "b,46,6,30,180\n"
+        "missing,0,0,30,180\n"
+        "c,47,7,30,180\n"
+    )
+    output = tmp_path / "poa.csv"
+
+    status = main(
+        [
+            str(sites),
+            "--output",
+            str(output),
+            "--tmy-dir",
+            str(tmp_path),
+            "--batch-size",
+            "2",
+        ]
+    )
+
+    assert status == 1
+    assert "missing" in capsys.readouterr().err
+
+    df = pd.read_csv(output)
+    assert len(df) == 3 * 8760
+    assert sorted(df["site"].unique()) == ["a", "b", "c"]
+    assert (df["POA"] >= 0).all()
+
+
+def test_main_columnar_output(tmp_path):
+    write_tmy(tmp_path, 45, 5)
+    sites = tmp_path / "sites.csv"
+    sites.write_text("name,lat,lon,tilt,azimuth\na,45,5,30,180\n")
+    output = tmp_path / "poa.npz"
+
+    status = main(
+        [str(sites), "--output", str(output), "--tmy-dir", str(tmp_path)]
+        + ["--dtype", "float32"]
+    )
+
+    df = read_results(output)
+    assert status == 0
+    assert len(df) == 8760
+    assert df["POA"].dtype == np.float32
+
+
+def test_help_does_not_import_numerical_stack():
+    code = (
+        "import sys\n"
+        "from irradiance_pv.cli import main\n"
+        "try:\n"
+        "    main(['--help'])\n"
+        "except SystemExit:\n"
+        "    pass\n"
+        "print(','.join(sorted(sys.modules)), file=sys.stderr)"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    modules = result.stderr.strip().split(",")
+    assert "--clearsky" in result.stdout
+    assert "numpy" not in modules and "pandas" not in modules
+    assert list(CLEARSKY_MODELS) == list(MODELS)
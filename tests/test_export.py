@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from irradiance_pv.irradiance_pv import PVSystem
+from irradiance_pv.export import ResultWriter, read_results
+from irradiance_pv.fleet import Fleet
+
+times = pd.date_range(start="2015", periods=24 * 20, freq="1h")
+
+systems = [
+    PVSystem(
+        "Delft", latitude=52.01, longitude=4.36, surface_azimuth=180, surface_tilt=35
+    ),
+    PVSystem(
+        "Sonora", latitude=30, longitude=-110, surface_azimuth=270, surface_tilt=40
+    ),
+]
+
+
+@pytest.mark.parametrize(
+    "name", ["poa.npz", "poa.parquet", "poa.arrow"], ids=["npz", "parquet", "arrow"]
+)
+def test_irradiance_export(tmp_path, name, make_irradiance):
+    if not name.endswith(".npz"):
+        pytest.importorskip("pyarrow")
+
+    irradiance = make_irradiance(systems[0], times)
+    expected = pd.concat(list(irradiance.iter_chunks()))
+
+    irradiance.export(tmp_path / name, chunk_size=100)
+    df = read_results(tmp_path / name)
+
+    assert list(df.columns[:4]) == ["GHI", "DNI", "DHI", "solar_altitude"]
+    assert df.index.equals(expected.index)
+    np.testing.assert_array_equal(df["POA"], expected["POA"])
+    np.testing.assert_array_equal(df["GHI"], irradiance.tmy["GHI"])
+
+
+def test_export_selected_columns_float32(tmp_path, make_irradiance):
+    irradiance = make_irradiance(systems[0], times)
+    expected = pd.concat(list(irradiance.iter_chunks()))
+
+    irradiance.export(
+        tmp_path / "poa.npz", columns=["GHI", "POA"], dtype=np.float32, chunk_size=64
+    )
+    df = read_results(tmp_path / "poa.npz")
+
+    assert list(df.columns) == ["GHI", "POA"]
+    assert (df.dtypes == np.float32).all()
+    np.testing.assert_allclose(df["POA"], expected["POA"], rtol=1e-6)
+
+
+def test_fleet_export_long_format(tmp_path, synthetic_tmy):
+    tmy = synthetic_tmy(times)
+    fleet = Fleet(systems, times)
+    fleet.set_tmy(tmy["GHI"], tmy["DNI"], tmy["DHI"])
+    fleet.get_solar_pos_v()
+    poa = fleet.get_poa_irradiance_fast()
+
+    fleet.export(tmp_path / "fleet.npz", poa, columns=["GHI", "POA"], chunk_size=50)
+    df = read_results(tmp_path / "fleet.npz")
+
+    assert list(df.columns) == ["site", "GHI", "POA"]
+    assert len(df) == len(times) * len(systems)
+    sonora = df[df["site"] == "Sonora"]
+    np.testing.assert_array_equal(sonora["POA"], poa["POA"][:, 1])
+    assert sonora.index.equals(fleet.times)
+
+
+def test_writer_checks_chunks(tmp_path):
+    with ResultWriter(tmp_path / "poa.npz") as writer:
+        writer.write({"POA": np.ones(3)}, times=times[:3])
+        with pytest.raises(ValueError):
+            writer.write({"E_b_poa": np.ones(3)}, times=times[3:6])
+
+    with pytest.raises(ValueError):
+        ResultWriter(tmp_path / "poa.xlsx")
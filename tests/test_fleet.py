@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+
+from irradiance_pv.irradiance_pv import Irradiance, PVSystem
+from irradiance_pv.fleet import Fleet
+
+times = pd.date_range(start="2015-06-01", periods=72, freq="1h")
+
+systems = [
+    PVSystem(
+        "Delft", latitude=52.01, longitude=4.36, surface_azimuth=180, surface_tilt=35
+    ),
+    PVSystem(
+        "Sonora", latitude=30, longitude=-110, surface_azimuth=270, surface_tilt=40
+    ),
+    PVSystem(
+        "Quito", latitude=-0.18, longitude=-78.47, surface_azimuth=0, surface_tilt=10
+    ),
+]
+
+
+def test_fleet_matches_irradiance(synthetic_tmy):
+    tmy = synthetic_tmy(times)
+
+    fleet = Fleet(systems, times)
+    fleet.set_tmy(tmy["GHI"], tmy["DNI"], tmy["DHI"])
+    solar_pos = fleet.get_solar_pos_v()
+    aoi = fleet.get_aoi()
+    poa = fleet.get_poa_irradiance()
+
+    for i, pvsystem in enumerate(systems):
+        irradiance = Irradiance(pvsystem, times)
+        irradiance.tmy = tmy
+        pos_i = irradiance.get_solar_pos_v()
+        aoi_i = irradiance.get_aoi()
+        poa_i = irradiance.get_poa_irradiance()
+
+        for key in ("solar_altitude", "solar_zenith", "solar_azimuth"):
+            np.testing.assert_allclose(solar_pos[key][:, i], pos_i[key].to_numpy())
+        np.testing.assert_allclose(aoi[:, i], aoi_i["aoi"].to_numpy(dtype=float))
+        for key in ("POA", "E_b_poa", "E_g_poa", "E_d_poa"):
+            np.testing.assert_allclose(poa[key][:, i], poa_i[key].to_numpy(dtype=float))
+
+
+def test_fleet_from_arrays_to_frame():
+    fleet = Fleet.from_arrays(
+        times, latitude=[10, 20], longitude=0, surface_azimuth=180, surface_tilt=20
+    )
+    fleet.get_solar_pos_v()
+    df = fleet.to_frame(fleet.get_aoi())
+
+    assert len(fleet) == 2
+    assert df.shape == (len(times), 2)
+    assert list(df.columns) == [0, 1]
+
+    fleet.set_tmy(*[np.ones(len(times))] * 3)
+    df_poa = fleet.to_frame(fleet.get_poa_irradiance())
+    assert df_poa["POA"].shape == (len(times), 2)
+
+
+def test_poa_irradiance_fast(synthetic_tmy):
+    tmy = synthetic_tmy(times)
+
+    fleet = Fleet(systems, times)
+    fleet.set_tmy(tmy["GHI"], tmy["DNI"], tmy["DHI"])
+    fleet.get_solar_pos_v()
+    aoi = fleet.get_aoi()
+    poa = fleet.get_poa_irradiance()
+    poa_fast = fleet.get_poa_irradiance_fast()
+
+    np.testing.assert_allclose(fleet.aoi, aoi)
+    for key in poa:
+        np.testing.assert_allclose(poa_fast[key], poa[key], atol=1e-9)
+
+    irradiance = Irradiance(systems[0], times)
+    irradiance.tmy = tmy
+    irradiance.get_solar_pos_v()
+    irradiance.get_aoi()
+    df_poa = irradiance.get_poa_irradiance().astype(float)
+    df_poa_fast = irradiance.get_poa_irradiance_fast()
+
+    assert (df_poa_fast.dtypes == "float64").all()
+    pd.testing.assert_frame_equal(df_poa_fast, df_poa, atol=1e-9)
+
+
+def test_poa_irradiance_daylight():
+    fleet = Fleet(systems, times)
+    solar_pos = fleet.get_solar_pos_v()
+    sin_alt = np.clip(np.sin(np.radians(solar_pos["solar_altitude"])), 0, None)
+    fleet.set_tmy(900 * sin_alt, 700 * sin_alt, 200 * sin_alt)
+
+    expected = fleet.get_poa_irradiance_fast()
+    sparse = fleet.get_poa_irradiance_daylight()
+
+    assert sparse.shape == (len(times), len(systems))
+    for key in expected:
+        np.testing.assert_allclose(sparse.to_array(key), expected[key])
+
+
+def test_empty_fleet(tmp_path):
+    fleet = Fleet.from_arrays(times, [], [], surface_azimuth=180, surface_tilt=30)
+    fleet.set_tmy(*[np.ones(len(times))] * 3)
+    fleet.get_solar_pos_v()
+
+    assert fleet.aggregate(freq="D").empty
+    fleet.export(tmp_path / "fleet.npz", fleet.get_poa_irradiance_fast())
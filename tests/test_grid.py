@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from irradiance_pv.irradiance_pv import PVSystem
+from irradiance_pv.fleet import Fleet
+from irradiance_pv.grid import ArraySource, Grid, UniformSource, latitude_tilt
+
+times = pd.date_range(start="2015-03-01", periods=24 * 10, freq="1h")
+
+
+def test_poa_map_matches_fleet(tmp_path, synthetic_tmy):
+    ghi = synthetic_tmy(times)["GHI"].to_numpy()
+    grid = Grid((-1, 1), (10, 11), resolution=0.5)
+    assert grid.shape == (4, 2)
+
+    energy = grid.poa_map(
+        times,
+        UniformSource(ghi, 0.7 * ghi, 0.3 * ghi),
+        surface_tilt=latitude_tilt,
+        tile_size=3,
+        chunk_size=50,
+        out=tmp_path / "poa.npy",
+    )
+
+    lat, lon = grid.cells(0, len(grid))
+    fleet = Fleet(
+        [
+            PVSystem(str(i), a, o, 180 if a >= 0 else 0, abs(a))
+            for i, (a, o) in enumerate(zip(lat, lon))
+        ],
+        times,
+    )
+    fleet.set_tmy(ghi, 0.7 * ghi, 0.3 * ghi)
+    fleet.get_solar_pos_v()
+    expected = fleet.get_poa_irradiance_fast()["POA"].sum(axis=0) / 1000
+
+    np.testing.assert_allclose(energy.ravel(), expected, rtol=1e-9)
+    np.testing.assert_allclose(np.load(tmp_path / "poa.npy"), energy)
+
+
+def test_array_source_nearest(synthetic_tmy):
+    ghi = synthetic_tmy(times)["GHI"].to_numpy()
+    scale = np.array([[1.0, 2.0], [3.0, 4.0]])
+    gridded = ghi[:, np.newaxis, np.newaxis] * scale
+    source = ArraySource([0, 1], [10, 11], gridded, 0.7 * gridded, 0.3 * gridded)
+
+    grid = Grid((-0.5, 1.5), (9.5, 11.5), resolution=1)
+    energy = grid.poa_map(times, source, surface_tilt=0)
+
+    flat = grid.poa_map(times, UniformSource(ghi, 0.7 * ghi, 0.3 * ghi), 0)
+    np.testing.assert_allclose(energy, flat * scale)
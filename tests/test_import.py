@@ -0,0 +1,56 @@
+import subprocess
+import sys
+
+import pytest
+
+
+def import_time(statement):
+    """Runs statement in a fresh interpreter.
+
+    Return
+    ------
+    A tuple (cumulative import time of the irradiance_pv package in
+    seconds, sorted names of the loaded top-level modules).
+    """
+
+    code = "import sys; {}; print(','.join(sorted(sys.modules)))".format(statement)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+    # -X importtime reports "self [us] | cumulative [us] | module" on stderr.
+    micros = [
+        int(line.split("|")[1])
+        for line in result.stderr.splitlines()
+        if line.split("|")[-1].strip() == "irradiance_pv"
+    ]
+
+    return sum(micros) / 1e6, result.stdout.strip().split(",")
+
+
+def test_package_import_is_light():
+    seconds, modules = import_time("import irradiance_pv")
+
+    for heavy in ("numpy", "pandas", "requests"):
+        assert heavy not in modules
+    assert seconds < 0.1
+
+
+def test_irradiance_does_not_load_requests():
+    _, modules = import_time("from irradiance_pv import PVSystem, Irradiance, Fleet")
+
+    assert "pandas" in modules
+    assert "requests" not in modules
+
+
+def test_exports():
+    import irradiance_pv
+    from irradiance_pv.irradiance_pv import Irradiance
+
+    assert irradiance_pv.Irradiance is Irradiance
+    assert set(irradiance_pv.__all__) <= set(dir(irradiance_pv))
+    with pytest.raises(AttributeError):
+        irradiance_pv.missing
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from irradiance_pv.irradiance_pv import Irradiance, PVSystem
+
+times = pd.date_range(start="2015", periods=24 * 20, freq="1h")
+
+pvsystem = PVSystem(
+    "Delft", latitude=52.01, longitude=4.36, surface_azimuth=180, surface_tilt=35
+)
+
+
+def test_iter_chunks_matches_full_run(make_irradiance):
+    irradiance = make_irradiance(pvsystem, times)
+    pos = irradiance.get_solar_pos_v()
+    poa = irradiance.get_poa_irradiance_fast()
+    expected = pd.concat([pos, irradiance.aoi, poa], axis=1)
+
+    chunks = list(irradiance.iter_chunks(chunk_size=100))
+
+    assert [len(chunk) for chunk in chunks] == [100, 100, 100, 100, 80]
+    pd.testing.assert_frame_equal(
+        pd.concat(chunks), expected[list(chunks[0].columns)], check_freq=False
+    )
+
+
+def test_poa_irradiance_daylight():
+    irradiance = Irradiance(pvsystem, times)
+    solar_pos = irradiance.get_solar_pos_v()
+    sin_alt = np.clip(np.sin(np.radians(solar_pos["solar_altitude"])), 0, None)
+    irradiance.tmy = pd.DataFrame(
+        {"GHI": 900 * sin_alt, "DNI": 700 * sin_alt, "DHI": 200 * sin_alt}
+    )
+
+    expected = irradiance.get_poa_irradiance_fast()
+    sparse = irradiance.get_poa_irradiance_daylight()
+
+    assert 0 < sparse.n_daylight < len(times)
+    assert sparse.n_daylight == (solar_pos["solar_altitude"] > 0).sum()
+    pd.testing.assert_frame_equal(
+        sparse.to_frame(irradiance.times, columns=list(expected.columns)), expected
+    )
+    assert np.isnan(sparse.to_array("aoi")[~sparse.mask]).all()
+
+
+def test_lazy_stages(make_irradiance):
+    irradiance = make_irradiance(pvsystem, times)
+
+    # poa is computed on first access, with the stages it needs.
+    poa = irradiance.poa
+    solar_pos = irradiance.solar_pos
+    expected = make_irradiance(pvsystem, times)
+    expected.get_solar_pos_v()
+    expected.get_aoi()
+    pd.testing.assert_frame_equal(poa, expected.get_poa_irradiance(), atol=1e-9)
+    assert irradiance.poa is poa
+
+    # a new orientation keeps the solar position.
+    irradiance.surface_tilt = 10
+    assert irradiance.solar_pos is solar_pos
+    assert irradiance.poa is not poa
+    assert irradiance.aoi["aoi"].iloc[12] != expected.aoi["aoi"].iloc[12]
+
+    # new times recompute everything.
+    irradiance.times = times + pd.Timedelta("30min")
+    assert irradiance.solar_pos is not solar_pos
+    assert irradiance.solar_pos.index.equals(irradiance.times)
+
+    # the TMY data is still indexed on the former times.
+    with pytest.raises(ValueError, match="TMY data is indexed"):
+        irradiance.poa
+    irradiance.tmy = irradiance.tmy.set_axis(irradiance.times)
+    assert irradiance.poa.index.equals(irradiance.times)
+
+
+def test_missing_tmy():
+    irradiance = Irradiance(pvsystem, times)
+
+    assert irradiance.aoi is not None
+    with pytest.raises(ValueError, match="TMY"):
+        irradiance.poa
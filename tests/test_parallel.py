@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from irradiance_pv.fleet import Fleet
+from irradiance_pv.parallel import Executor
+
+times = pd.date_range(start="2015-03-01", periods=24 * 10, freq="1h")
+
+
+@pytest.fixture
+def fleet():
+    rng = np.random.default_rng(0)
+    n_sites = 7
+    fleet = Fleet.from_arrays(
+        times,
+        latitude=rng.uniform(-60, 60, n_sites),
+        longitude=rng.uniform(-180, 180, n_sites),
+        surface_azimuth=rng.uniform(0, 360, n_sites),
+        surface_tilt=rng.uniform(0, 60, n_sites),
+    )
+    ghi = rng.uniform(0, 1000, (len(times), n_sites))
+    fleet.set_tmy(ghi, 0.7 * ghi, 0.3 * ghi)
+    return fleet
+
+
+@pytest.mark.parametrize(
+    "executor",
+    [
+        Executor(max_workers=2, mode="process"),
+        Executor(max_workers=3, chunk_size=50, split="time", mode="thread"),
+        Executor(max_workers=2, chunk_size=3, split="site", mode="thread"),
+    ],
+)
+def test_executor_matches_fleet(fleet, executor):
+    fleet.get_solar_pos_v()
+    expected = fleet.get_poa_irradiance_fast()
+    expected_aoi = fleet.aoi
+
+    result = executor.run(fleet)
+
+    np.testing.assert_allclose(result["aoi"], expected_aoi)
+    for key in expected:
+        np.testing.assert_allclose(result[key], expected[key])
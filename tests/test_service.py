@@ -0,0 +1,145 @@
+import json
+import threading
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from irradiance_pv.clearsky import ClearSkyFetcher
+from irradiance_pv.fleet import Fleet
+from irradiance_pv.irradiance_pv import PVSystem
+from irradiance_pv.service import LRUCache, Metrics, POAService, serve
+
+
+class SyntheticFetcher:
+    """TMY source counting its calls, failing for lat 0."""
+
+    def __init__(self):
+        self.calls = 0
+
+    def fetch(self, lat, lon, startyear, endyear):
+        self.calls += 1
+        if lat == 0:
+            raise IOError("no data")
+        ghi = np.clip(800 * np.sin((np.arange(8760) % 24 - 6) / 12 * np.pi), 0, None)
+        return pd.DataFrame(
+            {
+                "time_pvgis": np.arange(8760),
+                "GHI": ghi,
+                "DNI": 0.7 * ghi,
+                "DHI": 0.3 * ghi,
+            }
+        )
+
+
+@pytest.fixture
+def server():
+    service = POAService(fetcher=SyntheticFetcher(), window=0.2)
+    server = serve(service, port=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(server, path):
+    url = "http://127.0.0.1:{}{}".format(server.server_address[1], path)
+    try:
+        with urlopen(url) as response:
+            return response.status, json.loads(response.read())
+    except HTTPError as err:
+        return err.code, json.loads(err.read())
+
+
+def poa_path(lat, tilt=30, **extra):
+    params = dict(
+        lat=lat, lon=5, tilt=tilt, azimuth=180, start="2015-06-01", end="2015-06-03"
+    )
+    params.update(extra)
+    return "/poa?" + "&".join("{}={}".format(k, v) for k, v in params.items())
+
+
+def test_poa_matches_fleet(server):
+    status, body = get(server, poa_path(45, columns="POA,GHI"))
+
+    assert status == 200
+    assert list(body) == ["time", "POA", "GHI"]
+    assert body["time"][:2] == ["2015-06-01T00:00:00", "2015-06-01T01:00:00"]
+
+    times = pd.date_range("2015-06-01", "2015-06-03", freq="1h", inclusive="left")
+    fleet = Fleet([PVSystem("a", 45, 5, 180, 30)], times)
+    fleet.set_tmy_frames([SyntheticFetcher().fetch(45, 5, 2006, 2015)])
+    fleet.get_solar_pos_v()
+    np.testing.assert_allclose(
+        body["POA"], fleet.get_poa_irradiance_fast()["POA"][:, 0]
+    )
+
+
+def test_concurrent_requests_are_coalesced(server):
+    results = {}
+
+    def request(tilt):
+        results[tilt] = get(server, poa_path(45, tilt=tilt))
+
+    threads = [threading.Thread(target=request, args=(t,)) for t in range(0, 60, 10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(status == 200 for status, _ in results.values())
+    assert results[0][1]["POA"] != results[50][1]["POA"]
+
+    # repeated request, answered from the result cache.
+    assert get(server, poa_path(45, tilt=20))[1] == results[20][1]
+
+    _, metrics = get(server, "/metrics")
+    assert metrics["counters"]["batches"] == 1
+    assert metrics["batch_size"]["max"] == 6
+    assert metrics["caches"]["result"]["hits"] == 1
+    assert metrics["caches"]["tmy"]["misses"] == 1
+    assert server.service.fetcher.calls == 1
+    assert metrics["latency_ms"]["count"] == 7
+
+
+def test_errors(server):
+    status, body = get(server, poa_path(0))
+    assert status == 502 and "TMY data unavailable" in body["error"]
+
+    assert get(server, "/poa?lat=1")[0] == 400
+    assert get(server, poa_path(45, columns="AOI"))[0] == 400
+    assert get(server, poa_path(45, end="2014"))[0] == 400
+    assert get(server, "/other")[0] == 404
+    for invalid in (dict(lat="nan"), dict(lat=95), dict(lat=45, lon=200)):
+        status, body = get(server, poa_path(**invalid))
+        assert status == 400, invalid
+
+    # aware and naive bounds are both taken as UTC.
+    status, body = get(server, poa_path(45, start="2015-06-01T02:00%2B02:00"))
+    assert status == 200 and body["time"][0] == "2015-06-01T00:00:00"
+    assert get(server, "/health") == (200, {"status": "ok"})
+
+
+def test_result_cache_is_bounded_by_bytes():
+    cache = LRUCache("result", 250, Metrics(), weigh=lambda value: value.nbytes)
+
+    for key in range(4):
+        cache.put(key, np.zeros(10))
+    cache.put("large", np.zeros(100))
+
+    assert len(cache) == 3 and cache.size == 240
+    assert cache.get(0) is None and cache.get(3) is not None
+    assert cache.get("large") is None
+
+
+def test_clearsky_service_uses_elevation():
+    service = POAService(fetcher=ClearSkyFetcher(), window=0)
+    low, high = (
+        service.poa(45, 5, 30, 180, "2015-06-01", "2015-06-02", elevation=elevation)
+        for elevation in (0, 2000)
+    )
+
+    assert high["GHI"].max() > low["GHI"].max()
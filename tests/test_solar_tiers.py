@@ -0,0 +1,83 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from irradiance_pv.irradiance_pv import Irradiance, PVSystem
+from irradiance_pv.solar_tiers import (
+    ERROR_BOUNDS,
+    TIERS,
+    LowOrderEphemeris,
+    SPAEphemeris,
+    select_tier,
+    solar_ephemeris,
+)
+from irradiance_pv.spa_sb import _angular_distance
+
+
+def test_spa_reference_example():
+    # Reda and Andreas (2008), 2003-10-17 12:30:30 at UTC-7, Golden CO.
+    times = pd.DatetimeIndex(["2003-10-17 19:30:30"])
+    ephemeris = SPAEphemeris(times, delta_t=67)
+
+    altitude, zenith, azimuth = ephemeris.solar_position(
+        39.742476, -105.1786, elevation=1830.14
+    )
+
+    np.testing.assert_allclose(altitude, 39.872046, atol=1e-6)
+    np.testing.assert_allclose(azimuth, 194.34024, atol=1e-5)
+    np.testing.assert_allclose(
+        np.degrees(np.arcsin(ephemeris.sin_declination)), -9.31434, atol=1e-5
+    )
+
+
+@pytest.mark.parametrize("year", ["1960", "2030"])
+def test_tiers_within_error_bounds(year):
+    times = pd.date_range(year, periods=24 * 366, freq="1h")
+    lat = np.array([-45.0, 0.0, 52.0, 68.0])
+    lon = np.array([-120.0, 30.0, 4.4, 170.0])
+    reference = SPAEphemeris(times).solar_position(lat, lon)
+
+    for tier in ["low", "usno"]:
+        altitude, _, azimuth = TIERS[tier](times).solar_position(lat, lon)
+        error = _angular_distance(reference[0], reference[2], altitude, azimuth)
+        assert error.max() < ERROR_BOUNDS[tier]
+
+
+def test_spa_blocks_and_interpolation():
+    times = pd.date_range("2020-06-01", periods=3000, freq="1min")
+    lat, lon = np.array([10.0, 52.0, -33.0]), np.array([0.0, 4.4, 151.0])
+    expected = SPAEphemeris(times[::60]).solar_position(lat, lon)
+
+    ephemeris = SPAEphemeris(times)
+    ephemeris.block_size = 100
+    altitude, zenith, azimuth = ephemeris.solar_position(lat, lon)
+
+    assert altitude.shape == (len(times), 3)
+    np.testing.assert_allclose(altitude[::60], expected[0], atol=1e-5)
+    np.testing.assert_allclose(azimuth[::60], expected[2], atol=1e-5)
+    np.testing.assert_allclose(zenith, 90 - altitude)
+    np.testing.assert_array_equal(
+        ephemeris[60:120].solar_position(lat, lon)[0], altitude[60:120]
+    )
+
+
+def test_select_tier():
+    assert select_tier(1) == "low"
+    assert select_tier(0.01) == "spa"
+    assert isinstance(solar_ephemeris([0.0], tolerance=0.5), LowOrderEphemeris)
+    with pytest.raises(ValueError, match="no solar position tier"):
+        select_tier(1e-5)
+    with pytest.raises(ValueError, match="tier must be one of"):
+        solar_ephemeris([0.0], tier="exact")
+
+
+def test_irradiance_with_tier():
+    times = pd.date_range("2015-06-01", periods=48, freq="1h")
+    pvsystem = PVSystem("Delft", 52.01, 4.36, surface_azimuth=180, surface_tilt=35)
+    irradiance = Irradiance(pvsystem, times)
+    usno = irradiance.get_solar_pos_v()
+
+    spa = irradiance.get_solar_pos_v(ephemeris=solar_ephemeris(times, "spa"))
+
+    assert list(spa.columns) == list(usno.columns)
+    np.testing.assert_allclose(spa, usno, atol=0.05)
@@ -13,8 +13,13 @@ from irradiance_pv.spa_sb import sun_altitude
 from irradiance_pv.spa_sb import sun_zenith
 
 from irradiance_pv.spa_sb import solar_position
+from irradiance_pv.spa_sb import solar_position_vect
+from irradiance_pv.spa_sb import Ephemeris
+from irradiance_pv.spa_sb import solar_position_array
+from irradiance_pv.spa_sb import solar_position_interp
 
 
+import numpy as np
 import pandas as pd
 
 
@@ -85,3 +90,57 @@ def test_solar_position():
 
     assert r[0] == 36.1
     assert r[1] == 127.2
+
+
+def test_solar_position_vect():
+    # D = 5216.875, as used by the scalar tests above
+    times = pd.DatetimeIndex(["2014-04-14 09:00:00"])
+    df = solar_position_vect(times, lat, lon)
+
+    assert df["solar_altitude"].iloc[0] == pytest.approx(36.1, 0.01)
+    assert df["solar_azimuth"].iloc[0] == pytest.approx(127.2, 0.01)
+    assert df["solar_zenith"].iloc[0] == pytest.approx(90 - 36.1, 0.01)
+
+
+def test_ephemeris_reuse():
+    times = pd.date_range("2014-04-14", periods=48, freq="1h", tz="UTC")
+    ephemeris = Ephemeris(times)
+
+    for site_lat, site_lon in [(lat, lon), (-33.9, 18.4)]:
+        shared = solar_position_vect(times, site_lat, site_lon, ephemeris=ephemeris)
+        own = solar_position_vect(times, site_lat, site_lon)
+        pd.testing.assert_frame_equal(shared, own)
+
+
+def test_solar_position_array():
+    times = pd.date_range("2014-04-14", periods=48, freq="1h")
+    expected = solar_position_vect(times, lat, lon)
+
+    epoch_seconds = (times - pd.Timestamp("1970-01-01")) // pd.Timedelta("1s")
+    for source in (times.values, epoch_seconds.to_numpy()):
+        altitude, zenith, azimuth = solar_position_array(source, lat, lon)
+        assert altitude == pytest.approx(expected["solar_altitude"].to_numpy())
+        assert azimuth == pytest.approx(expected["solar_azimuth"].to_numpy())
+
+    out = tuple(np.empty(len(times), dtype=np.float32) for _ in range(3))
+    result = solar_position_array(times, lat, lon, out=out, dtype=np.float32)
+    assert all(r is o for r, o in zip(result, out))
+    assert out[2] == pytest.approx(expected["solar_azimuth"].to_numpy(), abs=1e-3)
+
+
+def test_solar_position_interp():
+    # 1 s steps through the midnight sun, azimuth wraps over 0/360.
+    times = pd.date_range("2015-06-21 22:00", periods=4 * 3600, freq="1s")
+    exact = solar_position_vect(times, 70, 20)
+
+    approx = solar_position_interp(times, 70, 20, step="5min")
+    wrapped = (approx["solar_azimuth"] - exact["solar_azimuth"] + 180) % 360 - 180
+    assert np.abs(wrapped).max() < 0.01
+    assert np.abs(approx["solar_altitude"] - exact["solar_altitude"]).max() < 0.01
+    assert approx.attrs["max_error"] < 0.01
+
+    # sun passing close to the zenith, the step is refined.
+    times = pd.date_range("2015-06-21 11:00", periods=2 * 3600, freq="1s")
+    approx = solar_position_interp(times, 23.44, 0, step="5min", max_error=0.01)
+    assert approx.attrs["step"] < pd.Timedelta("5min")
+    assert approx.attrs["max_error"] <= 0.01
@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+
+from irradiance_pv.irradiance_pv import PVSystem
+from irradiance_pv.sweep import optimum_orientation, orientation_sweep
+
+times = pd.date_range(start="2015", periods=8760, freq="1h")
+
+
+@pytest.fixture
+def madrid(make_irradiance):
+    def make(surface_tilt=30, surface_azimuth=180):
+        pvsystem = PVSystem("Madrid", 40.4, -3.7, surface_azimuth, surface_tilt)
+        return make_irradiance(pvsystem, times, peak=900, beam=0.75, diffuse=0.25)
+
+    return make
+
+
+def test_orientation_sweep_matches_irradiance(madrid):
+    tilts = [0, 20, 45]
+    azimuths = [90, 180, 250]
+    energy = orientation_sweep(madrid(), tilts, azimuths, chunk_size=4)
+
+    for tilt in tilts:
+        for azimuth in azimuths:
+            irradiance = madrid(tilt, azimuth)
+            irradiance.get_solar_pos_v()
+            poa = irradiance.get_poa_irradiance_fast()
+            assert energy.loc[tilt, azimuth] == pytest.approx(poa["POA"].sum() / 1000)
+
+
+def test_orientation_sweep_per_month(madrid):
+    irradiance = madrid()
+    monthly = orientation_sweep(irradiance, [20, 35], [170, 180, 190], freq="M")
+    total = orientation_sweep(irradiance, [20, 35], [170, 180, 190])
+
+    assert monthly.index.get_level_values("period").nunique() == 12
+    pd.testing.assert_frame_equal(monthly.groupby(level="surface_tilt").sum(), total)
+
+    tilt, azimuth, best = optimum_orientation(monthly)
+    assert best == pytest.approx(total.to_numpy().max())
+    assert tilt == 35
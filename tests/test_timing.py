@@ -0,0 +1,82 @@
+import threading
+import tracemalloc
+
+import pandas as pd
+import pytest
+
+from irradiance_pv.irradiance_pv import Irradiance, PVSystem
+from irradiance_pv.timing import timers
+
+
+@pytest.fixture
+def registry():
+    timers.reset()
+    yield timers
+    timers.disable()
+    timers.reset()
+    timers.hooks.clear()
+
+
+def run_pipeline():
+    times = pd.date_range(start="2015", periods=48, freq="1h")
+    irradiance = Irradiance(PVSystem("Delft", 52.01, 4.36, 180, 35), times)
+    irradiance.tmy = pd.DataFrame(
+        {"GHI": 100.0, "DNI": 50.0, "DHI": 50.0}, index=irradiance.times
+    )
+    irradiance.get_solar_pos_v()
+    irradiance.get_aoi()
+    irradiance.get_poa_irradiance()
+
+
+def test_disabled_by_default(registry, capsys):
+    run_pipeline()
+
+    assert registry.summary().empty
+    assert capsys.readouterr().out == ""
+
+
+def test_stages_and_hooks(registry):
+    calls = []
+    registry.add_hook(lambda *args: calls.append(args))
+    registry.enable(memory=True)
+
+    run_pipeline()
+    run_pipeline()
+
+    summary = registry.summary()
+    assert set(summary.index) == {"ephemeris", "solar_position", "aoi", "poa"}
+    assert (summary["count"] == 2).all()
+    assert (summary["peak_mb"] > 0).all()
+    assert len(calls) == 8
+    assert all(peak is not None for _, _, peak in calls)
+
+    counts, _ = registry.histogram("poa", bins=4)
+    assert counts.sum() == 2
+
+
+def test_memory_concurrent_stages(registry):
+    registry.enable(memory=True)
+    barrier = threading.Barrier(4)
+
+    def stage(size):
+        with registry.stage("work"):
+            data = bytearray(size)
+            barrier.wait()
+            del data
+            barrier.wait()
+
+    threads = [threading.Thread(target=stage, args=(10**6,)) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    barrier.wait()
+    for thread in threads:
+        thread.join()
+
+    # every stage sees at least its own allocation, whatever the order
+    # in which they exit, and tracing lasts until disable.
+    assert len(registry.peak_bytes["work"]) == 3
+    assert min(registry.peak_bytes["work"]) >= 10**6
+    assert tracemalloc.is_tracing()
+    registry.disable()
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,343 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from irradiance_pv.irradiance_pv import Irradiance, PVSystem
+from irradiance_pv.fleet import Fleet
+from irradiance_pv.tmy import (
+    DirectoryFetcher,
+    PVGISFetcher,
+    TMYCache,
+    TMYDownloadError,
+    TMYFetchError,
+    align_tmy,
+    download_tmy,
+    parse_pvgis_json,
+    read_tmy,
+)
+
+times = pd.date_range(start="2015", periods=8760, freq="1h")
+
+
+def pvgis_json(n=8760):
+    hours = np.arange(n)
+    ghi = np.clip(800 * np.sin((hours % 24 - 6) / 12 * np.pi), 0, None).round(1)
+    return {
+        "outputs": {
+            "tmy_hourly": [
+                {
+                    "time(UTC)": "2010{:02d}{:02d}:{:02d}00".format(
+                        1 + h // 744, 1 + (h // 24) % 31, h % 24
+                    ),
+                    "G(h)": g,
+                    "Gb(n)": 0.7 * g,
+                    "Gd(h)": 0.3 * g,
+                    "T2m": 10.0,
+                }
+                for h, g in zip(hours.tolist(), ghi.tolist())
+            ]
+        }
+    }
+
+
+class CountingFetcher:
+    def __init__(self):
+        self.calls = 0
+
+    def fetch(self, lat, lon, startyear, endyear):
+        self.calls += 1
+        return parse_pvgis_json(pvgis_json())
+
+
+def test_cache_hit_skips_fetcher(tmp_path):
+    fetcher = CountingFetcher()
+    cache = TMYCache(tmp_path, fetcher=fetcher)
+
+    first = cache.fetch(52.01, 4.36, 2006, 2015)
+    second = cache.fetch(52.01, 4.36, 2006, 2015)
+
+    assert fetcher.calls == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert (52.01, 4.36, 2006, 2015) in cache
+    pd.testing.assert_frame_equal(first, second, check_dtype=False)
+
+    cache.invalidate(52.01, 4.36, 2006, 2015)
+    cache.fetch(52.01, 4.36, 2006, 2015)
+    assert fetcher.calls == 2
+
+
+def test_cache_eviction(tmp_path):
+    cache = TMYCache(tmp_path, fetcher=CountingFetcher())
+    cache.fetch(0, 0, 2006, 2015)
+    entry_size = sum(p.stat().st_size for p in tmp_path.glob("tmy_*.npz"))
+
+    cache.max_bytes = 2 * entry_size
+    for lon in (1, 2, 3):
+        cache.fetch(0, lon, 2006, 2015)
+
+    assert len(list(tmp_path.glob("tmy_*.npz"))) == 2
+    assert (0, 3, 2006, 2015) in cache
+    assert (0, 0, 2006, 2015) not in cache
+
+
+def test_get_TMY_file_from_directory(tmp_path):
+    with open(tmp_path / DirectoryFetcher.filename(30, -110, 2006, 2015), "w") as f:
+        json.dump(pvgis_json(), f)
+
+    pvsystem = PVSystem("Sonora", 30, -110, surface_azimuth=180, surface_tilt=30)
+    irradiance = Irradiance(pvsystem, times)
+    cache = TMYCache(tmp_path / "cache", fetcher=DirectoryFetcher(tmp_path))
+    df_tmy = irradiance.get_TMY_file(fetcher=cache)
+
+    assert list(df_tmy.columns) == ["time_pvgis", "GHI", "DNI", "DHI"]
+    assert df_tmy.index.equals(irradiance.times)
+    assert df_tmy["GHI"].max() == pytest.approx(800, abs=1)
+    assert cache.misses == 1
+
+    # failures are raised as in Fleet.get_TMY_file.
+    missing = Irradiance(PVSystem("none", 0, 0, 180, 30), times)
+    with pytest.raises(TMYFetchError, match="'none'") as excinfo:
+        missing.get_TMY_file(fetcher=DirectoryFetcher(tmp_path))
+    assert isinstance(excinfo.value.cause, OSError)
+    assert missing.tmy is None
+
+
+@pytest.fixture
+def pvgis_server():
+    """Local stand-in for PVGIS. The first request of every site fails
+    with 503, latitudes above 80 are rejected with 400."""
+
+    body = json.dumps(pvgis_json()).encode()
+    seen = set()
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            params = parse_qs(urlparse(self.path).query)
+            lat = float(params["lat"][0])
+            with lock:
+                first = params["lon"][0] not in seen
+                seen.add(params["lon"][0])
+
+            if lat > 80:
+                self.send_response(400)
+                self.end_headers()
+            elif first:
+                self.send_response(503)
+                self.end_headers()
+            else:
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:{}/api/tmy".format(server.server_address[1])
+    server.shutdown()
+    server.server_close()
+
+
+def test_download_tmy(pvgis_server):
+    pvsystems = [
+        PVSystem(str(lon), 45, lon, surface_azimuth=180, surface_tilt=30)
+        for lon in range(6)
+    ]
+    pvsystems.append(PVSystem("north", 85, 10, surface_azimuth=180, surface_tilt=30))
+
+    fetcher = PVGISFetcher(url=pvgis_server, backoff=0.01, rate=200, pool_size=4)
+    tmys, errors = download_tmy(pvsystems, fetcher=fetcher, max_workers=4)
+
+    assert all(len(df) == 8760 for df in tmys[:6])
+    assert tmys[6] is None
+    assert len(errors) == 1
+    assert errors[0].index == 6
+    assert errors[0].cause.response.status_code == 400
+
+
+def test_fleet_get_TMY_file(pvgis_server):
+    fleet = Fleet.from_arrays(
+        times, latitude=45, longitude=[0, 1, 2], surface_azimuth=180, surface_tilt=30
+    )
+    fetcher = PVGISFetcher(url=pvgis_server, backoff=0.01)
+    tmy = fleet.get_TMY_file(fetcher=fetcher, max_workers=2)
+
+    assert tmy["GHI"].shape == (8760, 3)
+
+    # every failing site is reported.
+    fleet = Fleet.from_arrays(
+        times,
+        latitude=[85, 45, 86],
+        longitude=[3, 4, 5],
+        surface_azimuth=180,
+        surface_tilt=30,
+    )
+    with pytest.raises(TMYDownloadError, match="2 of 3 systems") as excinfo:
+        fleet.get_TMY_file(fetcher=fetcher, max_workers=2)
+    assert [error.index for error in excinfo.value.errors] == [0, 2]
+
+
+def write_pvgis_csv(path, records):
+    lines = [
+        "Latitude (decimal degrees):\t30.000",
+        "Longitude (decimal degrees):\t-110.000",
+        "month,year",
+        "1,2010",
+        "time(UTC),T2m,RH,G(h),Gb(n),Gd(h),IR(h),WS10m,WD10m,SP",
+    ]
+    for r in records:
+        lines.append(
+            "{},{},50,{},{},{},300,2,90,100000".format(
+                r["time(UTC)"], r["T2m"], r["G(h)"], r["Gb(n)"], r["Gd(h)"]
+            )
+        )
+    lines += ["", "T2m: 2-m air temperature (degree Celsius)"]
+    path.write_text("\n".join(lines))
+
+
+def write_epw(path, records, tz):
+    header = ["LOCATION,Sonora,-,MEX,TMY,0,30,-110,{},200".format(tz)]
+    header += ["COMMENTS"] * 7
+    rows = []
+    for t, r in zip(times, records):
+        fields = [str(t.year), str(t.month), str(t.day), str(t.hour + 1)]
+        fields += ["0", "?"] + ["0"] * 7
+        fields += [str(r["G(h)"]), str(r["Gb(n)"]), str(r["Gd(h)"])]
+        fields += ["0"] * 19
+        rows.append(",".join(fields))
+    path.write_text("\n".join(header + rows))
+
+
+def test_read_tmy_formats(tmp_path):
+    tmy_json = pvgis_json()
+    expected = parse_pvgis_json(tmy_json)
+    records = tmy_json["outputs"]["tmy_hourly"]
+
+    with open(tmp_path / "tmy.json", "w") as f:
+        json.dump(tmy_json, f)
+    write_pvgis_csv(tmp_path / "pvgis.csv", records)
+    pd.DataFrame(
+        {"ghi": expected["GHI"], "dni": expected["DNI"], "dhi": expected["DHI"]}
+    ).to_csv(tmp_path / "generic.csv", index=False)
+
+    for name, columns in [
+        ("tmy.json", None),
+        ("pvgis.csv", None),
+        ("generic.csv", {"GHI": "ghi", "DNI": "dni", "DHI": "dhi"}),
+    ]:
+        df_tmy = read_tmy(tmp_path / name, columns=columns, cache=False)
+        assert list(df_tmy.columns) == ["time_pvgis", "GHI", "DNI", "DHI"]
+        np.testing.assert_allclose(df_tmy[["GHI", "DNI", "DHI"]], expected.iloc[:, 1:])
+
+    # local time 1 hour ahead of UTC, the first row is 01:00 local.
+    write_epw(tmp_path / "sonora.epw", records, tz=1)
+    df_tmy = read_tmy(tmp_path / "sonora.epw", cache=False)
+    np.testing.assert_allclose(df_tmy["GHI"], np.roll(expected["GHI"], -1))
+    assert df_tmy["time_pvgis"][0] == "20150101:0000"
+
+
+def test_read_tmy_cache(tmp_path):
+    path = tmp_path / "tmy.json"
+    with open(path, "w") as f:
+        json.dump(pvgis_json(), f)
+
+    first = read_tmy(path, cache_dir=tmp_path)
+    second = read_tmy(path, cache_dir=tmp_path)
+
+    # later reads map the cache, read-only and without copy.
+    ghi = second["GHI"].to_numpy()
+    assert not ghi.flags.writeable
+    assert isinstance(ghi.base.base, np.memmap)
+    pd.testing.assert_frame_equal(first, second)
+
+    pvsystem = PVSystem("Sonora", 30, -110, surface_azimuth=180, surface_tilt=30)
+    irradiance = Irradiance(pvsystem, times)
+    df_tmy = irradiance.read_TMY_file(path, cache_dir=tmp_path)
+    assert df_tmy.index.equals(irradiance.times)
+    assert irradiance.tmy["GHI"].max() == pytest.approx(800, abs=1)
+
+
+def test_read_tmy_cache_per_mapping(tmp_path):
+    path = tmp_path / "weather.csv"
+    pd.DataFrame({"a": [1.0, 2.0], "b": [3.0, 4.0], "c": [5.0, 6.0]}).to_csv(
+        path, index=False
+    )
+
+    swapped = {"GHI": "c", "DNI": "b", "DHI": "a"}
+    first = read_tmy(path, columns={"GHI": "a", "DNI": "b", "DHI": "c"})
+    second = read_tmy(path, columns=swapped)
+
+    assert list(first["GHI"]) == [1.0, 2.0]
+    assert list(second["GHI"]) == [5.0, 6.0]
+    # both mappings are now served from their own cache.
+    assert list(read_tmy(path, columns=swapped)["GHI"]) == [5.0, 6.0]
+    assert len(list(tmp_path.glob("weather.csv.*.irr.npy"))) == 2
+
+
+def test_read_tmy_unwritable_cache(tmp_path):
+    path = tmp_path / "tmy.json"
+    with open(path, "w") as f:
+        json.dump(pvgis_json(), f)
+
+    # the cache directory does not exist, as if it could not be written.
+    df_tmy = read_tmy(path, cache_dir=tmp_path / "missing")
+
+    pd.testing.assert_frame_equal(df_tmy, read_tmy(path, cache=False))
+    assert [p.name for p in tmp_path.iterdir()] == ["tmy.json"]
+
+
+def test_align_tmy():
+    df_tmy = parse_pvgis_json(pvgis_json())
+    ghi = df_tmy["GHI"].to_numpy()
+
+    # one non-leap year shares the data.
+    aligned = align_tmy(df_tmy, times)
+    assert aligned.index.equals(times)
+    assert np.shares_memory(aligned["GHI"].to_numpy(), ghi)
+
+    # two years, the leap year repeats February 28.
+    grid = pd.date_range("2015", "2017", freq="1h", inclusive="left")
+    aligned = align_tmy(df_tmy, grid)
+    assert len(aligned) == 8760 + 8784
+    np.testing.assert_array_equal(aligned["GHI"][:8760], ghi)
+    leap = aligned["GHI"]["2016"].to_numpy()
+    np.testing.assert_array_equal(leap[59 * 24 : 60 * 24], ghi[58 * 24 : 59 * 24])
+    np.testing.assert_array_equal(leap[60 * 24 :], ghi[59 * 24 :])
+
+    # sub-hourly steps are interpolated, and wrap over the new year.
+    grid = pd.date_range("2015-12-31 23:00", periods=4, freq="15min")
+    aligned = align_tmy(df_tmy, grid)
+    expected = ghi[-1] + np.arange(4) / 4 * (ghi[0] - ghi[-1])
+    np.testing.assert_allclose(aligned["GHI"], expected)
+    assert (aligned["time_pvgis"] == df_tmy["time_pvgis"].iloc[-1]).all()
+
+    with pytest.raises(ValueError):
+        align_tmy(df_tmy.iloc[:100], times)
+
+
+def test_fleet_set_tmy_frames():
+    df_tmy = parse_pvgis_json(pvgis_json())
+    grid = pd.date_range("2016-06-01", periods=48, freq="30min")
+    fleet = Fleet(
+        [
+            PVSystem(str(lat), lat, 0, surface_azimuth=180, surface_tilt=30)
+            for lat in (10, 20)
+        ],
+        grid,
+    )
+
+    tmy = fleet.set_tmy_frames([df_tmy, df_tmy])
+
+    expected = align_tmy(df_tmy, grid)["DNI"].to_numpy()
+    assert tmy["DNI"].shape == (48, 2)
+    np.testing.assert_allclose(tmy["DNI"][:, 1], expected)
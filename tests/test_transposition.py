@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from irradiance_pv.transposition import MODELS, Geometry, transpose
+
+
+def test_default_model_matches_get_poa_irradiance(make_irradiance):
+    irradiance = make_irradiance()
+    expected = irradiance.get_poa_irradiance()
+
+    poa = irradiance.get_poa_irradiance_model()
+
+    pd.testing.assert_frame_equal(poa, expected.astype(float), check_freq=False)
+
+
+def test_horizontal_surface_receives_dhi(make_irradiance):
+    irradiance = make_irradiance()
+    pos = irradiance.solar_pos
+    tmy = irradiance.tmy
+    geometry = Geometry(
+        pos["solar_zenith"], pos["solar_azimuth"], 0, 180, irradiance.times
+    )
+    day = pos["solar_zenith"].to_numpy() < 80
+
+    for model in ["isotropic", "haydavies", "reindl", "perez"]:
+        sky = MODELS[model](geometry, tmy["GHI"], tmy["DNI"], tmy["DHI"])
+        np.testing.assert_allclose(np.asarray(sky)[day], tmy["DHI"][day], rtol=1e-9)
+
+
+def test_models_share_geometry_and_broadcast(make_irradiance):
+    irradiance = make_irradiance()
+    zenith = irradiance.solar_pos["solar_zenith"].to_numpy()[:, None]
+    azimuth = irradiance.solar_pos["solar_azimuth"].to_numpy()[:, None]
+    tilt = np.array([10.0, 35.0, 60.0])
+    geometry = Geometry(zenith, azimuth, tilt, 180, irradiance.times)
+    ghi, dni, dhi = (
+        irradiance.tmy[c].to_numpy()[:, None] for c in ("GHI", "DNI", "DHI")
+    )
+
+    irradiance.surface_tilt = 35.0
+    comparison = irradiance.compare_transposition()
+
+    assert list(comparison) == list(MODELS)
+    for model in MODELS:
+        poa, *components = transpose(geometry, ghi, dni, dhi, model=model)
+        assert poa.shape == (len(irradiance.times), 3)
+        assert (poa >= 0).all()
+        np.testing.assert_allclose(poa, sum(components))
+        np.testing.assert_allclose(poa[:, 1], comparison[model])
+
+
+def test_unknown_model(make_irradiance):
+    irradiance = make_irradiance()
+
+    with pytest.raises(ValueError, match="model must be one of"):
+        irradiance.get_poa_irradiance_model("klucher")
+
+
+def test_missing_inputs_give_zero(make_irradiance):
+    irradiance = make_irradiance()
+    pos = irradiance.solar_pos
+    geometry = Geometry(
+        pos["solar_zenith"], pos["solar_azimuth"], 35, 180, irradiance.times
+    )
+    ghi, dni, dhi = (irradiance.tmy[c].to_numpy() for c in ("GHI", "DNI", "DHI"))
+    gap = np.zeros(len(ghi), dtype=bool)
+    gap[10:15] = True
+    ghi, dni, dhi = (np.where(gap, np.nan, x) for x in (ghi, dni, dhi))
+
+    for model in MODELS:
+        poa, *components = transpose(geometry, ghi, dni, dhi, model=model)
+        for x in [poa] + components:
+            assert np.isfinite(x).all()
+            assert (x[gap] == 0).all()